@@ -0,0 +1,61 @@
+"""Scaling benchmark for tile-parallel conversion of a single large image
+
+Usage:
+    python benchmarks/bench_threads.py [--size 4096] [--max-threads N] [--repeat 3]
+"""
+import os
+import time
+import argparse
+
+import numpy as np
+
+from n64tex.formats import RGBAImage
+
+# (source format, method to call)
+CONVERSIONS = [
+    ("rgba", "to_rgba5551"),
+    ("rgba", "to_i8"),
+    ("rgba", "to_ci8"),
+    ("rgba5551", "to_rgba"),
+    ("ci8", "to_rgba"),
+]
+
+
+def best_time(func, repeat: int) -> float:
+    """Best wall clock time of several runs"""
+    times = list()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=4096, help="Width and height of the test image")
+    parser.add_argument("--max-threads", type=int, default=os.cpu_count(), help="Largest thread count to try")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement, the best is kept")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    colours = rng.integers(0, 256, (256, 4), dtype=np.uint8)
+    image = RGBAImage(colours[rng.integers(0, 256, (args.size, args.size))], args.size, args.size)
+    sources = {"rgba": image, "rgba5551": image.to_rgba5551(), "ci8": image.to_ci8()}
+    pixels = args.size * args.size
+
+    thread_counts = sorted({1, 2, 4, 8, 16, args.max_threads} & set(range(1, args.max_threads + 1)))
+    print(f"{args.size}x{args.size}, best of {args.repeat}")
+    print(f"{'conversion':<20}" + "".join(f"{f'{threads} thread(s)':>16}" for threads in thread_counts))
+    for source, method in CONVERSIONS:
+        name = f"{source} -> {method[3:]}"
+        func = getattr(sources[source], method)
+        results = list()
+        for threads in thread_counts:
+            seconds = best_time(lambda: func(threads=threads), args.repeat)
+            results.append(f"{pixels / seconds / 1e6:>10.1f} Mpx/s")
+        print(f"{name:<20}" + "".join(f"{result:>16}" for result in results))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,104 +1,344 @@
-def cli() -> None:
-    """Command line util"""
+FORMAT_CHOICES = [
+    "i4",
+    "i4a",
+    "i8",
+    "i8a",
+    "ia16",
+    "ci4",
+    "ci8",
+    "rgba",
+    "rgba5551",
+    "yuv16",
+]
+
+
+def parse_formats(formats) -> list:
+    """Split a comma separated list of output formats, such as
+       "rgba5551,ci8,i8", checking every format is known
+
+    Args:
+        formats (str | list[str]): Comma separated formats, or a list of them
+
+    Raises:
+        ValueError: If there are no formats or any format is unknown
+
+    Returns:
+        list[str]: Formats in the order given, without duplicates
+    """
+    if isinstance(formats, str):
+        formats = formats.split(",")
+    formats = list(dict.fromkeys(fmt.strip() for fmt in formats if fmt.strip()))
+    unknown = [fmt for fmt in formats if fmt not in FORMAT_CHOICES]
+    if unknown or not formats:
+        raise ValueError(f"Unknown output format {', '.join(unknown) or '(none)'}, expected some of {', '.join(FORMAT_CHOICES)}")
+    return formats
+
+
+def convert_file(
+    filepath,
+    output_format,
+    input_format: str = "rgba",
+    output_file=None,
+    width: int = None,
+    height: int = None,
+    palette=None,
+    write_bytes: bool = False,
+    force_rgba: bool = False,
+    max_memory: int = None,
+    stats=None,
+    tlut: str = "rgba5551",
+    compress_level=None,
+    png_strategy: str = None,
+) -> list:
+    """Convert a single file the same way the command line util does
+
+    Args:
+        filepath (str | pathlib.Path): Path to file to convert
+        output_format (str | list[str]): Output image format, or several as a list or comma separated string.
+            The source is decoded once and shared between every output
+        input_format (str, optional): Input image format. Defaults to "rgba"
+        output_file (str | pathlib.Path, optional): Output file name. Defaults to `<output_format>_<filename>`. With
+            several output formats, each output is named `<output_format>_<output_file>`
+        width (int, optional): Width of image if the file is raw bytes. Defaults to inferring it from the file size
+        height (int, optional): Height of image if the file is raw bytes. Defaults to inferring it from the file size
+        palette (str | pathlib.Path, optional): File containing palette information. Defaults to None
+        write_bytes (bool, optional): Whether to also write a bytes file. Defaults to False
+        force_rgba (bool, optional): Save an 'RGBA' image rather than the format's native mode. Defaults to False
+        max_memory (int, optional): Convert in chunks of rows to bound the working memory to roughly this many bytes. Defaults to None
+        stats (n64tex.stats.ConversionStats, optional): Filled in with sizes and timings of the conversion. Defaults to None
+        tlut (str, optional): Whether CI palettes, read and written, hold "rgba5551" or "ia16" colours. Defaults to "rgba5551"
+        compress_level (int | str, optional): PNG compression level from 0-9, or "raw", "fast", "default" or "best".
+            Defaults to None, Pillow's default
+        png_strategy (str, optional): PNG compression strategy, "default", "filtered", "huffman", "rle" or "fixed".
+            Defaults to None, Pillow's default
+
+    Raises:
+        ValueError: If an output format, the TLUT mode or a PNG option is unknown, a raw file's size doesn't fit the
+            input format and dimensions, or a CI file has no palette
+
+    Returns:
+        list[pathlib.Path]: Paths of every file that was written
+    """
+    import io
     import pathlib
+
+    from PIL import Image
+
+    from n64tex.sniff import HEADER_SIZE, infer_size, is_image, open_image
+    from n64tex.formats import Formats, Palette
+    from n64tex.formats.base import png_options
+    from n64tex.formats.palette import check_tlut
+    from n64tex.stats import ConversionStats
+
+    if stats is None:
+        stats = ConversionStats()
+
+    # Input filepath
+    filepath = pathlib.Path(filepath)
+
+    # Output filepaths
+    output_formats = parse_formats(output_format)
+    check_tlut(tlut)
+    save_options = png_options(compress_level, png_strategy)
+    if output_file is None:
+        output_files = [filepath.parent / f'{fmt}_{filepath.name}' for fmt in output_formats]
+    elif len(output_formats) == 1:
+        output_files = [pathlib.Path(output_file)]
+    else:
+        output_file = pathlib.Path(output_file)
+        output_files = [output_file.parent / f'{fmt}_{output_file.name}' for fmt in output_formats]
+
+    stats.input_file = str(filepath)
+    stats.input_format = input_format
+    stats.output_format = ",".join(output_formats)
+
+    with stats.time("decode"):
+        # Palette information
+        palette_data = None
+        if palette:
+            with open(pathlib.Path(palette), 'rb') as fil:
+                palette_data = Palette.from_bytes(fil.read())
+
+        # Only files that start with an image signature are handed to PIL. Anything else, or anything PIL
+        # can't decode, is raw bytes
+        cls = Formats[input_format].value
+        tlut_kwargs = {"tlut": tlut} if cls.indexed else {}
+        with open(filepath, 'rb') as fil:
+            header = fil.read(HEADER_SIZE)
+        image = open_image(filepath) if is_image(header) else None
+        if image is not None:
+            obj = cls.from_image(image, image.width, image.height, **tlut_kwargs)
+        else:
+            # Check the size before reading anything so bad inputs fail fast
+            width, height = infer_size(filepath.stat().st_size, cls.bits_per_pixel, width, height)
+            if cls.indexed and palette_data is None:
+                raise ValueError(f"{input_format} input requires a palette")
+            with open(filepath, 'rb') as fil:
+                image = fil.read()
+            obj = cls.from_bytes(image, width, height, palette_data, **tlut_kwargs)
+    stats.bytes_in = filepath.stat().st_size
+    stats.width, stats.height = obj.width, obj.height
+
+    def convert(source, fmt):
+        target = Formats[fmt].value
+        if target.indexed:
+            return getattr(source, f"to_{fmt}")(tlut=tlut, max_memory=max_memory)
+        return source.convert_to(target, max_memory=max_memory)
+
+    with stats.time("convert"):
+        if len(output_formats) == 1 or max_memory is not None:
+            # A memory budget decodes chunk by chunk for every output rather than keeping the whole RGBA image
+            converted_objs = [convert(obj, fmt) for fmt in output_formats]
+        else:
+            # Share one RGBA intermediate, and the palette of the first CI output, between every output
+            rgba_obj = obj.convert_to(Formats.rgba.value)
+            converted_objs = list()
+            for fmt in output_formats:
+                converted_obj = convert(rgba_obj, fmt)
+                if rgba_obj.palette is None and converted_obj.palette is not None:
+                    rgba_obj = Formats.rgba.value(rgba_obj.data_array, rgba_obj.width, rgba_obj.height, converted_obj.palette)
+                    rgba_obj.tlut = converted_obj.tlut
+                converted_objs.append(converted_obj)
+    palettes = [len(converted_obj.palette) for converted_obj in converted_objs if converted_obj.palette is not None]
+    stats.palette_size = max(palettes) if palettes else None
+
+    # Everything is encoded in memory first, so encoding and writing are timed separately
+    outputs = list()
+    with stats.time("encode"):
+        for output_file, converted_obj in zip(output_files, converted_objs):
+            if write_bytes:
+                bytes_path = output_file.parent / output_file.stem
+                outputs.append((bytes_path, converted_obj.to_bytes()))
+                if converted_obj.palette is not None:
+                    palette_path = output_file.parent / f'palette_{output_file.name}'
+                    palette_path = palette_path.parent / palette_path.stem
+                    outputs.append((palette_path, converted_obj.palette.to_bytes()))
+
+            image_format = Image.registered_extensions().get(output_file.suffix.lower())
+            if image_format is None:
+                raise ValueError(f"unknown file extension: {output_file.suffix}")
+            encoded = io.BytesIO()
+            converted_obj.to_image(force_rgba).save(encoded, format=image_format, **(save_options if image_format == "PNG" else {}))
+            outputs.append((output_file, encoded.getbuffer()))
+
+    with stats.time("write"):
+        for path, data in outputs:
+            with open(path, 'wb') as fil:
+                fil.write(data)
+
+    written = [path for path, _ in outputs]
+    stats.outputs = [str(path) for path in written]
+    stats.bytes_out = sum(len(data) for _, data in outputs)
+    return written
+
+
+def parse_size(size: str) -> int:
+    """Parse a number of bytes with an optional K, M or G suffix
+
+    Args:
+        size (str): Size such as "65536", "512K" or "64M"
+
+    Returns:
+        int: Number of bytes
+    """
+    import argparse
+
+    multipliers = {"K": 1 << 10, "M": 1 << 20, "G": 1 << 30}
+    size = size.strip().upper().removesuffix("B")
+    multiplier = multipliers.get(size[-1:], 1)
+    if multiplier != 1:
+        size = size[:-1]
+    try:
+        value = int(float(size) * multiplier)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size {size!r}")
+    if value <= 0:
+        raise argparse.ArgumentTypeError("size must be positive")
+    return value
+
+
+def parse_compress_level(level: str):
+    """Parse a PNG compression level, a number from 0-9 or one of its names
+
+    Args:
+        level (str): Level such as "6" or "raw"
+
+    Raises:
+        argparse.ArgumentTypeError: If the level is unknown
+
+    Returns:
+        int | str: Level number, or its name
+    """
+    import argparse
+
+    from n64tex.formats.base import COMPRESS_LEVELS
+
+    if level in COMPRESS_LEVELS:
+        return level
+    if level.isdigit() and int(level) <= 9:
+        return int(level)
+    raise argparse.ArgumentTypeError(f"expected 0-9 or one of {', '.join(COMPRESS_LEVELS)}")
+
+
+def add_png_arguments(parser):
+    """Add the PNG compression options every command shares to a parser"""
+    from n64tex.formats.base import PNG_STRATEGIES
+
+    parser.add_argument(
+        "--compress_level",
+        type=parse_compress_level,
+        help="PNG compression level, 0-9 or raw, fast, default or best. raw writes uncompressed PNGs for intermediate files",
+    )
+    parser.add_argument("--png_strategy", choices=PNG_STRATEGIES, help="PNG compression strategy. rle is fastest for flat textures")
+
+
+def cli(argv: list = None) -> None:
+    """Command line util. The first argument picks a command such as
+       `build`, unless it's a file, which is converted as it always was
+    """
+    import os
+    import sys
     import argparse
-    
-    from PIL import Image, UnidentifiedImageError
-    
-    from n64tex.formats import Formats
+
+    from n64tex.formats.palette import TLUT_MODES
+
+    if argv is None:
+        argv = sys.argv[1:]
+
+    command = argv[0] if argv and not os.path.isfile(argv[0]) else None
+
+    if command in ("build", "watch"):
+        from n64tex.build import build_cli
+
+        return build_cli(argv)
+
+    if command == "pack":
+        from n64tex.texpack import pack_cli
+
+        return pack_cli(argv)
+
+    if command == "extract":
+        from n64tex.extract import extract_cli
+
+        return extract_cli(argv)
 
     parser = argparse.ArgumentParser()
 
     parser.add_argument("filepath", help="Path to file to convert")
-    
-    parser.add_argument("--width", type=int, help="Width of image. Defaults to 64", default=64)
-    parser.add_argument("--height", type=int, help="Height of image. Defaults to 64", default=64)
+
+    parser.add_argument("--width", type=int, help="Width of raw byte images. Defaults to inferring it from the file size")
+    parser.add_argument("--height", type=int, help="Height of raw byte images. Defaults to inferring it from the file size")
 
     parser.add_argument(
         "input_format",
         help="Input image format",
         type=str,
-        choices=[
-            "i4",
-            "i4a",
-            "i8",
-            "i8a",
-            "ci4",
-            "ci8",
-            "rgba",
-            "rgba5551",
-        ],
+        choices=FORMAT_CHOICES,
         nargs='?',
         default='rgba'
     )
     parser.add_argument(
         "output_format",
-        help="Output image format",
+        help=f"Output image format, or several separated by commas such as rgba5551,ci8,i8. One of {', '.join(FORMAT_CHOICES)}",
         type=str,
-        choices=[
-            "i4",
-            "i4a",
-            "i8",
-            "i8a",
-            "ci4",
-            "ci8",
-            "rgba",
-            "rgba5551",
-        ],
     )
-    
+
     parser.add_argument("--palette", help="File containing palette information. Only required for CI4/CI8 input format")
+    parser.add_argument("--tlut", help="Colour format of CI palettes. Defaults to rgba5551", choices=TLUT_MODES, default="rgba5551")
 
     parser.add_argument("--output_file", "-o", help="Output file name", type=str)
     parser.add_argument("--write_bytes", "-b", action="store_true", help="Write a bytes file")
+    parser.add_argument("--force_rgba", action="store_true", help="Save an RGBA image rather than the format's native mode")
+    parser.add_argument("--max_memory", type=parse_size, help="Convert in chunks to keep working memory under this size, e.g. 64M")
+    parser.add_argument("--stats", choices=["json"], help="Print sizes, timings and throughput of the conversion")
+    add_png_arguments(parser)
 
-    args = parser.parse_args()
+    args = parser.parse_args(argv)
 
-    # Input filepath
-    filepath = pathlib.Path(args.filepath)
-    
-    # Input and output formats
-    input_format = args.input_format
-    output_format = args.output_format
-    
-    # Output filepath
-    output_file = filepath.parent / f'{output_format}_{filepath.name}'
-    if args.output_file:
-        output_file = pathlib.Path(args.output_file)
-        
-    # Palette information
-    palette_data = None
-    if args.palette:
-        palette_path = pathlib.Path(args.palette)
-        with open(palette_path, 'rb') as fil:
-            palette_image = fil.read()
-        obj = Formats.rgba5551.value.from_bytes(palette_image, 16, 16)
-        palette_data = obj.to_bytes()
-
-    # Convert image
-    cls = Formats[input_format].value
+    from n64tex.stats import ConversionStats, summarise
+
+    stats = ConversionStats()
     try:
-        image = Image.open(filepath)
-        width = image.width or args.width
-        height = image.height or args.height
-        obj = cls.from_image(image, width, height)
-    except UnidentifiedImageError:
-        with open(filepath, 'rb') as fil:
-            image = fil.read()
-        width = args.width
-        height = args.height
-        obj = cls.from_bytes(image, width, height, palette_data)
-    converted_obj = obj.convert_to(Formats[output_format].value)
-        
-    # Handle writing to bytes
-    if args.write_bytes:
-        with open(output_file.parent / output_file.stem, 'wb') as fil:
-            fil.write(converted_obj.to_bytes())
-        if converted_obj.palette is not None:
-            palette_path = output_file.parent / f'palette_{output_file.name}'
-            with open(palette_path.parent / palette_path.stem, 'wb') as fil:
-                fil.write(converted_obj.palette.astype('>u2').tobytes())
-    
-    # Save image
-    converted_obj.save(output_file)
-        
\ No newline at end of file
+        convert_file(
+            args.filepath,
+            args.output_format,
+            input_format=args.input_format,
+            output_file=args.output_file,
+            width=args.width,
+            height=args.height,
+            palette=args.palette,
+            write_bytes=args.write_bytes,
+            force_rgba=args.force_rgba,
+            max_memory=args.max_memory,
+            stats=stats,
+            tlut=args.tlut,
+            compress_level=args.compress_level,
+            png_strategy=args.png_strategy,
+        )
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    if args.stats == "json":
+        import json
+
+        print(json.dumps(summarise([stats])))
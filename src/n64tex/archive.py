@@ -0,0 +1,381 @@
+import mmap
+import struct
+import hashlib
+import pathlib
+
+import numpy as np
+
+# File layout, all little endian:
+#
+#   header      MAGIC, version, entry count, palette count and table offsets
+#   payloads    raw texture and palette bytes, each aligned to ALIGNMENT
+#   palettes    palette count * PALETTE_DTYPE
+#   index       entry count * ENTRY_DTYPE
+#   names       UTF-8 entry names, referenced from the index
+#
+# The palette table, index and names are written when the archive is closed,
+# which is what allows the writer to keep appending payloads. An entry's tlut
+# is its position in TLUT_MODES, 0 being RGBA5551 palettes. Since version 2
+# each entry holds its payload's digest, so appending never rereads payloads
+MAGIC = b"N64TEXAR"
+VERSION = 2
+ALIGNMENT = 16
+
+# Largest width or height an entry can store
+MAX_DIMENSION = 0xFFFF
+
+HEADER = struct.Struct("<8sIII4xQQQ")
+
+PALETTE_DTYPE = np.dtype([
+    ("offset", "<u8"),
+    ("length", "<u4"),
+    ("reserved", "<u4"),
+])
+
+ENTRY_FIELDS = [
+    ("format", "S8"),
+    ("width", "<u2"),
+    ("height", "<u2"),
+    ("palette_id", "<i4"),
+    ("offset", "<u8"),
+    ("length", "<u8"),
+    ("name_offset", "<u8"),
+    ("name_length", "<u4"),
+    ("tlut", "<u4"),
+]
+ENTRY_DTYPE = np.dtype(ENTRY_FIELDS + [("digest", "V16")])
+
+# Index entry layout of each version that can be read
+ENTRY_DTYPES = {1: np.dtype(ENTRY_FIELDS), 2: ENTRY_DTYPE}
+
+
+def _format_name(obj) -> str:
+    """Find the `Formats` name of a format object
+
+    Args:
+        obj (N64TextureFormat): Format object
+
+    Returns:
+        str: Name of the format
+    """
+    from n64tex.formats import Formats
+
+    for member in Formats:
+        if type(obj) is member.value:
+            return member.name
+    raise TypeError(f"{type(obj).__name__} is not a texture format")
+
+
+class ArchiveWriter:
+    """Writes format objects into a single packed archive file. Texture bytes
+       are appended as they're added. Palettes and byte-identical texture
+       payloads are stored once no matter how many entries share them. Use
+       as a context manager, or call `close` to write out the index
+    """
+
+    def __init__(self, path, append: bool = False):
+        """Initializer for the writer
+
+        Args:
+            path (str | pathlib.Path): Archive file to write
+            append (bool, optional): Add to an existing archive rather than replacing it. Defaults to False.
+        """
+        self.path: pathlib.Path = pathlib.Path(path)
+        self.entries: list = list()
+        self.names: bytearray = bytearray()
+        self.palettes: list = list()
+        self.palette_ids: dict = dict()
+        self.payloads: dict = dict()
+
+        if append and self.path.exists():
+            self._fil = open(self.path, 'r+b')
+            self._load_existing()
+        else:
+            self._fil = open(self.path, 'wb')
+            self._fil.write(b"\x00" * HEADER.size)
+
+    def _load_existing(self):
+        """Read the tables of an existing archive and drop them from the end
+           of the file so new payloads can be appended. Payload digests come
+           from the index, so payloads are only read to hash them for
+           version 1 archives, which are rewritten as the current version
+        """
+        with ArchiveReader(self.path) as reader:
+            self.palettes = [tuple(palette.tolist()) for palette in reader.palette_table]
+            self.names = bytearray(reader.names_bytes)
+            for palette_id in range(len(self.palettes)):
+                self.palette_ids[reader.palette_bytes(palette_id)] = palette_id
+            entries = reader.index.tolist()
+            if reader.version >= 2:
+                digests = [entry[-1] for entry in entries]
+            else:
+                digests = [self._digest(reader.raw_bytes(index)) for index in range(len(reader))]
+            end = reader.palettes_offset
+        offset_field, length_field = (ENTRY_DTYPE.names.index(field) for field in ("offset", "length"))
+        for entry, digest in zip(entries, digests):
+            self.entries.append(entry[:len(ENTRY_FIELDS)] + (digest,))
+            self.payloads.setdefault((entry[length_field], digest), entry[offset_field])
+        self._fil.seek(end)
+        self._fil.truncate()
+
+    def _write_payload(self, data: bytes) -> int:
+        """Write aligned payload bytes
+
+        Args:
+            data (bytes): Bytes to write
+
+        Returns:
+            int: Offset of the payload
+        """
+        offset = self._fil.seek(0, 2)
+        padding = -offset % ALIGNMENT
+        if padding:
+            self._fil.write(b"\x00" * padding)
+            offset += padding
+        self._fil.write(data)
+        return offset
+
+    @staticmethod
+    def _digest(raw_bytes: bytes) -> bytes:
+        """Digest identifying identical payloads, along with their length"""
+        return hashlib.blake2b(raw_bytes, digest_size=16).digest()
+
+    def add_palette(self, palette: np.ndarray) -> int:
+        """Store a palette, reusing an identical one if it's already stored
+
+        Args:
+            palette (Palette | np.ndarray): Palette to store
+
+        Returns:
+            int: Palette id
+        """
+        from n64tex.formats import Palette
+
+        palette_bytes = Palette.of(palette).to_bytes()
+        palette_id = self.palette_ids.get(palette_bytes)
+        if palette_id is None:
+            offset = self._write_payload(palette_bytes)
+            palette_id = len(self.palettes)
+            self.palettes.append((offset, len(palette_bytes), 0))
+            self.palette_ids[palette_bytes] = palette_id
+        return palette_id
+
+    def add(self, name: str, obj) -> int:
+        """Append a format object to the archive
+
+        Args:
+            name (str): Name to store the object under
+            obj (N64TextureFormat): Format object to store
+
+        Raises:
+            ValueError: If the object is wider or taller than `MAX_DIMENSION`
+
+        Returns:
+            int: Index of the entry
+        """
+        from n64tex.formats.palette import TLUT_MODES
+
+        if not (0 <= obj.width <= MAX_DIMENSION and 0 <= obj.height <= MAX_DIMENSION):
+            raise ValueError(f"{name} is {obj.width}x{obj.height}, archives only hold textures up to {MAX_DIMENSION}x{MAX_DIMENSION}")
+        format_name = _format_name(obj).encode("ascii")
+        palette_id = -1
+        if obj.palette is not None:
+            palette_id = self.add_palette(obj.palette)
+
+        raw_bytes = obj.to_bytes()
+        digest = self._digest(raw_bytes)
+        payload_key = len(raw_bytes), digest
+        offset = self.payloads.get(payload_key)
+        if offset is None:
+            offset = self.payloads[payload_key] = self._write_payload(raw_bytes)
+
+        encoded_name = name.encode("utf-8")
+        self.entries.append((
+            format_name,
+            obj.width,
+            obj.height,
+            palette_id,
+            offset,
+            len(raw_bytes),
+            len(self.names),
+            len(encoded_name),
+            TLUT_MODES.index(obj.tlut) if obj.indexed else 0,
+            digest,
+        ))
+        self.names += encoded_name
+        return len(self.entries) - 1
+
+    def close(self):
+        """Write the palette table, index and names, then close the file"""
+        if self._fil.closed:
+            return
+
+        palettes_offset = self._write_payload(np.array(self.palettes, dtype=PALETTE_DTYPE).tobytes())
+        index_offset = self._write_payload(np.array(self.entries, dtype=ENTRY_DTYPE).tobytes())
+        names_offset = self._write_payload(bytes(self.names))
+
+        self._fil.seek(0)
+        self._fil.write(HEADER.pack(
+            MAGIC, VERSION, len(self.entries), len(self.palettes), palettes_offset, index_offset, names_offset
+        ))
+        self._fil.close()
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class ArchiveReader:
+    """Memory maps a packed archive file. Only the header is read on open,
+       the index is a view over the mapped file and textures are decoded
+       lazily when they're asked for, by name or by index
+    """
+
+    def __init__(self, path):
+        """Initializer for the reader
+
+        Args:
+            path (str | pathlib.Path): Archive file to read
+        """
+        self.path: pathlib.Path = pathlib.Path(path)
+        self._names: dict = None
+
+        with open(self.path, 'rb') as fil:
+            self._mmap = mmap.mmap(fil.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (
+            magic, version, entry_count, palette_count, palettes_offset, index_offset, names_offset
+        ) = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            self._mmap.close()
+            raise ValueError(f"{self.path} is not an n64tex archive")
+        if version not in ENTRY_DTYPES:
+            self._mmap.close()
+            raise ValueError(f"{self.path} is version {version}, only versions up to {VERSION} are supported")
+
+        self.palettes_offset: int = palettes_offset
+        self.names_offset: int = names_offset
+        self.version: int = version
+        self.index: np.ndarray = np.frombuffer(self._mmap, dtype=ENTRY_DTYPES[version], count=entry_count, offset=index_offset)
+        self.palette_table: np.ndarray = np.frombuffer(
+            self._mmap, dtype=PALETTE_DTYPE, count=palette_count, offset=self.palettes_offset
+        )
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @property
+    def names_bytes(self) -> bytes:
+        """Raw UTF-8 names table"""
+        return self._mmap[self.names_offset:]
+
+    def name(self, index: int) -> str:
+        """Name of an entry
+
+        Args:
+            index (int): Index of the entry
+
+        Returns:
+            str: Name of the entry
+        """
+        entry = self.index[index]
+        start = self.names_offset + int(entry["name_offset"])
+        return self._mmap[start:start + int(entry["name_length"])].decode("utf-8")
+
+    def names(self) -> list:
+        """Names of every entry, in order
+
+        Returns:
+            list[str]: Entry names
+        """
+        return [self.name(index) for index in range(len(self))]
+
+    def find(self, name: str) -> int:
+        """Index of the entry with the given name. The name lookup table is
+           only built the first time an entry is found by name
+
+        Args:
+            name (str): Name of the entry
+
+        Returns:
+            int: Index of the entry
+        """
+        if self._names is None:
+            self._names = {entry_name: index for index, entry_name in enumerate(self.names())}
+        return self._names[name]
+
+    def palette_bytes(self, palette_id: int) -> bytes:
+        """Raw bytes of a stored palette
+
+        Args:
+            palette_id (int): Id of the palette
+
+        Returns:
+            bytes: Palette bytes
+        """
+        palette = self.palette_table[palette_id]
+        start = int(palette["offset"])
+        return self._mmap[start:start + int(palette["length"])]
+
+    def raw_bytes(self, key) -> bytes:
+        """Raw texture bytes of an entry
+
+        Args:
+            key (int | str): Index or name of the entry
+
+        Returns:
+            bytes: Texture bytes
+        """
+        if isinstance(key, str):
+            key = self.find(key)
+        entry = self.index[key]
+        start = int(entry["offset"])
+        return self._mmap[start:start + int(entry["length"])]
+
+    def __getitem__(self, key):
+        """Decode an entry into its format object
+
+        Args:
+            key (int | str): Index or name of the entry
+
+        Returns:
+            N64TextureFormat: Decoded format object
+        """
+        from n64tex.formats import Formats
+        from n64tex.formats.palette import TLUT_MODES
+
+        if isinstance(key, str):
+            key = self.find(key)
+        entry = self.index[key]
+        cls = Formats[entry["format"].decode("ascii")].value
+        if entry["palette_id"] < 0:
+            return cls.from_bytes(self.raw_bytes(key), int(entry["width"]), int(entry["height"]))
+        palette_bytes = self.palette_bytes(int(entry["palette_id"]))
+        return cls.from_bytes(
+            self.raw_bytes(key), int(entry["width"]), int(entry["height"]), palette_bytes, tlut=TLUT_MODES[int(entry["tlut"])]
+        )
+
+    def __contains__(self, name: str) -> bool:
+        try:
+            self.find(name)
+        except KeyError:
+            return False
+        return True
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def close(self):
+        """Release the index views and unmap the file"""
+        self.index = None
+        self.palette_table = None
+        self._mmap.close()
+
+    def __enter__(self) -> "ArchiveReader":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
@@ -0,0 +1,295 @@
+import os
+import sys
+
+from concurrent.futures import Executor, ProcessPoolExecutor, wait
+from multiprocessing.shared_memory import SharedMemory
+from typing import Union
+
+import numpy as np
+
+# Arrays in a shared block start on cache line boundaries
+ALIGNMENT = 64
+
+
+def data_layout(cls, width: int, height: int) -> tuple:
+    """Shape and dtype of a format's data array
+
+    Args:
+        cls (Type[BaseImage]): Image format
+        width (int): Width of image
+        height (int): Height of image
+
+    Returns:
+        tuple[tuple, np.dtype]: Shape and dtype
+    """
+    from n64tex.formats import RGBAImage
+
+    if cls is RGBAImage:
+        return (height, width, 4), np.dtype(np.uint8)
+    if cls.bits_per_pixel == 16:
+        return (height, width), np.dtype(np.uint16)
+    return (height, width), np.dtype(np.uint8)
+
+
+def _tracker_id() -> Union[tuple, None]:
+    """Identity of this process's resource tracker before Python 3.13, as
+       the device and inode of the pipe it's sent messages through. A
+       worker started after its parent's tracker shares the pipe. None when
+       attaching to a block doesn't register it
+    """
+    if sys.version_info >= (3, 13) or os.name != "posix":
+        return None
+    from multiprocessing import resource_tracker
+
+    stat = os.fstat(resource_tracker.getfd())
+    return stat.st_dev, stat.st_ino
+
+
+def _attach_untracked(name: str, tracker: Union[tuple, None]) -> SharedMemory:
+    """Attach to a shared memory block so only its owner's resource tracker
+       tracks it. Before Python 3.13 every attach registers, and a worker
+       started before its owner's tracker runs its own, which unlinks the
+       block when the worker exits while its owner may still be using it.
+       The registration is undone there, as CPython's documented workaround.
+       A tracker shared with the owner tracks each name only once, so
+       there the registration changes nothing and undoing it would drop the
+       owner's, which still cleans the block up if the owner dies
+
+    Args:
+        name (str): Name of the block
+        tracker (tuple | None): `_tracker_id` of the block's owner
+    """
+    if sys.version_info >= (3, 13):
+        return SharedMemory(name=name, track=False)
+    shm = SharedMemory(name=name)
+    if tracker is not None and _tracker_id() != tracker:
+        from multiprocessing import resource_tracker
+
+        resource_tracker.unregister(shm._name, "shared_memory")
+    return shm
+
+
+class SharedArrays:
+    """Several arrays packed into one shared memory block, so worker
+       processes can read and write them in place rather than having them
+       pickled through a pipe. The block is created by the process that owns
+       it and unlinked on `close`, which is safe to call however far the
+       work got. Workers are only sent the `location` of the arrays they
+       need, and view them with `SharedViews`
+    """
+
+    def __init__(self, layouts: list):
+        """Initializer that creates the block
+
+        Args:
+            layouts (list[tuple[tuple, np.dtype]]): Shape and dtype of each array
+        """
+        self.layouts: list = [(tuple(shape), np.dtype(dtype)) for shape, dtype in layouts]
+        self.offsets: list = list()
+        size = 0
+        for shape, dtype in self.layouts:
+            self.offsets.append(size)
+            nbytes = int(np.prod(shape)) * dtype.itemsize
+            size += -(-nbytes // ALIGNMENT) * ALIGNMENT
+        self.owned: bool = True
+        self.shm: SharedMemory = SharedMemory(create=True, size=max(size, 1))
+        self.tracker: Union[tuple, None] = _tracker_id()
+
+    def location(self, index: int) -> tuple:
+        """Block name, offset, shape and dtype of one array, and the block's
+           resource tracker, all a worker needs to view it. Its size doesn't
+           depend on how many arrays the block holds
+        """
+        shape, dtype = self.layouts[index]
+        return self.shm.name, self.offsets[index], shape, dtype.str, self.tracker
+
+    def __len__(self) -> int:
+        return len(self.layouts)
+
+    def __getitem__(self, index: int) -> np.ndarray:
+        """View of an array in the block, valid until the block is closed"""
+        shape, dtype = self.layouts[index]
+        return np.ndarray(shape, dtype=dtype, buffer=self.shm.buf, offset=self.offsets[index])
+
+    def __enter__(self) -> "SharedArrays":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Unmap the block, and unlink it if this process created it.
+           Views still alive keep the memory mapped until they're released,
+           but an unlinked block is freed by the OS once they're gone
+        """
+        try:
+            self.shm.close()
+        except BufferError:
+            pass
+        if self.owned:
+            self.owned = False
+            try:
+                self.shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+class SharedViews:
+    """Views of arrays in blocks created by another process, from their
+       `SharedArrays.location`. Each block is attached once, however many
+       arrays are viewed in it, and only ever closed
+    """
+
+    def __init__(self):
+        self.blocks: dict = dict()
+
+    def __getitem__(self, location: tuple) -> np.ndarray:
+        """View of an array, valid until the views are closed"""
+        name, offset, shape, dtype, tracker = location
+        if name not in self.blocks:
+            self.blocks[name] = _attach_untracked(name, tracker)
+        return np.ndarray(shape, dtype=dtype, buffer=self.blocks[name].buf, offset=offset)
+
+    def __enter__(self) -> "SharedViews":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        """Unmap every attached block"""
+        for shm in self.blocks.values():
+            try:
+                shm.close()
+            except BufferError:
+                pass
+        self.blocks.clear()
+
+
+def _convert_task(task: tuple) -> Union[tuple, None]:
+    """Convert one texture in a worker process, reading it from the input
+       block and writing it into the output block. Only the converted
+       image's palette and TLUT mode, if it has a palette, are sent back
+    """
+    from n64tex.formats import Formats
+
+    data_location, palette_location, output_location, fmt, tlut, width, height, target = task
+    with SharedViews() as views:
+        cls = Formats[fmt].value
+        if cls.indexed:
+            texture = cls(views[data_location], width, height, views[palette_location], tlut)
+        else:
+            texture = cls(views[data_location], width, height)
+        converted = texture.convert_to(Formats[target].value, out=views[output_location])
+        palette = None
+        if converted.palette is not None:
+            # RGBA decoded from CI images keeps their palette too
+            palette = np.array(converted.palette), converted.tlut
+        # Nothing may still view the blocks when they're closed
+        del texture, converted
+        return palette
+
+
+def convert_batch(textures: list, output_format: str, processes: Union[int, Executor] = None) -> list:
+    """Convert many textures on a pool of processes, sharing their data
+       through shared memory rather than pickling it. Every texture's data
+       and each distinct palette are copied once into a shared input block,
+       workers convert straight into a shared output block, and the results
+       are copied out once at the end. Each task is only sent the format,
+       dimensions and locations of its own arrays, so its size doesn't grow
+       with the batch. Both blocks are unlinked however the batch ends, even
+       if a worker crashes, but only once none of the batch's tasks can
+       still be running on the pool
+
+    Args:
+        textures (list[N64TextureFormat]): Textures to convert
+        output_format (str): Name of the format to convert every texture to
+        processes (int | Executor, optional): Number of processes, or a process pool to submit to. Defaults to None,
+            which uses one process per CPU
+
+    Raises:
+        ValueError: If the output format or a texture's format is unknown
+        concurrent.futures.process.BrokenProcessPool: If a worker process dies
+
+    Returns:
+        list[N64TextureFormat]: Converted textures, in the same order
+    """
+    from n64tex.formats import Formats, Palette
+
+    if output_format not in Formats.__members__:
+        raise ValueError(f"Unknown output format {output_format!r}")
+    target = Formats[output_format].value
+    textures = list(textures)
+    if not textures:
+        return list()
+    names = {fmt.value: fmt.name for fmt in Formats}
+    for texture in textures:
+        if type(texture) not in names:
+            raise ValueError(f"{type(texture).__name__} isn't a format that can be converted in a batch")
+
+    # Palettes go after every texture's data, each distinct one only once
+    layouts = [(np.shape(texture.data_array), np.asarray(texture.data_array).dtype.newbyteorder("=")) for texture in textures]
+    palette_indices = dict()
+    for texture in textures:
+        if texture.indexed:
+            palette = Palette.of(texture.palette)
+            if palette.digest not in palette_indices:
+                palette_indices[palette.digest] = len(layouts)
+                layouts.append(((len(palette),), np.dtype(np.uint16)))
+
+    if isinstance(processes, Executor):
+        executor, owned = processes, False
+    else:
+        executor, owned = ProcessPoolExecutor(processes or os.cpu_count() or 1), True
+
+    inputs = outputs = None
+    futures = list()
+    try:
+        inputs = SharedArrays(layouts)
+        outputs = SharedArrays([data_layout(target, texture.width, texture.height) for texture in textures])
+        tasks = list()
+        for index, texture in enumerate(textures):
+            inputs[index][...] = texture.data_array
+            palette_location = None
+            if texture.indexed:
+                palette = Palette.of(texture.palette)
+                palette_index = palette_indices[palette.digest]
+                inputs[palette_index][...] = palette.colours
+                palette_location = inputs.location(palette_index)
+            tasks.append((
+                inputs.location(index),
+                palette_location,
+                outputs.location(index),
+                names[type(texture)],
+                getattr(texture, "tlut", "rgba5551"),
+                texture.width,
+                texture.height,
+                output_format,
+            ))
+        futures = [executor.submit(_convert_task, task) for task in tasks]
+
+        converted = list()
+        for index, (texture, future) in enumerate(zip(textures, futures)):
+            palette = future.result()
+            data_array = np.array(outputs[index])
+            if target.indexed:
+                colours, tlut = palette
+                image = target(data_array, texture.width, texture.height, Palette.of(colours), tlut)
+            else:
+                image = target(data_array, texture.width, texture.height)
+                if palette is not None:
+                    colours, image.tlut = palette
+                    image.palette = Palette.of(colours)
+            converted.append(image)
+        return converted
+    finally:
+        # A caller's pool may still be running the batch's other tasks, which
+        # mustn't find the blocks unlinked under them
+        for future in futures:
+            future.cancel()
+        wait(futures)
+        for block in (inputs, outputs):
+            if block is not None:
+                block.close()
+        if owned:
+            executor.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,505 @@
+import os
+import json
+import time
+import shutil
+import hashlib
+import pathlib
+
+from concurrent.futures import ThreadPoolExecutor
+
+from n64tex import FORMAT_CHOICES, add_png_arguments, convert_file, parse_formats, parse_size
+from n64tex.stats import ConversionStats, summarise
+
+MANIFEST_NAME = ".n64tex-manifest.json"
+MANIFEST_VERSION = 1
+
+
+def _hash_file(path: pathlib.Path) -> str:
+    """Hash the contents of a file
+
+    Args:
+        path (pathlib.Path): File to hash
+
+    Returns:
+        str: Hex digest of the file contents
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fil:
+        for chunk in iter(lambda: fil.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class BuildManifest:
+    """Record of every converted file in a build, keyed by the source path
+       relative to the source directory. Each entry holds the source's size,
+       mtime and hash, the conversion parameters used and the outputs written
+    """
+
+    def __init__(self, path: pathlib.Path, entries: dict = None):
+        """Initializer for a manifest
+
+        Args:
+            path (pathlib.Path): Where the manifest lives on disk
+            entries (dict, optional): Existing manifest entries. Defaults to None.
+        """
+        self.path: pathlib.Path = pathlib.Path(path)
+        self.entries: dict = entries or dict()
+
+    @classmethod
+    def load(cls, path: pathlib.Path) -> "BuildManifest":
+        """Load a manifest from disk. A missing or unreadable manifest
+           results in an empty manifest, meaning everything is rebuilt
+
+        Args:
+            path (pathlib.Path): Manifest file to read
+
+        Returns:
+            BuildManifest: Loaded manifest
+        """
+        try:
+            with open(path, 'r') as fil:
+                data = json.load(fil)
+        except (OSError, ValueError):
+            return cls(path)
+        if data.get("version") != MANIFEST_VERSION:
+            return cls(path)
+        return cls(path, data.get("entries"))
+
+    def save(self):
+        """Write the manifest to disk"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(temp_path, 'w') as fil:
+            json.dump({"version": MANIFEST_VERSION, "entries": self.entries}, fil, indent=1, sort_keys=True)
+        os.replace(temp_path, self.path)
+
+
+class BuildResult:
+    """Summary of a single build run"""
+
+    def __init__(self):
+        self.converted: list = list()
+        self.skipped: list = list()
+        self.removed: list = list()
+        self.failed: dict = dict()
+        self.stats: dict = dict()
+        self.duplicates: dict = dict()
+
+    def __bool__(self):
+        return bool(self.converted or self.removed or self.failed)
+
+    def __repr__(self):
+        return (
+            f"<BuildResult converted={len(self.converted)} skipped={len(self.skipped)} "
+            f"removed={len(self.removed)} failed={len(self.failed)}>"
+        )
+
+
+def default_output_dir(source_dir: pathlib.Path, output_format) -> pathlib.Path:
+    """Default output directory for a build, which sits next to the
+       source directory and is prefixed with the output format
+
+    Args:
+        source_dir (pathlib.Path): Directory being built
+        output_format (str | list[str]): Output image format, or several
+
+    Returns:
+        pathlib.Path: Output directory
+    """
+    source_dir = pathlib.Path(source_dir).resolve()
+    return source_dir.with_name(f'{"_".join(parse_formats(output_format))}_{source_dir.name}')
+
+
+def _scan(source_dir: pathlib.Path, pattern: str, exclude: pathlib.Path) -> dict:
+    """Find every source file in a directory without following the output directory
+
+    Args:
+        source_dir (pathlib.Path): Directory to scan
+        pattern (str): Glob pattern source files must match
+        exclude (pathlib.Path): Directory to skip over
+
+    Returns:
+        dict: Mapping of relative path to `os.stat_result`
+    """
+    found = dict()
+    stack = [source_dir]
+    while stack:
+        directory = stack.pop()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                path = pathlib.Path(entry.path)
+                if entry.is_dir(follow_symlinks=False):
+                    if path != exclude:
+                        stack.append(path)
+                elif entry.is_file() and path.match(pattern):
+                    found[path.relative_to(source_dir).as_posix()] = entry.stat()
+    return found
+
+
+def _output_files(sources: dict, output_dir: pathlib.Path) -> dict:
+    """Output file of every source, its relative path with a .png suffix
+
+    Args:
+        sources (dict): Mapping of relative path to `os.stat_result`, as `_scan` finds them
+        output_dir (pathlib.Path): Directory outputs are written to
+
+    Raises:
+        ValueError: If sources differing only by their suffix, such as "a.png" and "a.bin", would share an output
+
+    Returns:
+        dict: Mapping of relative path to output file
+    """
+    output_files = dict()
+    claimed = dict()
+    for relative_path in sorted(sources):
+        output_file = (output_dir / relative_path).with_suffix(".png")
+        if output_file in claimed:
+            raise ValueError(f"{claimed[output_file]} and {relative_path} would both be written to {output_file}")
+        claimed[output_file] = relative_path
+        output_files[relative_path] = output_file
+    return output_files
+
+
+def _remove_outputs(output_dir: pathlib.Path, outputs: list, keep: list = ()) -> list:
+    """Delete previously written outputs
+
+    Args:
+        output_dir (pathlib.Path): Directory the outputs are relative to
+        outputs (list): Relative paths of outputs to delete
+        keep (list, optional): Relative paths that should survive. Defaults to ().
+
+    Returns:
+        list[pathlib.Path]: Paths that were deleted
+    """
+    removed = list()
+    for output in outputs:
+        if output in keep:
+            continue
+        path = output_dir / output
+        try:
+            path.unlink()
+        except FileNotFoundError:
+            continue
+        removed.append(path)
+    return removed
+
+
+def _copy_outputs(written: list, source_output: pathlib.Path, output_file: pathlib.Path) -> list:
+    """Copy the outputs of one source to the names another source's
+       outputs would have. Output names are the output file's stem or name
+       with an optional prefix, so only that part of each name changes
+
+    Args:
+        written (list[pathlib.Path]): Outputs of the source being copied
+        source_output (pathlib.Path): Output file of the source being copied
+        output_file (pathlib.Path): Output file of the duplicate
+
+    Raises:
+        ValueError: If an output's name doesn't end in the output file's name or stem
+
+    Returns:
+        list[pathlib.Path]: Paths that were written
+    """
+    copied = list()
+    for path in written:
+        for old, new in ((source_output.name, output_file.name), (source_output.stem, output_file.stem)):
+            if path.name.endswith(old):
+                target = output_file.parent / (path.name[:len(path.name) - len(old)] + new)
+                break
+        else:
+            raise ValueError(f"Can't tell which output of {output_file.name} {path.name} corresponds to")
+        shutil.copyfile(path, target)
+        copied.append(target)
+    return copied
+
+
+def build(
+    source_dir,
+    output_format,
+    output_dir=None,
+    input_format: str = "rgba",
+    width: int = None,
+    height: int = None,
+    palette=None,
+    write_bytes: bool = False,
+    force_rgba: bool = False,
+    pattern: str = "*",
+    max_memory: int = None,
+    dedup: bool = False,
+    tlut: str = "rgba5551",
+    compress_level=None,
+    png_strategy: str = None,
+    threads: int = None,
+) -> BuildResult:
+    """Incrementally convert every file in a directory. Files are only
+       reconverted when they are new, their contents or conversion parameters
+       have changed, or their outputs have gone missing. Outputs belonging
+       to deleted sources are removed
+
+    Args:
+        source_dir (str | pathlib.Path): Directory of files to convert
+        output_format (str | list[str]): Output image format, or several as a list or comma separated string
+        output_dir (str | pathlib.Path, optional): Directory to write to. Defaults to `<output_format>_<source_dir>`
+        input_format (str, optional): Input image format. Defaults to "rgba"
+        width (int, optional): Width of raw byte images. Defaults to inferring it from each file's size
+        height (int, optional): Height of raw byte images. Defaults to inferring it from each file's size
+        palette (str | pathlib.Path, optional): File containing palette information. Defaults to None
+        write_bytes (bool, optional): Whether to also write bytes files. Defaults to False
+        force_rgba (bool, optional): Save 'RGBA' images rather than each format's native mode. Defaults to False
+        pattern (str, optional): Glob pattern source files must match. Defaults to "*"
+        max_memory (int, optional): Convert each file in chunks of rows to bound the working memory to roughly
+            this many bytes. Files are always converted one at a time. Defaults to None
+        dedup (bool, optional): Convert byte-identical sources once and copy the outputs to the others. Defaults to False
+        tlut (str, optional): Whether CI palettes, read and written, hold "rgba5551" or "ia16" colours. Defaults to "rgba5551"
+        compress_level (int | str, optional): PNG compression level, see `n64tex.convert_file`. Defaults to None
+        png_strategy (str, optional): PNG compression strategy, see `n64tex.convert_file`. Defaults to None
+        threads (int, optional): Convert and write this many files at once. zlib releases the GIL, so PNG encoding
+            runs in parallel. Defaults to None, which converts one file at a time
+
+    Raises:
+        ValueError: If two sources would be written to the same output, see `_output_files`
+
+    Returns:
+        BuildResult: What was converted, skipped and removed
+    """
+    source_dir = pathlib.Path(source_dir).resolve()
+    if output_dir is None:
+        output_dir = default_output_dir(source_dir, output_format)
+    output_dir = pathlib.Path(output_dir).resolve()
+
+    params = {
+        "input_format": input_format,
+        "output_format": ",".join(parse_formats(output_format)),
+        "width": width,
+        "height": height,
+        "palette": _hash_file(pathlib.Path(palette)) if palette else None,
+        "write_bytes": write_bytes,
+        "force_rgba": force_rgba,
+    }
+    # Only recorded when set, so existing manifests stay valid
+    if tlut != "rgba5551":
+        params["tlut"] = tlut
+    if compress_level is not None:
+        params["compress_level"] = compress_level
+    if png_strategy is not None:
+        params["png_strategy"] = png_strategy
+
+    def convert(relative_path: str, output_file: pathlib.Path, stats: ConversionStats) -> list:
+        return convert_file(
+            source_dir / relative_path,
+            output_format,
+            input_format=input_format,
+            output_file=output_file,
+            width=width,
+            height=height,
+            palette=palette,
+            write_bytes=write_bytes,
+            force_rgba=force_rgba,
+            max_memory=max_memory,
+            stats=stats,
+            tlut=tlut,
+            compress_level=compress_level,
+            png_strategy=png_strategy,
+        )
+
+    manifest = BuildManifest.load(output_dir / MANIFEST_NAME)
+    result = BuildResult()
+    refreshed = False
+    converted_digests = dict()
+    sources = _scan(source_dir, pattern, output_dir)
+    # Checked before anything is removed or written, as colliding sources would overwrite each other
+    output_files = _output_files(sources, output_dir)
+
+    # Remove the outputs of anything that no longer exists
+    for relative_path in list(manifest.entries):
+        if relative_path not in sources:
+            entry = manifest.entries.pop(relative_path)
+            result.removed.extend(_remove_outputs(output_dir, entry["outputs"]))
+
+    pending = list()
+    for relative_path, stat in sorted(sources.items()):
+        entry = manifest.entries.get(relative_path)
+        outputs_exist = entry is not None and all((output_dir / output).exists() for output in entry["outputs"])
+        if entry is not None and entry["params"] == params and outputs_exist:
+            if entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                result.skipped.append(relative_path)
+                continue
+
+            # Touched but not modified, so only the recorded stat needs refreshing
+            digest = _hash_file(source_dir / relative_path)
+            if digest == entry["sha256"]:
+                entry["mtime_ns"] = stat.st_mtime_ns
+                entry["size"] = stat.st_size
+                refreshed = True
+                result.skipped.append(relative_path)
+                continue
+        else:
+            digest = _hash_file(source_dir / relative_path)
+
+        output_file = output_files[relative_path]
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        pending.append((relative_path, stat, entry, digest, output_file))
+
+    # With threads, every source that isn't a duplicate is converted up front.
+    # Results are still recorded in order, so duplicates find their first copy done
+    futures = dict()
+    executor = ThreadPoolExecutor(threads) if threads else None
+    try:
+        if executor is not None:
+            first_copies = dict()
+            for relative_path, _, _, digest, output_file in pending:
+                if not dedup or first_copies.setdefault(digest, relative_path) == relative_path:
+                    stats = ConversionStats()
+                    futures[relative_path] = (executor.submit(convert, relative_path, output_file, stats), stats)
+
+        for relative_path, stat, entry, digest, output_file in pending:
+            stats = ConversionStats()
+            try:
+                if dedup and digest in converted_digests:
+                    source_path, source_output, source_written = converted_digests[digest]
+                    written = _copy_outputs(source_written, source_output, output_file)
+                    result.duplicates[relative_path] = source_path
+                elif relative_path in futures:
+                    future, stats = futures[relative_path]
+                    written = future.result()
+                else:
+                    written = convert(relative_path, output_file, stats)
+            except Exception as exc:
+                result.failed[relative_path] = exc
+                continue
+
+            outputs = [path.relative_to(output_dir).as_posix() for path in written]
+            if entry is not None:
+                result.removed.extend(_remove_outputs(output_dir, entry["outputs"], keep=outputs))
+            manifest.entries[relative_path] = {
+                "mtime_ns": stat.st_mtime_ns,
+                "size": stat.st_size,
+                "sha256": digest,
+                "params": params,
+                "outputs": outputs,
+            }
+            result.converted.append(relative_path)
+            if relative_path not in result.duplicates:
+                result.stats[relative_path] = stats
+                converted_digests.setdefault(digest, (relative_path, output_file, written))
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if result or refreshed or not manifest.path.exists():
+        manifest.save()
+    return result
+
+
+def watch(source_dir, output_format, interval: float = 1.0, iterations: int = None, callback=None, **kwargs):
+    """Poll a directory and rebuild it whenever files change
+
+    Args:
+        source_dir (str | pathlib.Path): Directory of files to convert
+        output_format (str | list[str]): Output image format, or several
+        interval (float, optional): Seconds to wait between polls. Defaults to 1.0
+        iterations (int, optional): Stop after this many polls. Defaults to None, which polls forever
+        callback (Callable[[BuildResult], None], optional): Called with the result of every build that did something
+        **kwargs: Forwarded to `build`
+    """
+    count = 0
+    while iterations is None or count < iterations:
+        result = build(source_dir, output_format, **kwargs)
+        if result and callback is not None:
+            callback(result)
+        count += 1
+        if iterations is None or count < iterations:
+            time.sleep(interval)
+
+
+def _report(result: BuildResult):
+    """Print the result of a build"""
+    for relative_path in result.converted:
+        if relative_path in result.duplicates:
+            print(f"copied {relative_path} from {result.duplicates[relative_path]}")
+        else:
+            print(f"converted {relative_path}")
+    for path in result.removed:
+        print(f"removed {path}")
+    for relative_path, exc in result.failed.items():
+        print(f"failed {relative_path}: {exc}")
+
+
+def _report_json(result: BuildResult):
+    """Print the stats of a build as a single line of JSON"""
+    print(json.dumps(summarise(
+        list(result.stats.values()),
+        converted=len(result.converted),
+        skipped=len(result.skipped),
+        removed=len(result.removed),
+        duplicates=len(result.duplicates),
+        failed={relative_path: str(exc) for relative_path, exc in result.failed.items()},
+    )))
+
+
+def build_cli(argv: list):
+    """Command line util for the `build` and `watch` commands"""
+    import argparse
+
+    from n64tex.formats.palette import TLUT_MODES
+
+    parser = argparse.ArgumentParser(prog=f"n64tex {argv[0]}")
+
+    parser.add_argument("source_dir", help="Directory of files to convert")
+    parser.add_argument(
+        "output_format",
+        help=f"Output image format, or several separated by commas. One of {', '.join(FORMAT_CHOICES)}",
+        type=str,
+    )
+
+    parser.add_argument("--input_format", "-i", help="Input image format", type=str, choices=FORMAT_CHOICES, default="rgba")
+    parser.add_argument("--width", type=int, help="Width of raw byte images. Defaults to inferring it from each file's size")
+    parser.add_argument("--height", type=int, help="Height of raw byte images. Defaults to inferring it from each file's size")
+    parser.add_argument("--palette", help="File containing palette information. Only required for CI4/CI8 input format")
+    parser.add_argument("--tlut", help="Colour format of CI palettes. Defaults to rgba5551", choices=TLUT_MODES, default="rgba5551")
+    parser.add_argument("--output_dir", "-o", help="Output directory. Defaults to <output_format>_<source_dir>", type=str)
+    parser.add_argument("--write_bytes", "-b", action="store_true", help="Write bytes files")
+    parser.add_argument("--force_rgba", action="store_true", help="Save RGBA images rather than each format's native mode")
+    parser.add_argument("--pattern", help="Glob pattern source files must match. Defaults to *", default="*")
+    parser.add_argument("--max_memory", type=parse_size, help="Convert in chunks to keep working memory under this size, e.g. 64M")
+    parser.add_argument("--dedup", action="store_true", help="Convert identical files once and copy their outputs")
+    parser.add_argument("--stats", choices=["json"], help="Print sizes, timings and throughput instead of a file list")
+    parser.add_argument("--threads", type=int, help="Convert and write this many files at once. Defaults to one at a time")
+    add_png_arguments(parser)
+    if argv[0] == "watch":
+        parser.add_argument("--interval", type=float, help="Seconds between polls. Defaults to 1", default=1.0)
+
+    args = parser.parse_args(argv[1:])
+    try:
+        parse_formats(args.output_format)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    kwargs = dict(
+        output_dir=args.output_dir,
+        input_format=args.input_format,
+        width=args.width,
+        height=args.height,
+        palette=args.palette,
+        write_bytes=args.write_bytes,
+        force_rgba=args.force_rgba,
+        pattern=args.pattern,
+        max_memory=args.max_memory,
+        dedup=args.dedup,
+        tlut=args.tlut,
+        compress_level=args.compress_level,
+        png_strategy=args.png_strategy,
+        threads=args.threads,
+    )
+
+    report = _report_json if args.stats == "json" else _report
+    try:
+        if argv[0] == "watch":
+            watch(args.source_dir, args.output_format, interval=args.interval, callback=report, **kwargs)
+        else:
+            report(build(args.source_dir, args.output_format, **kwargs))
+    except KeyboardInterrupt:
+        pass
+    except ValueError as exc:
+        parser.error(str(exc))
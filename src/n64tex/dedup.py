@@ -0,0 +1,162 @@
+import os
+import hashlib
+
+from collections.abc import Mapping
+
+import numpy as np
+
+
+def _new_digest():
+    return hashlib.blake2b(digest_size=16)
+
+
+def raw_digest(obj) -> str:
+    """Hash a format object's format, dimensions, data, palette and TLUT
+       mode, see `BaseImage.content_hash`
+
+    Args:
+        obj (N64TextureFormat): Format object
+
+    Returns:
+        str: Hex digest, equal for byte-identical textures
+    """
+    return obj.content_hash
+
+
+def decoded_digest(obj) -> str:
+    """Hash a format object's decoded RGBA pixels, so textures that only
+       differ in how they're stored, such as CI images with reordered
+       palettes, hash the same
+
+    Args:
+        obj (N64TextureFormat): Format object
+
+    Returns:
+        str: Hex digest, equal for pixel-identical textures
+    """
+    from n64tex.formats import RGBAImage
+
+    rgba_image = obj.convert_to(RGBAImage)
+    digest = _new_digest()
+    digest.update(f"{rgba_image.width}x{rgba_image.height}:".encode("ascii"))
+    digest.update(np.ascontiguousarray(rgba_image.data_array, dtype=np.uint8))
+    return digest.hexdigest()
+
+
+def file_digest(path) -> str:
+    """Hash the contents of a file
+
+    Args:
+        path (str | pathlib.Path): File to hash
+
+    Returns:
+        str: Hex digest, equal for byte-identical files
+    """
+    digest = _new_digest()
+    with open(path, 'rb') as fil:
+        for chunk in iter(lambda: fil.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def decoded_file_digest(path) -> str:
+    """Hash the decoded RGBA pixels of an image file. Raw texture files
+       can't be decoded without knowing their format, so they aren't hashed
+
+    Args:
+        path (str | pathlib.Path): File to hash
+
+    Returns:
+        str | None: Hex digest, or None if the file isn't an image file
+    """
+    from n64tex.formats import RGBAImage
+    from n64tex.sniff import HEADER_SIZE, is_image, open_image
+
+    with open(path, 'rb') as fil:
+        if not is_image(fil.read(HEADER_SIZE)):
+            return None
+    image = open_image(path)
+    if image is None:
+        return None
+    return decoded_digest(RGBAImage.from_image(image))
+
+
+class DedupResult:
+    """Groups of duplicate textures. Every group lists its members in the
+       order they were given, the first of which is the canonical
+       representative that should be converted or stored
+    """
+
+    def __init__(self):
+        self.groups: list = list()
+        self.canonical: dict = dict()
+
+    @property
+    def unique(self) -> list:
+        """Canonical representative of every group"""
+        return [group[0] for group in self.groups]
+
+    @property
+    def duplicates(self) -> list:
+        """Groups with more than one member"""
+        return [group for group in self.groups if len(group) > 1]
+
+    def __len__(self) -> int:
+        return len(self.groups)
+
+    def __repr__(self):
+        return f"<DedupResult unique={len(self.groups)} total={len(self.canonical)}>"
+
+
+def _keyed(items):
+    """Pair every item with a key. Mappings keep their keys, files are
+       keyed by their path and format objects by their position
+    """
+    if isinstance(items, Mapping):
+        yield from items.items()
+        return
+    for index, item in enumerate(items):
+        if isinstance(item, (str, os.PathLike)):
+            yield item, item
+        else:
+            yield index, item
+
+
+def find_duplicates(items, decoded: bool = False) -> DedupResult:
+    """Group byte-identical textures together, and optionally textures
+       that decode to the same pixels. Each distinct texture is only hashed
+       once, so decoding is skipped for byte-identical copies
+
+    Args:
+        items (Mapping | Iterable): Format objects or file paths, either as a
+            mapping from key to item or an iterable of them
+        decoded (bool, optional): Also group textures whose decoded RGBA
+            pixels match. Defaults to False
+
+    Returns:
+        DedupResult: Groups of duplicates and the canonical key of every item
+    """
+    result = DedupResult()
+    by_raw = dict()
+    by_decoded = dict()
+    groups = dict()
+
+    for key, item in _keyed(items):
+        is_file = isinstance(item, (str, os.PathLike))
+        raw = file_digest(item) if is_file else raw_digest(item)
+
+        canonical = by_raw.get(raw)
+        if canonical is None:
+            canonical = by_raw[raw] = key
+            if decoded:
+                pixels = decoded_file_digest(item) if is_file else decoded_digest(item)
+                if pixels is not None:
+                    canonical = by_raw[raw] = by_decoded.setdefault(pixels, key)
+
+        result.canonical[key] = canonical
+        if canonical in groups:
+            groups[canonical].append(key)
+        else:
+            groups[canonical] = [key]
+            result.groups.append(groups[canonical])
+    return result
@@ -0,0 +1,269 @@
+import os
+import json
+import pathlib
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator
+
+from n64tex.formats.base import split_threads
+from n64tex.texpack import _offset, load_texture, rom_bytes
+
+
+def iter_manifest(manifest) -> Iterator[dict]:
+    """Entries of a JSON lines manifest, one texture per line, read a line
+       at a time so the manifest is never held in memory. Blank lines are
+       skipped
+
+    Args:
+        manifest (str | pathlib.Path | Iterable[dict]): Manifest file, or the entries themselves
+
+    Raises:
+        ValueError: If a line isn't valid JSON
+
+    Yields:
+        dict: Manifest entries
+    """
+    if not isinstance(manifest, (str, os.PathLike)):
+        yield from manifest
+        return
+    with open(manifest, 'r') as fil:
+        for line_number, line in enumerate(fil, 1):
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as exc:
+                raise ValueError(f"{manifest} line {line_number} isn't valid JSON: {exc}") from exc
+
+
+def stream(func: Callable, items: Iterable, threads=None, max_pending: int = None) -> Iterator:
+    """Apply a function to items on a pool of threads, yielding results as
+       they finish. Items are only pulled from the iterable while fewer than
+       `max_pending` are in flight, and no more are started until finished
+       results are consumed, so memory stays flat however many items there
+       are. Closing the generator early cancels whatever hasn't started
+
+    Args:
+        func (Callable): Called with each item on a worker thread
+        items (Iterable): Items to process, read lazily
+        threads (int | Executor | tuple[Executor, int], optional): Number of threads, or an executor to
+            submit to, optionally paired with its number of workers as in `n64tex.formats.base.split_threads`.
+            Defaults to None, which uses one thread per CPU
+        max_pending (int, optional): Most items in flight at once. Defaults to twice the number of threads
+
+    Raises:
+        ValueError: If `threads` pairs an executor with an invalid number of workers
+
+    Yields:
+        Results of `func`, in the order they finish
+    """
+    executor, workers = split_threads(threads)
+    owned = executor is None
+    if owned:
+        workers = workers or os.cpu_count() or 1
+        executor = ThreadPoolExecutor(workers)
+    max_pending = max(max_pending or 2 * workers, 1)
+
+    items = iter(items)
+    pending = set()
+    done_marker = object()
+    try:
+        exhausted = False
+        while True:
+            while not exhausted and len(pending) < max_pending:
+                item = next(items, done_marker)
+                if item is done_marker:
+                    exhausted = True
+                    break
+                pending.add(executor.submit(func, item))
+            if not pending:
+                return
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+    finally:
+        for future in pending:
+            future.cancel()
+        if owned:
+            executor.shutdown(wait=True)
+
+
+def extract(rom_path: str, manifest, process: Callable = None, threads=None, max_pending: int = None) -> Iterator[tuple]:
+    """Stream the textures a manifest lists out of a ROM. The ROM is memory
+       mapped and textures are loaded, and optionally processed, on a
+       bounded pool of threads as described in `stream`, so only the pages
+       of the ROM being read and the textures in flight are held in memory
+
+    Args:
+        rom_path (str): ROM file, in any byte order. Byteswapped ROMs are swapped into memory first
+        manifest (str | pathlib.Path | Iterable[dict]): JSON lines manifest file or its entries, as described in
+            `n64tex.texpack.load_texture`
+        process (Callable, optional): Called on the worker with each texture and its entry, its result being
+            yielded in place of the texture. Defaults to None
+        threads (int | Executor, optional): Number of threads, or an executor to submit to. Defaults to None,
+            which uses one thread per CPU
+        max_pending (int, optional): Most textures in flight at once. Defaults to twice the number of threads
+
+    Raises:
+        ValueError: If the ROM or an entry is invalid, raised when that entry's result is reached
+
+    Yields:
+        tuple[int, dict, N64TextureFormat]: Position of each entry in the manifest, the entry and its texture,
+            or the result of `process`, in the order they finish
+    """
+    rom = rom_bytes(rom_path)
+
+    def load(numbered_entry):
+        number, entry = numbered_entry
+        texture = load_texture(rom, entry, number)
+        if process is not None:
+            texture = process(texture, entry)
+        return number, entry, texture
+
+    yield from stream(load, enumerate(iter_manifest(manifest)), threads, max_pending)
+
+
+def entry_name(entry: dict, number: int = 0) -> str:
+    """Name of an extracted texture's files, the entry's "name" if it has
+       one, otherwise its offset and format such as "001A2B30_rgba5551".
+       Names can contain directories, but must stay inside the output
+       directory
+
+    Args:
+        entry (dict): Manifest entry
+        number (int, optional): Position of the entry in its manifest, for error messages. Defaults to 0
+
+    Raises:
+        ValueError: If the name is absolute or has a ".." in it, or the entry has no name and no valid offset and format
+
+    Returns:
+        str: Name, without a suffix
+    """
+    try:
+        if entry.get("name"):
+            name = str(entry["name"])
+        else:
+            name = f"{_offset(entry['offset']):08X}_{entry['format']}"
+    except (AttributeError, KeyError, TypeError, ValueError) as exc:
+        raise ValueError(f"Invalid manifest entry {number}: {exc}") from exc
+    path = pathlib.PurePath(name)
+    if path.anchor or ".." in path.parts:
+        raise ValueError(f"Manifest entry {number} is named {name!r}, which is outside the output directory")
+    return name
+
+
+def extract_to(
+    rom_path: str,
+    manifest,
+    output_dir: str,
+    output_format: str = None,
+    write_bytes: bool = False,
+    force_rgba: bool = False,
+    threads=None,
+    max_pending: int = None,
+    compress_level=None,
+    png_strategy: str = None,
+) -> Iterator[list]:
+    """Extract the textures a manifest lists from a ROM to image files, each
+       written on the worker that loaded it as soon as it's loaded. Files
+       are named as in `entry_name`, and each entry's name is checked as
+       it's read from the manifest, before its texture is loaded
+
+    Args:
+        rom_path (str): ROM file, in any byte order
+        manifest (str | pathlib.Path | Iterable[dict]): JSON lines manifest file or its entries
+        output_dir (str): Directory to write to
+        output_format (str, optional): Format to convert every texture to first. Defaults to None, keeping each texture's own
+        write_bytes (bool, optional): Also write a bytes file, and a palette bytes file for CI textures. Defaults to False
+        force_rgba (bool, optional): Save 'RGBA' images rather than each format's native mode. Defaults to False
+        threads (int | Executor, optional): Number of threads, or an executor to submit to. Defaults to None,
+            which uses one thread per CPU
+        max_pending (int, optional): Most textures in flight at once. Defaults to twice the number of threads
+        compress_level (int | str, optional): PNG compression level, see `n64tex.formats.base.png_options`. Defaults to None
+        png_strategy (str, optional): PNG compression strategy, see `n64tex.formats.base.png_options`. Defaults to None
+
+    Raises:
+        ValueError: If the ROM, an entry, the output format or a PNG option is invalid, or two entries have the same name
+
+    Yields:
+        list[pathlib.Path]: Paths written for each texture, in the order they finish
+    """
+    from n64tex.formats import Formats
+    from n64tex.formats.base import png_options
+
+    png_options(compress_level, png_strategy)
+    output_dir = pathlib.Path(output_dir)
+    target = None
+    if output_format is not None:
+        if output_format not in Formats.__members__:
+            raise ValueError(f"Unknown output format {output_format!r}")
+        target = Formats[output_format].value
+
+    def named_entries():
+        # Only the names are kept, so two entries never write the same files
+        numbers = dict()
+        for number, entry in enumerate(iter_manifest(manifest)):
+            name = entry_name(entry, number)
+            if name in numbers:
+                raise ValueError(f"Manifest entries {numbers[name]} and {number} are both named {name!r}")
+            numbers[name] = number
+            yield entry
+
+    def write(texture, entry):
+        if target is not None:
+            texture = texture.convert_to(target)
+        path = output_dir / f"{entry_name(entry)}.png"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        texture.save(path, force_rgba=force_rgba, compress_level=compress_level, strategy=png_strategy)
+        written = [path]
+        if write_bytes:
+            written.append(path.with_suffix(""))
+            written[-1].write_bytes(texture.to_bytes())
+            if texture.palette is not None:
+                written.append(path.parent / f"palette_{path.stem}")
+                written[-1].write_bytes(texture.palette.to_bytes())
+        return written
+
+    for _, _, written in extract(rom_path, named_entries(), write, threads, max_pending):
+        yield written
+
+
+def extract_cli(argv: list):
+    """Command line util for the `extract` command"""
+    import argparse
+
+    from n64tex import FORMAT_CHOICES, add_png_arguments
+
+    parser = argparse.ArgumentParser(prog="n64tex extract")
+
+    parser.add_argument("rom", help="ROM to read textures from, in any byte order")
+    parser.add_argument("manifest", help="JSON lines manifest of the textures in the ROM, one per line")
+    parser.add_argument("--output_dir", "-o", help="Output directory. Defaults to the current directory", type=str, default=".")
+    parser.add_argument("--output_format", help="Convert every texture to this format first", choices=FORMAT_CHOICES)
+    parser.add_argument("--write_bytes", "-b", action="store_true", help="Write a bytes file")
+    parser.add_argument("--force_rgba", action="store_true", help="Save RGBA images rather than each format's native mode")
+    parser.add_argument("--threads", type=int, help="Threads to extract with. Defaults to one per CPU")
+    parser.add_argument("--max_pending", type=int, help="Most textures in flight at once. Defaults to twice the number of threads")
+    add_png_arguments(parser)
+
+    args = parser.parse_args(argv[1:])
+
+    count = 0
+    try:
+        for _ in extract_to(
+            args.rom,
+            args.manifest,
+            args.output_dir,
+            output_format=args.output_format,
+            write_bytes=args.write_bytes,
+            force_rgba=args.force_rgba,
+            threads=args.threads,
+            max_pending=args.max_pending,
+            compress_level=args.compress_level,
+            png_strategy=args.png_strategy,
+        ):
+            count += 1
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    print(f"Extracted {count} textures to {args.output_dir}")
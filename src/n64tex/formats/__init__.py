@@ -6,10 +6,14 @@ from n64tex.formats.i4 import I4Image
 from n64tex.formats.i4a import I4AImage
 from n64tex.formats.i8 import I8Image
 from n64tex.formats.i8a import I8AImage
+from n64tex.formats.ia16 import IA16Image
 from n64tex.formats.ci4 import CI4Image
 from n64tex.formats.ci8 import CI8Image
+from n64tex.formats.palette import Palette
 from n64tex.formats.rgba import RGBAImage
 from n64tex.formats.rgba5551 import RGBA5551Image
+from n64tex.formats.stack import FrameStack
+from n64tex.formats.yuv16 import YUV16Image
 
 
 class Formats(Enum):
@@ -17,10 +21,12 @@ class Formats(Enum):
     i4a = I4AImage
     i8 = I8Image
     i8a = I8AImage
+    ia16 = IA16Image
     ci4 = CI4Image
     ci8 = CI8Image
     rgba = RGBAImage
     rgba5551 = RGBA5551Image
+    yuv16 = YUV16Image
 
     def __str__(self):
         return self.name
@@ -30,8 +36,10 @@ N64TextureFormat = Union[
     I4AImage,
     I8Image,
     I8AImage,
+    IA16Image,
     CI4Image,
     CI8Image,
     RGBAImage,
     RGBA5551Image,
+    YUV16Image,
 ]
\ No newline at end of file
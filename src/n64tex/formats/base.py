@@ -1,5 +1,10 @@
-from typing import TypeVar, TYPE_CHECKING
+import os
+import copy
+import hashlib
+
+from typing import Callable, TypeVar, TYPE_CHECKING, Union
 from abc import ABC, abstractclassmethod
+from concurrent.futures import Executor, ThreadPoolExecutor
 
 import numpy as np
 from PIL import Image
@@ -7,12 +12,341 @@ from PIL import Image
 T = TypeVar("T", bound="BaseImage")
 
 if TYPE_CHECKING:
-    from n64tex.formats import RGBAImage, RGBA5551Image, I4Image, I8Image, I4AImage, I8AImage, CI4Image, CI8Image
+    from n64tex.formats import RGBAImage, RGBA5551Image, I4Image, I8Image, I4AImage, I8AImage, IA16Image, CI4Image, CI8Image, YUV16Image
+
+
+# A number of threads, an executor, or an executor and how many workers it has
+Threads = Union[int, Executor, tuple, None]
+
+
+class ImageDiff:
+    """Pixels that differ between two images of the same size, such as two
+       builds of a texture, so only what changed needs exporting again
+    """
+
+    def __init__(self, mask: np.ndarray):
+        """Initializer that takes the changed pixel mask
+
+        Args:
+            mask (np.ndarray): (height, width) bool array, True where pixels differ
+        """
+        self.mask: np.ndarray = mask
+        rows, columns = np.flatnonzero(mask.any(axis=1)), np.flatnonzero(mask.any(axis=0))
+        # (left, top, right, bottom) with right and bottom exclusive, as PIL crops take them
+        self.bbox: tuple = None
+        if len(rows):
+            self.bbox = (int(columns[0]), int(rows[0]), int(columns[-1]) + 1, int(rows[-1]) + 1)
+
+    @property
+    def changed(self) -> int:
+        """Number of pixels that differ"""
+        return int(np.count_nonzero(self.mask))
+
+    def __bool__(self) -> bool:
+        return self.bbox is not None
+
+    def __repr__(self):
+        return f"<ImageDiff changed={self.changed} bbox={self.bbox}>"
+
+
+# Generous upper bound on the temporaries a conversion kernel allocates per
+# pixel on top of its output, such as the intp indices np.take casts to
+KERNEL_BYTES_PER_PIXEL = 16
+
+# Size of the colour presence and palette index tables the CI encoders use
+PALETTE_TABLE_BYTES = 2 * 0x10000
+
+# Named zlib compression levels for PNGs. "raw" stores the pixels
+# uncompressed, for intermediate files that are written once and read soon
+COMPRESS_LEVELS = {"raw": 0, "fast": 1, "default": 6, "best": 9}
+
+# zlib strategies for PNGs, as Pillow's compress_type
+PNG_STRATEGIES = {"default": 0, "filtered": 1, "huffman": 2, "rle": 3, "fixed": 4}
+
+
+def png_options(compress_level: Union[int, str, None] = None, strategy: str = None) -> dict:
+    """Pillow save arguments for a PNG compression level and strategy
+
+    Args:
+        compress_level (int | str, optional): zlib level from 0-9, or one of "raw", "fast", "default" or "best".
+            Defaults to None, Pillow's default
+        strategy (str, optional): One of "default", "filtered", "huffman", "rle" or "fixed". "rle" and
+            "huffman" are much faster than the default on flat textures. Defaults to None, Pillow's default
+
+    Raises:
+        ValueError: If the level or strategy is unknown
+
+    Returns:
+        dict: Keyword arguments for `PIL.Image.Image.save`
+    """
+    options = dict()
+    if compress_level is not None:
+        level = COMPRESS_LEVELS.get(compress_level, compress_level)
+        if isinstance(level, str) or level not in range(10):
+            raise ValueError(f"Unknown compress_level {compress_level!r}, expected 0-9 or one of {tuple(COMPRESS_LEVELS)}")
+        options["compress_level"] = level
+    if strategy is not None:
+        if strategy not in PNG_STRATEGIES:
+            raise ValueError(f"Unknown PNG strategy {strategy!r}, expected one of {tuple(PNG_STRATEGIES)}")
+        options["compress_type"] = PNG_STRATEGIES[strategy]
+    return options
+
+
+def budget_rows(max_memory: int, row_bytes: int) -> int:
+    """Number of rows that can be converted at once without their working
+       memory going over a budget
+
+    Args:
+        max_memory (int | None): Memory budget in bytes, or None for no limit
+        row_bytes (int): Working memory needed per row
+
+    Raises:
+        ValueError: If the budget isn't positive
+
+    Returns:
+        int | None: Rows per chunk, at least 1, or None if there's no limit
+    """
+    if max_memory is None:
+        return None
+    if max_memory <= 0:
+        raise ValueError(f"max_memory must be a positive number of bytes, not {max_memory}")
+    return max(1, max_memory // max(row_bytes, 1))
+
+
+def split_threads(threads: Threads) -> tuple:
+    """Split a `threads` argument into an executor, if there is one, and the
+       number of workers to plan for. Executors don't expose how many
+       workers they have, so one given on its own is planned for as one
+       worker per CPU, and `(executor, workers)` says how many it has
+
+    Args:
+        threads (int | Executor | tuple[Executor, int] | None): Number of threads, an executor, or an executor
+            and its number of workers
+
+    Raises:
+        ValueError: If an executor is paired with something other than a positive number of workers
+
+    Returns:
+        tuple[Executor | None, int | None]: Executor and number of workers, or None and `threads` as given
+    """
+    if isinstance(threads, tuple):
+        executor, workers = threads
+        if not isinstance(executor, Executor) or not isinstance(workers, int) or workers < 1:
+            raise ValueError(f"Expected an executor and a positive number of workers, not {threads!r}")
+        return executor, workers
+    if isinstance(threads, Executor):
+        return threads, os.cpu_count() or 1
+    return None, threads
+
+
+def _map_bands(kernel: Callable, source: np.ndarray, out: np.ndarray, executor: Executor, band_count: int):
+    """Split rows into `band_count` bands and convert them on an executor"""
+    rows = out.shape[0]
+    bounds = np.linspace(0, rows, band_count + 1).astype(int)
+    bands = [(start, stop) for start, stop in zip(bounds[:-1], bounds[1:]) if stop > start]
+    futures = [executor.submit(kernel, source[start:stop], out[start:stop]) for start, stop in bands]
+    for future in futures:
+        future.result()
+
+
+def map_row_bands(
+    kernel: Callable, source: np.ndarray, out: np.ndarray, threads: Threads = None, chunk_rows: int = None
+) -> np.ndarray:
+    """Run a conversion kernel over an image, optionally splitting it into
+       bands of rows that are converted concurrently. Kernels are called as
+       `kernel(source_band, out_band)` and must only use Numpy operations
+       that release the GIL, writing their result into `out_band`. With
+       `chunk_rows` the rows are converted in successive chunks, so the
+       kernel's temporaries never cover more than that many rows at once
+
+    Args:
+        kernel (Callable): Conversion kernel
+        source (np.ndarray): Source array, split along its first axis
+        out (np.ndarray): Preallocated output array, split along its first axis
+        threads (int | Executor | tuple[Executor, int], optional): Number of threads, or an executor to
+            submit bands to, optionally paired with its number of workers as in `split_threads`. An executor
+            gets one band per worker. Defaults to None, which converts on the calling thread
+        chunk_rows (int, optional): Most rows to convert at once. Defaults to None, which converts every row at once
+
+    Returns:
+        np.ndarray: The output array
+    """
+    rows = out.shape[0]
+    executor, band_count = split_threads(threads)
+    band_count = band_count or 1
+    chunk_rows = max(min(chunk_rows or rows, rows), 1)
+    band_count = min(band_count, chunk_rows)
+
+    chunks = [(start, min(start + chunk_rows, rows)) for start in range(0, rows, chunk_rows)] or [(0, rows)]
+    if band_count <= 1:
+        for start, stop in chunks:
+            kernel(source[start:stop], out[start:stop])
+        return out
+
+    if executor is None:
+        with ThreadPoolExecutor(band_count) as executor:
+            for start, stop in chunks:
+                _map_bands(kernel, source[start:stop], out[start:stop], executor, band_count)
+    else:
+        for start, stop in chunks:
+            _map_bands(kernel, source[start:stop], out[start:stop], executor, band_count)
+    return out
+
+
+def lookup_kernel(lookup: np.ndarray) -> Callable:
+    """Build a kernel that replaces every value with its row in a lookup table
+
+    Args:
+        lookup (np.ndarray): Lookup table indexed by the source values
+
+    Returns:
+        Callable: Kernel for `map_row_bands`
+    """
+
+    def kernel(source: np.ndarray, out: np.ndarray):
+        np.take(lookup, source, axis=0, out=out)
+
+    return kernel
+
+
+def output_array(out: np.ndarray, shape: tuple, dtype) -> np.ndarray:
+    """Check a caller supplied output array, or allocate one if there isn't one
+
+    Args:
+        out (np.ndarray | None): Caller supplied output array
+        shape (tuple): Required shape
+        dtype (np.dtype): Required dtype
+
+    Raises:
+        ValueError: If the output array doesn't have the right shape or dtype,
+            or isn't C-contiguous
+
+    Returns:
+        np.ndarray: Array to write the result into
+    """
+    if out is None:
+        return np.empty(shape, dtype=dtype)
+    if out.shape != tuple(shape) or out.dtype != np.dtype(dtype):
+        raise ValueError(f"Output array must have shape {tuple(shape)} and dtype {np.dtype(dtype)}, not {out.shape} and {out.dtype}")
+    if not out.flags.c_contiguous or not out.flags.writeable:
+        raise ValueError("Output array must be C-contiguous and writeable")
+    return out
+
+
+def frombuffer(raw_bytes: bytes, dtype: str, shape: tuple, out: np.ndarray = None, native: bool = True) -> np.ndarray:
+    """Wrap raw bytes in a Numpy array of the given shape. Arrays are in
+       native byte order unless asked otherwise, so values wider than a byte
+       are byteswapped in a single pass as they're copied in, and arithmetic
+       on them never swaps again. Values that are already in native byte
+       order and exactly the right size are a view of the bytes rather than
+       a copy, which means they're read-only for immutable inputs such as
+       `bytes`. Otherwise the data is copied and truncated or zero padded to
+       fit
+
+    Args:
+        raw_bytes (bytes): Any object supporting the buffer protocol
+        dtype (str): Numpy dtype of the data, in the byte order it's stored in
+        shape (tuple): Shape of the resulting array
+        out (np.ndarray, optional): Array to copy the data into instead. Defaults to None.
+        native (bool, optional): Swap the values into native byte order. Defaults to True. Formats whose
+            conversions only index tables with their values pass False, as they'd gain nothing from the swap
+
+    Returns:
+        np.ndarray: Array of the given shape, in native byte order if `native` is True
+    """
+    data_array = np.frombuffer(raw_bytes, dtype=dtype)
+    if out is not None:
+        out = output_array(out, shape, out.dtype)
+        flat = out.reshape(-1)
+        count = min(flat.size, data_array.size)
+        flat[:count] = data_array[:count]
+        flat[count:] = 0
+        return out
+    if native and not data_array.dtype.isnative:
+        data_array = data_array.astype(data_array.dtype.newbyteorder("="))
+    if data_array.size == np.prod(shape):
+        return data_array.reshape(shape)
+    data_array = np.array(data_array)
+    data_array.resize(shape, refcheck=False)
+    return data_array
+
+
+def unpack_nibbles(raw_bytes: bytes, shape: tuple, out: np.ndarray = None) -> np.ndarray:
+    """Split raw bytes into two 4 bit values each, high nibble first. The
+       values are truncated or zero padded to fit the shape
+
+    Args:
+        raw_bytes (bytes): Any object supporting the buffer protocol
+        shape (tuple): Shape of the resulting array
+        out (np.ndarray, optional): uint8 array to write the values into. Defaults to None.
+
+    Returns:
+        np.ndarray: uint8 array of the given shape
+    """
+    packed = np.frombuffer(raw_bytes, dtype=np.uint8)
+    data_array = output_array(out, shape, np.uint8)
+    flat = data_array.reshape(-1)
+
+    high, low = flat[0::2], flat[1::2]
+    high_count, low_count = min(high.size, packed.size), min(low.size, packed.size)
+    np.right_shift(packed[:high_count], 4, out=high[:high_count])
+    np.bitwise_and(packed[:low_count], 0x0F, out=low[:low_count])
+    high[high_count:] = 0
+    low[low_count:] = 0
+    return data_array
+
+
+def palette_image_arrays(image: Image.Image, width: int, height: int, max_colours: int, tlut: str = "rgba5551") -> tuple:
+    """Read the indices and palette straight out of a 'P' mode PIL Image,
+       converting only the palette to RGBA5551 or IA16
+
+    Args:
+        image (PIL.Image): 'P' mode PIL Image object
+        width (int): Expected width of the image
+        height (int): Expected height of the image
+        max_colours (int): Largest palette the target format supports
+        tlut (str, optional): "rgba5551" or "ia16" palette colours. Defaults to "rgba5551"
+
+    Returns:
+        tuple[np.ndarray, np.ndarray] | None: Index array and palette,
+            or None if the image can't be used as is
+    """
+    from n64tex.formats.palette import tlut_encoder
+
+    data_array = np.asarray(image)
+    if data_array.shape != (height, width):
+        return None
+
+    colour_count = int(data_array.max()) + 1 if data_array.size else 1
+    if image.palette.mode == "RGBA":
+        palette = np.array(image.getpalette("RGBA"), dtype=np.uint8).reshape(-1, 4)
+    else:
+        palette = np.empty((len(image.getpalette("RGB")) // 3, 4), dtype=np.uint8)
+        palette[:, :3] = np.reshape(image.getpalette("RGB"), (-1, 3))
+        palette[:, 3] = 255
+        transparency = image.info.get("transparency")
+        if isinstance(transparency, bytes):
+            alpha = np.frombuffer(transparency[:len(palette)], dtype=np.uint8)
+            palette[:len(alpha), 3] = alpha
+        elif isinstance(transparency, int) and transparency < len(palette):
+            palette[transparency, 3] = 0
+
+    if colour_count > len(palette) or colour_count > max_colours:
+        return None
+    if len(palette) > max_colours:
+        palette = palette[:colour_count]
+
+    return data_array, tlut_encoder(tlut)(palette)
 
 
 class BaseImage(ABC):
     """Base class to derive image format classes from"""
 
+    bits_per_pixel: int = None
+    indexed: bool = False
+    # How palette colours are read, for CI images and RGBA images decoded from them
+    tlut: str = "rgba5551"
+
     def __init__(self, data_array: np.array, width: int, height: int, palette: np.array = None):
         """Initializer that takes in Numpy array, width, and height. This
            shouldn't be called directly unless you know what you're doing.
@@ -30,6 +364,138 @@ class BaseImage(ABC):
         self.height: int = height
         self.palette: np.array = palette
 
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        """Expose the underlying data to Numpy without copying it, following
+           Numpy 2's copy semantics
+
+        Args:
+            dtype (np.dtype, optional): Dtype to convert to. Defaults to None.
+            copy (bool, optional): True to always copy, False to never copy, or None to copy only when
+                converting to another dtype. Defaults to None.
+
+        Raises:
+            ValueError: If `copy` is False but converting to `dtype` needs a copy
+
+        Returns:
+            np.ndarray: The data array
+        """
+        if dtype is not None and np.dtype(dtype) != self.data_array.dtype:
+            if copy is False:
+                raise ValueError(f"Converting {self.data_array.dtype} data to {np.dtype(dtype)} requires a copy")
+            return self.data_array.astype(dtype)
+        if copy:
+            return self.data_array.copy()
+        return self.data_array
+
+    @property
+    def __array_interface__(self) -> dict:
+        """Numpy array interface of the underlying data, which lets PIL and
+           other tools read it without a copy
+        """
+        return self.data_array.__array_interface__
+
+    def __buffer__(self, flags: int) -> memoryview:
+        """Buffer protocol support, exposing the underlying data without
+           copying it. Python only looks for `__buffer__` from 3.12, so on
+           older versions use `memoryview(np.asarray(image))` instead
+
+        Args:
+            flags (int): Buffer request flags
+
+        Raises:
+            BufferError: If the data can't be exported as the flags request, such as a contiguous buffer of strided data
+
+        Returns:
+            memoryview: View of the data array
+        """
+        return self.data_array.__buffer__(flags)
+
+    def _canonical_data(self) -> np.ndarray:
+        """Data array in little endian byte order, C-contiguous. Only copied
+           when it's stored another way
+        """
+        data_array = np.asarray(self.data_array)
+        return np.ascontiguousarray(data_array, dtype=data_array.dtype.newbyteorder("<"))
+
+    @property
+    def content_hash(self) -> str:
+        """Content hash of the format, dimensions, data, palette and TLUT
+           mode, hashed straight from the underlying buffers. Equal images
+           hash the same however their data is stored. It isn't cached, as
+           the data array can be written to
+
+        Returns:
+            str: Hex digest
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(f"{type(self).__name__}:{self.width}x{self.height}:".encode("ascii"))
+        digest.update(self._canonical_data())
+        if self.palette is not None:
+            from n64tex.formats.palette import Palette
+
+            digest.update(f"palette:{self.tlut}:{Palette.of(self.palette).digest}".encode("ascii"))
+        return digest.hexdigest()
+
+    def _same_palette(self, other: "BaseImage") -> bool:
+        if self.palette is None or other.palette is None:
+            return self.palette is other.palette
+        from n64tex.formats.palette import Palette
+
+        # Palettes are interned, so equal ones are usually the same object
+        return self.tlut == other.tlut and (
+            self.palette is other.palette or Palette.of(self.palette).digest == Palette.of(other.palette).digest
+        )
+
+    def __eq__(self, other) -> bool:
+        """Images are equal when they are the same format and size with the
+           same data and palette, compared without encoding either to bytes.
+           Data arrays must have the same shape and dtype, in any byte order,
+           so equal images always have the same `content_hash`
+        """
+        if not isinstance(other, BaseImage):
+            return NotImplemented
+        data_array, other_data = np.asarray(self.data_array), np.asarray(other.data_array)
+        return (
+            type(self) is type(other)
+            and (self.width, self.height) == (other.width, other.height)
+            and data_array.shape == other_data.shape
+            and data_array.dtype.newbyteorder("<") == other_data.dtype.newbyteorder("<")
+            and self._same_palette(other)
+            and np.array_equal(data_array, other_data)
+        )
+
+    # Images are mutable, so they aren't hashable. Key dictionaries and sets
+    # on `content_hash` instead
+    __hash__ = None
+
+    def diff(self, other: "BaseImage") -> ImageDiff:
+        """Find the pixels that differ from another image of the same size.
+           Images of the same format and palette are compared by their data,
+           anything else by their decoded RGBA pixels
+
+        Args:
+            other (N64TextureFormat): Image to compare against
+
+        Raises:
+            ValueError: If the images aren't the same size
+
+        Returns:
+            ImageDiff: Changed pixel mask and its bounding box
+        """
+        if (self.width, self.height) != (other.width, other.height):
+            raise ValueError(f"Can't diff a {self.width}x{self.height} image against a {other.width}x{other.height} one")
+
+        if type(self) is type(other) and self._same_palette(other):
+            ours, theirs = np.asarray(self.data_array), np.asarray(other.data_array)
+        else:
+            from n64tex.formats.rgba import RGBAImage
+
+            ours, theirs = self.convert_to(RGBAImage).data_array, other.convert_to(RGBAImage).data_array
+        mask = ours != theirs
+        if mask.ndim > 2:
+            mask = mask.any(axis=tuple(range(2, mask.ndim)))
+        return ImageDiff(mask.reshape(self.height, self.width))
+
     @abstractclassmethod
     def from_bytes(cls, raw_bytes: bytes, width: int, height: int):
         ...
@@ -58,30 +524,120 @@ class BaseImage(ABC):
         if not issubclass(cls, RGBAImage):
             return RGBAImage.from_image(image, width, height).convert_to(cls)
 
-        return cls.from_bytes(image.tobytes(), width, height)
+        if image.mode != "RGBA":
+            image = image.convert("RGBA")
+
+        data_array = np.asarray(image)
+        if data_array.shape[:2] != (height, width):
+            return cls.from_bytes(data_array, width, height)
+        return cls(data_array, width, height)
     
-    def convert_to(self, cls: T) -> T:
+    def _rows(self, start: int, stop: int) -> T:
+        """The same image cut down to a band of rows, sharing its data"""
+        band = copy.copy(self)
+        band.data_array = self.data_array[start:stop]
+        band.height = stop - start
+        return band
+
+    def convert_to(self, cls: T, threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> T:
         """Generic method for converting to another format
 
         Args:
             cls (T): Image format to convert to
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated array for the converted data. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
+
+        Returns:
+            T: Converted image
+        """
+        return self._via_rgba("convert_to", threads, out, max_memory, indexed=getattr(cls, "indexed", False), cls=cls)
+
+    def _via_rgba(self, method: str, threads: Threads, out: np.ndarray, max_memory: int, indexed: bool = False, **kwargs):
+        """Convert by way of RGBA. With a memory budget, the RGBA
+           intermediate is only ever decoded a chunk of rows at a time, with
+           each chunk converted straight into the output. Indexed targets
+           first need a pass over every chunk to find the palette
+
+        Args:
+            method (str): Name of the RGBAImage method to convert with
+            threads (int | Executor, optional): Convert bands of rows concurrently
+            out (np.ndarray, optional): Preallocated array for the converted data
+            max_memory (int, optional): Working memory budget in bytes, or None for no limit
+            indexed (bool, optional): Whether the target format needs a palette. Defaults to False
+            **kwargs: Forwarded to the RGBAImage method
 
         Returns:
             T: Converted image
         """
-        return self.to_rgba().convert_to(cls)
+        if max_memory is not None and indexed:
+            # The colour presence and palette index tables are needed whatever the chunk size
+            max_memory = max(max_memory - PALETTE_TABLE_BYTES, 1)
+        # Each chunk needs its RGBA rows and, for the first chunk, up to as many bytes again of output
+        rows = budget_rows(max_memory, self.width * (8 + KERNEL_BYTES_PER_PIXEL))
+        if rows is None or rows >= self.height:
+            return getattr(self.to_rgba(threads=threads), method)(threads=threads, out=out, **kwargs)
+
+        from n64tex.formats.palette import Palette, tlut_encoder
+
+        tlut = kwargs.get("tlut") or self.tlut
+        rgba_band = np.empty((rows, self.width, 4), dtype=np.uint8)
+
+        def rgba_bands():
+            for start in range(0, self.height, rows):
+                stop = min(start + rows, self.height)
+                yield start, stop, self._rows(start, stop).to_rgba(threads=threads, out=rgba_band[:stop - start])
+
+        palette = self.palette if tlut == self.tlut else None
+        if indexed and palette is None:
+            encoder = tlut_encoder(tlut)
+            present = np.zeros(0x10000, dtype=bool)
+            for _, _, rgba_image in rgba_bands():
+                present[encoder(rgba_image.data_array)] = True
+            palette = Palette.of(np.flatnonzero(present))
+
+        converted = data_array = None
+        for start, stop, rgba_image in rgba_bands():
+            rgba_image.palette, rgba_image.tlut = palette, tlut
+            if converted is None:
+                # The first chunk decides the dtype and shape of the output
+                converted = getattr(rgba_image, method)(threads=threads, **kwargs)
+                data_array = output_array(out, (self.height,) + converted.data_array.shape[1:], converted.data_array.dtype)
+                data_array[start:stop] = converted.data_array
+            else:
+                getattr(rgba_image, method)(threads=threads, out=data_array[start:stop], **kwargs)
+        # The first chunk's result is only ours, so it takes over the whole output
+        converted.data_array, converted.height = data_array, self.height
+        return converted
+
+    def to_image(self, force_rgba: bool = False) -> Image.Image:
+        """Convert to a PIL Image. Formats override this to use the most
+           compact PIL mode that can represent them, such as 'LA' for
+           intensity formats or 'P' for CI formats
+
+        Args:
+            force_rgba (bool, optional): Always produce an 'RGBA' image. Defaults to False
+
+        Returns:
+            PIL.Image.Image: PIL Image object
+        """
+        if hasattr(self, "to_rgba"):
+            return Image.fromarray(np.asarray(self.to_rgba()))
+        return Image.fromarray(np.asarray(self))
 
-    def save(self, filename: str):
+    def save(self, filename: str, force_rgba: bool = False, compress_level: Union[int, str] = None, strategy: str = None):
         """Saves Format Object to a file using PIL
 
         Args:
             filename (str): Filename to save to
+            force_rgba (bool, optional): Save as 'RGBA' rather than the format's native mode. Defaults to False
+            compress_level (int | str, optional): PNG compression level, see `png_options`. Defaults to None
+            strategy (str, optional): PNG compression strategy, see `png_options`. Defaults to None
+
+        Raises:
+            ValueError: If the compression level or strategy is unknown
         """
-        if hasattr(self, "to_rgba"):
-            image = Image.fromarray(self.to_rgba().data_array)
-        else:
-            image = Image.fromarray(self.data_array)
-        image.save(filename)
+        self.to_image(force_rgba).save(filename, **png_options(compress_level, strategy))
 
     def to_bytes(self) -> bytes:
         """Return image bytes
@@ -89,63 +645,141 @@ class BaseImage(ABC):
         Returns:
             bytes: Image bytes
         """
-        if self.data_array.dtype == np.uint16:
-            return self.data_array.astype('>u2').tobytes()
-        return self.data_array.tobytes()
-
-
-    def to_rgba5551(self) -> "RGBA5551Image":
+        if self.bits_per_pixel == 4:
+            # Two pixels per byte, padding odd pixel counts with a zero nibble
+            data_array = np.ravel(self.data_array).astype(np.uint8)
+            if data_array.size % 2:
+                data_array = np.append(data_array, np.uint8(0))
+            return ((data_array[0::2] << 4) | (data_array[1::2] & 0x0F)).tobytes()
+        data_array = np.asarray(self.data_array)
+        if data_array.dtype.itemsize > 1:
+            # Swapped back to big endian in one pass, as the N64 stores it
+            return data_array.astype(data_array.dtype.newbyteorder(">")).tobytes()
+        return data_array.tobytes()
+
+
+    def to_rgba5551(self, threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "RGBA5551Image":
         """Convert to RGBA5551Image
 
+        Args:
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width) uint16 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
+
         Returns:
             RGBA5551Image: Converted RGBA5551Image object
         """
-        return self.to_rgba().to_rgba5551()
+        return self._via_rgba("to_rgba5551", threads, out, max_memory)
 
-    def to_i4(self) -> "I4Image":
+    def to_i4(self, weighting: str = "mean", threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "I4Image":
         """Convert to I4Image
 
+        Args:
+            weighting (str, optional): "mean" or "rec601" luma weighting. Defaults to "mean"
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width) uint8 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
+
         Returns:
             I4Image: Converted I4Image object
         """
-        return self.to_rgba().to_i4()
+        return self._via_rgba("to_i4", threads, out, max_memory, weighting=weighting)
 
-    def to_i8(self) -> "I8Image":
+    def to_i8(self, weighting: str = "mean", threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "I8Image":
         """Convert to I8Image
 
+        Args:
+            weighting (str, optional): "mean" or "rec601" luma weighting. Defaults to "mean"
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width) uint8 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
+
         Returns:
             I8Image: Converted I8Image object
         """
-        return self.to_rgba().to_i8()
+        return self._via_rgba("to_i8", threads, out, max_memory, weighting=weighting)
 
-    def to_i4a(self) -> "I4AImage":
+    def to_i4a(self, weighting: str = "mean", threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "I4AImage":
         """Convert to I4AImage
 
+        Args:
+            weighting (str, optional): "mean" or "rec601" luma weighting. Defaults to "mean"
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width) uint8 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
+
         Returns:
             I4AImage: Converted I4AImage object
         """
-        return self.to_rgba().to_i4a()
+        return self._via_rgba("to_i4a", threads, out, max_memory, weighting=weighting)
 
-    def to_i8a(self) -> "I8AImage":
+    def to_i8a(self, weighting: str = "mean", threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "I8AImage":
         """Convert to I8AImage
 
+        Args:
+            weighting (str, optional): "mean" or "rec601" luma weighting. Defaults to "mean"
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width) uint8 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
+
         Returns:
             I8AImage: Converted I8AImage object
         """
-        return self.to_rgba().to_i8a()
+        return self._via_rgba("to_i8a", threads, out, max_memory, weighting=weighting)
     
-    def to_ci4(self) -> "CI4Image":
+    def to_ia16(self, weighting: str = "mean", threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "IA16Image":
+        """Convert to IA16Image
+
+        Args:
+            weighting (str, optional): "mean" or "rec601" luma weighting. Defaults to "mean"
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width) uint16 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
+
+        Returns:
+            IA16Image: Converted IA16Image object
+        """
+        return self._via_rgba("to_ia16", threads, out, max_memory, weighting=weighting)
+
+    def to_yuv16(self, threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "YUV16Image":
+        """Convert to YUV16Image
+
+        Args:
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width) uint16 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
+
+        Returns:
+            YUV16Image: Converted YUV16Image object
+        """
+        return self._via_rgba("to_yuv16", threads, out, max_memory)
+
+    def to_ci4(self, palette=None, tlut: str = None, threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "CI4Image":
         """Convert to CI4Image
 
+        Args:
+            palette (Palette | np.ndarray, optional): Fixed palette to map onto, see `RGBAImage.to_ci4`. Defaults to None
+            tlut (str, optional): "rgba5551" or "ia16" palette colours. Defaults to this image's TLUT mode
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width) uint8 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
+
         Returns:
             CI4Image: Converted CI4Image object
         """
-        return self.to_rgba().to_ci4()
+        return self._via_rgba("to_ci4", threads, out, max_memory, indexed=palette is None, palette=palette, tlut=tlut)
     
-    def to_ci8(self) -> "CI8Image":
+    def to_ci8(self, palette=None, tlut: str = None, threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "CI8Image":
         """Convert to CI8Image
 
+        Args:
+            palette (Palette | np.ndarray, optional): Fixed palette to map onto, see `RGBAImage.to_ci8`. Defaults to None
+            tlut (str, optional): "rgba5551" or "ia16" palette colours. Defaults to this image's TLUT mode
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width) uint8 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
+
         Returns:
             CI8Image: Converted CI8Image object
         """
-        return self.to_rgba().to_ci8()
\ No newline at end of file
+        return self._via_rgba("to_ci8", threads, out, max_memory, indexed=palette is None, palette=palette, tlut=tlut)
\ No newline at end of file
@@ -1,17 +1,29 @@
 import pathlib
 
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Union
 
 if TYPE_CHECKING:
     from n64tex.formats import RGBAImage
 
 import numpy as np
+from PIL import Image
 
-from n64tex.formats.base import BaseImage
+from n64tex.formats.base import (
+    KERNEL_BYTES_PER_PIXEL,
+    BaseImage,
+    Threads,
+    budget_rows,
+    lookup_kernel,
+    map_row_bands,
+    output_array,
+    palette_image_arrays,
+    unpack_nibbles,
+)
+from n64tex.formats.palette import Palette, check_tlut
 
 class CI4Image(BaseImage):
     """CI4 Image format. Each pixel is 4 bits long, which are pointers to an array of RGBA5551 colours
-       The palette can only have 16 colours
+       or, with the IA16 TLUT mode, IA16 colours. The palette can only have 16 colours
     
     The image follows this format:
     
@@ -31,8 +43,11 @@ class CI4Image(BaseImage):
         B = Blue channel from 0-31
         A = Alpha channel from 0-1
     """
+
+    bits_per_pixel: int = 4
+    indexed: bool = True
     
-    def __init__(self, data_array: np.array, width: int, height: int, palette: np.array = None):
+    def __init__(self, data_array: np.array, width: int, height: int, palette: Palette = None, tlut: str = "rgba5551"):
         """Initializer that takes in Numpy array, width, and height. This
            shouldn't be called directly unless you know what you're doing.
            Instead, you should call either the `from_image` or `from_bytes`
@@ -42,78 +57,120 @@ class CI4Image(BaseImage):
             data_array (np.array): Numpy array
             width (int): Width of image
             height (int): Height of image
-            palette (np.array, optional): Colour palette to use with this image. Defaults to None.
+            palette (Palette | np.array, optional): Colour palette to use with this image. Defaults to None.
+            tlut (str, optional): Whether the palette holds "rgba5551" or "ia16" colours. Defaults to "rgba5551"
         """
         assert palette is not None, "A palette is required for CI4 Images"
+        palette = Palette.of(palette)
         assert 16 >= len(palette) >= 1, f"CI4 Images can only support a palette of 16 colours.\nPalette has {len(palette)} colours"
         super().__init__(data_array, width, height, palette)
+        self.tlut: str = check_tlut(tlut)
     
     @classmethod
-    def from_bytes(cls, raw_bytes: bytes, width: int, height: int, palette_bytes: bytes) -> "CI4Image":
+    def from_bytes(cls, raw_bytes: bytes, width: int, height: int, palette_bytes, out: np.ndarray = None, tlut: str = "rgba5551") -> "CI4Image":
         """Generate an CI4Image from byte data
 
         Args:
             raw_bytes (bytes): Raw byte data to use
             width (int): Width of image
             height (int): Height of image
-            palette_bytes (bytes): Colour palette bytes to use with this image
+            palette_bytes (bytes | Palette): Colour palette bytes, or the palette itself, to use with this image
+            out (np.ndarray, optional): Preallocated (height, width) uint8 array for the indices. Defaults to None
+            tlut (str, optional): Whether the palette holds "rgba5551" or "ia16" colours. Defaults to "rgba5551"
 
         Returns:
             CI4Image: CI4Image object
         """
         # Image pointers
-        split_bytes = lambda x: ((x & 0xF0) >> 4, x & 0x0F)
-        data_array = np.frombuffer(raw_bytes, dtype=">u1")
-        data_array = np.array(np.ravel(np.column_stack(split_bytes(data_array))))
-        data_array.resize((height, width), refcheck=False)
+        data_array = unpack_nibbles(raw_bytes, (height, width), out)
         
         # Image palette
-        assert palette_bytes, "CI4 images require a palette to function"
-        palette = np.frombuffer(palette_bytes, dtype=">u2")
+        assert palette_bytes is not None and len(palette_bytes), "CI4 images require a palette to function"
+        palette = palette_bytes if isinstance(palette_bytes, Palette) else Palette.from_bytes(palette_bytes)
         
-        return cls(data_array, width, height, palette)
+        return cls(data_array, width, height, palette, tlut)
     
-    def to_rgba(self) -> "RGBAImage":
+    @classmethod
+    def from_image(cls, image: Image.Image, width: int = None, height: int = None, tlut: str = "rgba5551") -> "CI4Image":
+        """Takes a PIL Image and converts it to a CI4Image. 'P' mode images
+           with at most 16 colours are taken as is, with only their palette
+           converted to the TLUT mode's colours. Anything else goes through RGBA
+
+        Args:
+            image (PIL.Image): PIL Image object
+            width (int, optional): Optional width, will default to the Image's width
+            height (int, optional): Optional height, will default to the Image's height
+            tlut (str, optional): Whether the palette holds "rgba5551" or "ia16" colours. Defaults to "rgba5551"
+
+        Returns:
+            CI4Image: CI4Image object
+        """
+        if width is None:
+            width = image.width
+        if height is None:
+            height = image.height
+
+        if image.mode == "P":
+            arrays = palette_image_arrays(image, width, height, 16, tlut)
+            if arrays is not None:
+                data_array, palette = arrays
+                return cls(data_array, width, height, palette, tlut)
+
+        from n64tex.formats.rgba import RGBAImage
+
+        return RGBAImage.from_image(image, width, height).to_ci4(tlut=tlut)
+
+    def to_rgba(self, threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "RGBAImage":
         """Converts CI4Image to RGBAImage
 
+        Args:
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width, 4) uint8 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
+
         Returns:
             RGBAImage: Converted RGBAImage object
         """
-
-        def rgba5551_to_rgba(rgba5551_value):
-            r = (rgba5551_value & 0xF800) >> 8
-            g = (rgba5551_value & 0x7C0) >> 3
-            b = (rgba5551_value & 0x3E) << 2
-            a = 255 if rgba5551_value & 0x1 else 0
-            return r, g, b, a
-        
-        rgba_5551_data_array = self.palette.copy()
-
-        palette_data_array = list()
-        for pixel_colour in rgba_5551_data_array:
-            palette_data_array.append(rgba5551_to_rgba(pixel_colour))
-                
-        rgba_data_array = list()
-        for pointer in self.data_array.flatten():
-            rgba_data_array.append(palette_data_array[pointer])
-            
-        rgba_data_array = np.array(rgba_data_array, dtype=">u1")
-        rgba_data_array = np.resize(rgba_data_array, (self.height, self.width, 4))
+        rgba_data_array = output_array(out, (self.height, self.width, 4), np.uint8)
+        map_row_bands(lookup_kernel(self.palette.decoded(self.tlut)), self.data_array, rgba_data_array, threads, budget_rows(max_memory, self.width * KERNEL_BYTES_PER_PIXEL))
         
         from n64tex.formats.rgba import RGBAImage
 
-        return RGBAImage(rgba_data_array, self.width, self.height, self.palette)
+        rgba_image = RGBAImage(rgba_data_array, self.width, self.height, self.palette)
+        rgba_image.tlut = self.tlut
+        return rgba_image
     
-    def save(self, filename: str, save_palette: bool = False):
+    def to_image(self, force_rgba: bool = False) -> Image.Image:
+        """Convert to a 'P' PIL Image using the decoded palette, or 'RGBA' if forced
+
+        Args:
+            force_rgba (bool, optional): Always produce an 'RGBA' image. Defaults to False
+
+        Returns:
+            PIL.Image.Image: PIL Image object
+        """
+        if force_rgba:
+            return super().to_image(force_rgba)
+
+        data_array = np.ascontiguousarray(self.data_array, dtype=np.uint8)
+        image = Image.frombuffer("P", (self.width, self.height), data_array, "raw", "P", 0, 1)
+        image.putpalette(self.palette.decoded(self.tlut).tobytes(), rawmode="RGBA")
+        return image
+
+    def save(self, filename: str, save_palette: bool = False, force_rgba: bool = False, compress_level: Union[int, str] = None, strategy: str = None):
         """Saves Object to a file using PIL along with the palette
 
         Args:
             filename (str): Filename to save to
             save_palette (bool): Whether to save the palette or not. Defaults to False
+            force_rgba (bool, optional): Save as 'RGBA' rather than a 'P' image. Defaults to False
+            compress_level (int | str, optional): PNG compression level, see `n64tex.formats.base.png_options`. Defaults to None
+            strategy (str, optional): PNG compression strategy, see `n64tex.formats.base.png_options`. Defaults to None
         """
         if save_palette:
-            from n64tex.formats import RGBA5551Image
+            from n64tex.formats import IA16Image, RGBA5551Image
             filepath = pathlib.Path(filename)
-            palette = RGBA5551Image(self.palette, 4, 4)
-            palette.save(filepath.parent / f'palette_{filepath.name}')
-        super().save(filename)
\ No newline at end of file
+            palette_cls = IA16Image if self.tlut == "ia16" else RGBA5551Image
+            palette = palette_cls.from_bytes(self.palette.to_bytes(), 4, 4)
+            palette.save(filepath.parent / f'palette_{filepath.name}', compress_level=compress_level, strategy=strategy)
+        super().save(filename, force_rgba, compress_level, strategy)
\ No newline at end of file
@@ -4,8 +4,9 @@ if TYPE_CHECKING:
     from n64tex.formats import RGBAImage
 
 import numpy as np
+from PIL import Image
 
-from n64tex.formats.base import BaseImage
+from n64tex.formats.base import KERNEL_BYTES_PER_PIXEL, BaseImage, Threads, budget_rows, lookup_kernel, map_row_bands, output_array, unpack_nibbles
 
 
 class I4AImage(BaseImage):
@@ -21,29 +22,32 @@ class I4AImage(BaseImage):
     various shades of said colour
     """
 
+    bits_per_pixel: int = 4
+
     @classmethod
-    def from_bytes(cls, raw_bytes: bytes, width: int, height: int, *args, **kwargs) -> "I4AImage":
+    def from_bytes(cls, raw_bytes: bytes, width: int, height: int, *args, out: np.ndarray = None, **kwargs) -> "I4AImage":
         """Generate an I4AImage from byte data
 
         Args:
             raw_bytes (bytes): Raw byte data to use
             width (int): Width of image
             height (int): Height of image
+            out (np.ndarray, optional): Preallocated (height, width) uint8 array to unpack into. Defaults to None
 
         Returns:
             I4AImage: I4AImage object
         """
-        split_bytes = lambda x: ((x & 0xF0) >> 4, x & 0x0F)
-        data_array = np.frombuffer(raw_bytes, dtype=">u1")
-        data_array = np.array(np.ravel(np.column_stack(split_bytes(data_array))))
-        data_array.resize((height, width), refcheck=False)
+        data_array = unpack_nibbles(raw_bytes, (height, width), out)
         return cls(data_array, width, height)
 
-    def to_rgba(self, colour: tuple[int, int, int] = (255, 255, 255)) -> "RGBAImage":
+    def to_rgba(self, colour: tuple[int, int, int] = (255, 255, 255), threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "RGBAImage":
         """Converts I4AImage to RGBAImage
 
         Args:
             colour (tuple[int, int, int]): Colour to tint the image. Defaults to (255, 255, 255)
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width, 4) uint8 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
 
         Returns:
             RGBAImage: Converted RGBAImage object
@@ -61,16 +65,26 @@ class I4AImage(BaseImage):
             a = int(255 * alpha_value)
             return r, g, b, a
 
-        i4a_data_array = self.data_array.copy()
-
-        rgba_data_array = list()
-        for pixel_row in i4a_data_array:
-            for pixel_colour in pixel_row:
-                rgba_data_array.append(i4a_to_rgba(pixel_colour))
+        lookup = np.array([i4a_to_rgba(value) for value in range(16)], dtype=np.uint8)
 
-        rgba_data_array = np.array(rgba_data_array, dtype=">u1")
-        rgba_data_array = np.resize(rgba_data_array, (self.height, self.width, 4))
+        rgba_data_array = output_array(out, (self.height, self.width, 4), np.uint8)
+        map_row_bands(lookup_kernel(lookup), self.data_array, rgba_data_array, threads, budget_rows(max_memory, self.width * KERNEL_BYTES_PER_PIXEL))
 
         from n64tex.formats.rgba import RGBAImage
 
         return RGBAImage(rgba_data_array, self.width, self.height)
+
+    def to_image(self, force_rgba: bool = False) -> Image.Image:
+        """Convert to an 'LA' PIL Image, or 'RGBA' if forced
+
+        Args:
+            force_rgba (bool, optional): Always produce an 'RGBA' image. Defaults to False
+
+        Returns:
+            PIL.Image.Image: PIL Image object
+        """
+        if force_rgba:
+            return super().to_image(force_rgba)
+        intensity = ((self.data_array.astype(np.uint16) >> 1) * 255 // 7).astype(np.uint8)
+        alpha = (self.data_array.astype(np.uint8) & 0x1) * 255
+        return Image.fromarray(np.dstack((intensity, alpha)))
@@ -4,8 +4,9 @@ if TYPE_CHECKING:
     from n64tex.formats import RGBAImage
 
 import numpy as np
+from PIL import Image
 
-from n64tex.formats.base import BaseImage
+from n64tex.formats.base import KERNEL_BYTES_PER_PIXEL, BaseImage, Threads, budget_rows, frombuffer, lookup_kernel, map_row_bands, output_array
 
 
 class I8AImage(BaseImage):
@@ -21,28 +22,32 @@ class I8AImage(BaseImage):
     various shades of said colour
     """
 
+    bits_per_pixel: int = 8
+
     @classmethod
-    def from_bytes(cls, raw_bytes: bytes, width: int, height: int, *args, **kwargs) -> "I8AImage":
+    def from_bytes(cls, raw_bytes: bytes, width: int, height: int, *args, out: np.ndarray = None, **kwargs) -> "I8AImage":
         """Generate an I8AImage from byte data
 
         Args:
             raw_bytes (bytes): Raw byte data to use
             width (int): Width of image
             height (int): Height of image
+            out (np.ndarray, optional): Preallocated (height, width) uint8 array to copy into. Defaults to None
 
         Returns:
             I8AImage: I8AImage object
         """
-        data_array = np.frombuffer(raw_bytes, dtype=">u1")
-        data_array = np.array(data_array)
-        data_array.resize((height, width), refcheck=False)
+        data_array = frombuffer(raw_bytes, ">u1", (height, width), out)
         return cls(data_array, width, height)
 
-    def to_rgba(self, colour: tuple[int, int, int] = (255, 255, 255)) -> "RGBAImage":
+    def to_rgba(self, colour: tuple[int, int, int] = (255, 255, 255), threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "RGBAImage":
         """Converts I8AImage to RGBAImage
 
         Args:
             colour (tuple[int, int, int]): Colour to tint the image. Defaults to (255, 255, 255)
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width, 4) uint8 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
 
         Returns:
             RGBAImage: Converted RGBAImage object
@@ -60,16 +65,26 @@ class I8AImage(BaseImage):
             a = int(255 * (alpha_value / 15))
             return r, g, b, a
 
-        i8a_data_array = self.data_array.copy()
-
-        rgba_data_array = list()
-        for pixel_row in i8a_data_array:
-            for pixel_colour in pixel_row:
-                rgba_data_array.append(i8a_to_rgba(pixel_colour))
+        lookup = np.array([i8a_to_rgba(value) for value in range(256)], dtype=np.uint8)
 
-        rgba_data_array = np.array(rgba_data_array, dtype=">u1")
-        rgba_data_array = np.resize(rgba_data_array, (self.height, self.width, 4))
+        rgba_data_array = output_array(out, (self.height, self.width, 4), np.uint8)
+        map_row_bands(lookup_kernel(lookup), self.data_array, rgba_data_array, threads, budget_rows(max_memory, self.width * KERNEL_BYTES_PER_PIXEL))
 
         from n64tex.formats.rgba import RGBAImage
 
         return RGBAImage(rgba_data_array, self.width, self.height)
+
+    def to_image(self, force_rgba: bool = False) -> Image.Image:
+        """Convert to an 'LA' PIL Image, or 'RGBA' if forced
+
+        Args:
+            force_rgba (bool, optional): Always produce an 'RGBA' image. Defaults to False
+
+        Returns:
+            PIL.Image.Image: PIL Image object
+        """
+        if force_rgba:
+            return super().to_image(force_rgba)
+        intensity = (self.data_array.astype(np.uint8) >> 4) * 17
+        alpha = (self.data_array.astype(np.uint8) & 0xF) * 17
+        return Image.fromarray(np.dstack((intensity, alpha)))
@@ -0,0 +1,144 @@
+import functools
+
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from n64tex.formats import RGBAImage
+
+import numpy as np
+from PIL import Image
+
+from n64tex.formats.base import KERNEL_BYTES_PER_PIXEL, BaseImage, Threads, budget_rows, frombuffer, lookup_kernel, map_row_bands, output_array
+
+
+@functools.lru_cache(maxsize=None)
+def _rgba_table(colour: tuple) -> np.ndarray:
+    """RGBA8888 of every IA16 value with intensity tinted by a colour, as a
+       (65536, 4) uint8 table. Decoding a whole image is then a single gather
+    """
+    intensity = np.arange(256, dtype=np.float64)[:, None] / 255
+    table = np.empty((256, 256, 4), dtype=np.uint8)
+    table[..., :3] = np.clip(np.array(colour, dtype=np.float64) * intensity, 0, 255).astype(np.uint8)[:, None, :]
+    table[..., 3] = np.arange(256, dtype=np.uint8)
+    table = table.reshape(-1, 4)
+    table.flags.writeable = False
+    return table
+
+
+@functools.lru_cache(maxsize=None)
+def _luminance_table(weighting: str) -> np.ndarray:
+    """8 bit intensity of every integer luminance `_luminance` gives"""
+    from n64tex.formats.rgba import _rounding_table
+
+    if weighting == "mean":
+        # The mean is the sum of the three colour channels
+        return _rounding_table(766, 1, 3)
+    return np.arange(256, dtype=np.uint8)
+
+
+def ia16_to_rgba(ia16_array: np.ndarray, out: np.ndarray = None, colour: tuple = (255, 255, 255)) -> np.ndarray:
+    """Expand an array of IA16 values to RGBA8888 with a gather from a
+       table of every IA16 value
+
+    Args:
+        ia16_array (np.ndarray): Array of IA16 values of any shape
+        out (np.ndarray, optional): uint8 array to write the result into. Defaults to None.
+        colour (tuple[int, int, int], optional): Colour to tint the image. Defaults to (255, 255, 255)
+
+    Returns:
+        np.ndarray: uint8 array with an extra trailing axis of length 4
+    """
+    ia16_array = np.asarray(ia16_array, dtype=np.uint16)
+    if out is None:
+        out = np.empty(ia16_array.shape + (4,), dtype=np.uint8)
+    return np.take(_rgba_table(tuple(colour)), ia16_array, axis=0, out=out)
+
+
+def rgba_to_ia16(rgba_array: np.ndarray, out: np.ndarray = None, weighting: str = "mean") -> np.ndarray:
+    """Reduce an array of RGBA8888 values to IA16, intensity in the high
+       byte and alpha in the low byte
+
+    Args:
+        rgba_array (np.ndarray): uint8 array whose trailing axis holds the 4 channels
+        out (np.ndarray, optional): uint16 array to write the result into. Defaults to None.
+        weighting (str, optional): "mean" or "rec601" luma weighting. Defaults to "mean"
+
+    Returns:
+        np.ndarray: uint16 array without the trailing axis
+    """
+    from n64tex.formats.rgba import _luminance
+
+    rgba_array = np.asarray(rgba_array, dtype=np.uint8)
+    if out is None:
+        out = np.empty(rgba_array.shape[:-1], dtype=np.uint16)
+    luminance = _luminance(rgba_array, weighting, include_alpha=False)
+    np.left_shift(_luminance_table(weighting)[luminance], 8, out=out, dtype=np.uint16)
+    out |= rgba_array[..., 3]
+    return out
+
+
+class IA16Image(BaseImage):
+    """IA16 Image format. Each pixel is 16 bits long and follow this format
+
+    IIIIIIII AAAAAAAA
+
+    Where:
+        I = Intensity from 0-255
+        A = Alpha channel from 0-255
+
+    This format is typically coupled with a colour to produce an image
+    various shades of said colour
+    """
+
+    bits_per_pixel: int = 16
+
+    @classmethod
+    def from_bytes(cls, raw_bytes: bytes, width: int, height: int, *args, out: np.ndarray = None, **kwargs) -> "IA16Image":
+        """Generate an IA16Image from byte data
+
+        Args:
+            raw_bytes (bytes): Raw byte data to use
+            width (int): Width of image
+            height (int): Height of image
+            out (np.ndarray, optional): Preallocated (height, width) uint16 array to copy into. Defaults to None
+
+        Returns:
+            IA16Image: IA16Image object
+        """
+        # Decoding is a single table gather, which indexes as fast with big
+        # endian values, so they're kept as a view rather than swapped
+        data_array = frombuffer(raw_bytes, ">u2", (height, width), out, native=False)
+        return cls(data_array, width, height)
+
+    def to_rgba(self, colour: tuple[int, int, int] = (255, 255, 255), threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "RGBAImage":
+        """Converts IA16Image to RGBAImage
+
+        Args:
+            colour (tuple[int, int, int]): Colour to tint the image. Defaults to (255, 255, 255)
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width, 4) uint8 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
+
+        Returns:
+            RGBAImage: Converted RGBAImage object
+        """
+        rgba_data_array = output_array(out, (self.height, self.width, 4), np.uint8)
+        map_row_bands(lookup_kernel(_rgba_table(tuple(colour))), self.data_array, rgba_data_array, threads, budget_rows(max_memory, self.width * KERNEL_BYTES_PER_PIXEL))
+
+        from n64tex.formats.rgba import RGBAImage
+
+        return RGBAImage(rgba_data_array, self.width, self.height)
+
+    def to_image(self, force_rgba: bool = False) -> Image.Image:
+        """Convert to an 'LA' PIL Image, or 'RGBA' if forced
+
+        Args:
+            force_rgba (bool, optional): Always produce an 'RGBA' image. Defaults to False
+
+        Returns:
+            PIL.Image.Image: PIL Image object
+        """
+        if force_rgba:
+            return super().to_image(force_rgba)
+        data_array = self.data_array.astype(np.uint16)
+        return Image.fromarray(np.dstack(((data_array >> 8).astype(np.uint8), (data_array & 0xFF).astype(np.uint8))))
@@ -0,0 +1,274 @@
+import hashlib
+import weakref
+import functools
+
+import numpy as np
+
+
+# Added to the distance between colours whose alpha differs. It's more than the largest
+# possible RGB distance of 3 * 31 ** 2, so opaque pixels always map to opaque colours
+# and transparent pixels to transparent ones when the palette has any
+ALPHA_MISMATCH = 4096
+
+# Formats the RDP can read palette colours in, set by the TLUT mode
+TLUT_MODES = ("rgba5551", "ia16")
+
+
+def check_tlut(tlut: str) -> str:
+    """Check a TLUT mode is known
+
+    Args:
+        tlut (str): One of `TLUT_MODES`
+
+    Raises:
+        ValueError: If the mode is unknown
+
+    Returns:
+        str: The mode
+    """
+    if tlut not in TLUT_MODES:
+        raise ValueError(f"Unknown TLUT mode {tlut!r}, expected one of {TLUT_MODES}")
+    return tlut
+
+
+def tlut_encoder(tlut: str):
+    """Function reducing RGBA8888 to palette colours of a TLUT mode, called
+       as `encoder(rgba_array, out=None)`
+
+    Args:
+        tlut (str): One of `TLUT_MODES`
+
+    Returns:
+        Callable: `rgba_to_rgba5551` or `rgba_to_ia16`
+    """
+    if check_tlut(tlut) == "ia16":
+        from n64tex.formats.ia16 import rgba_to_ia16
+
+        return rgba_to_ia16
+    from n64tex.formats.rgba5551 import rgba_to_rgba5551
+
+    return rgba_to_rgba5551
+
+
+class Palette:
+    """RGBA5551 colour palette shared by CI images. Palettes are immutable
+       and interned by content, so every image using the same colours shares
+       one Palette and its decoded tables are only ever built once
+
+    The palette behaves like a read-only uint16 Numpy array of its colours,
+    each of which follows this format:
+
+    RRRRR GGGGG BBBBB A
+
+    Where:
+        R = Red channel from 0-31
+        G = Green channel from 0-31
+        B = Blue channel from 0-31
+        A = Alpha channel from 0-1
+    """
+
+    _interned: "weakref.WeakValueDictionary[str, Palette]" = weakref.WeakValueDictionary()
+
+    def __init__(self, colours: np.ndarray):
+        """Initializer that takes the RGBA5551 colours. Use `of` or
+           `from_bytes` instead to get the interned palette
+
+        Args:
+            colours (np.ndarray): RGBA5551 colours
+        """
+        colours = np.array(colours, dtype=np.uint16).reshape(-1)
+        colours.flags.writeable = False
+        self.colours: np.ndarray = colours
+
+    @classmethod
+    def of(cls, colours) -> "Palette":
+        """Get the palette with the given colours, reusing an existing
+           palette with the same colours if there is one
+
+        Args:
+            colours (Palette | np.ndarray): RGBA5551 colours
+
+        Returns:
+            Palette: Interned palette
+        """
+        if isinstance(colours, Palette):
+            return colours
+        return cls._intern(cls(colours))
+
+    @classmethod
+    def from_bytes(cls, raw_bytes: bytes) -> "Palette":
+        """Get the palette stored in big endian RGBA5551 bytes, as found in
+           ROMs and palette files. A trailing odd byte is ignored
+
+        Args:
+            raw_bytes (bytes): Any object supporting the buffer protocol
+
+        Returns:
+            Palette: Interned palette
+        """
+        raw_bytes = memoryview(raw_bytes).cast("B")
+        return cls._intern(cls(np.frombuffer(raw_bytes[:len(raw_bytes) // 2 * 2], dtype=">u2")))
+
+    @classmethod
+    def _intern(cls, palette: "Palette") -> "Palette":
+        """Swap a new palette for an existing one with the same colours"""
+        existing = cls._interned.get(palette.digest)
+        if existing is not None:
+            return existing
+        cls._interned[palette.digest] = palette
+        return palette
+
+    def to_bytes(self) -> bytes:
+        """Big endian RGBA5551 bytes of the palette
+
+        Returns:
+            bytes: Palette bytes
+        """
+        return self.colours.astype(">u2").tobytes()
+
+    @functools.cached_property
+    def digest(self) -> str:
+        """Content hash of the palette, the same for palettes with the same colours"""
+        return hashlib.blake2b(self.colours.astype("<u2").tobytes(), digest_size=16).hexdigest()
+
+    @functools.cached_property
+    def rgba(self) -> np.ndarray:
+        """Colours expanded to RGBA8888, as a read-only (colours, 4) uint8 array"""
+        from n64tex.formats.rgba5551 import rgba5551_to_rgba
+
+        rgba = rgba5551_to_rgba(self.colours)
+        rgba.flags.writeable = False
+        return rgba
+
+    @functools.cached_property
+    def ia16_rgba(self) -> np.ndarray:
+        """Colours read as IA16 and expanded to RGBA8888, as a read-only (colours, 4) uint8 array"""
+        from n64tex.formats.ia16 import ia16_to_rgba
+
+        rgba = ia16_to_rgba(self.colours)
+        rgba.flags.writeable = False
+        return rgba
+
+    def decoded(self, tlut: str = "rgba5551") -> np.ndarray:
+        """Colours expanded to RGBA8888 for a TLUT mode
+
+        Args:
+            tlut (str, optional): One of `TLUT_MODES`. Defaults to "rgba5551"
+
+        Returns:
+            np.ndarray: Read-only (colours, 4) uint8 array, `rgba` or `ia16_rgba`
+        """
+        return self.ia16_rgba if check_tlut(tlut) == "ia16" else self.rgba
+
+    @functools.cached_property
+    def lookup(self) -> np.ndarray:
+        """Palette index of every RGBA5551 value, for encoding. The first
+           entry wins for repeated colours and colours missing from the
+           palette map to 0
+        """
+        lookup = np.zeros(0x10000, dtype=np.uint8)
+        lookup[self.colours[::-1]] = np.arange(len(self.colours) - 1, -1, -1) & 0xFF
+        lookup.flags.writeable = False
+        return lookup
+
+    @functools.cached_property
+    def nearest(self) -> np.ndarray:
+        """Index of the closest palette colour to every RGBA5551 value, for
+           encoding against a fixed palette. The values are laid out as a
+           32x32x32x2 cube of red, green, blue and alpha, which flattened is
+           exactly RGBA5551 order, so encoding is a single gather. Distance
+           is squared euclidean over the 5 bit channels, exact matches map
+           the same as `lookup` and ties go to the lowest index
+        """
+        colours = self.colours.astype(np.int32)
+        levels = np.arange(32, dtype=np.int32)[:, None]
+        red = ((levels - (colours >> 11)) ** 2).astype(np.int16)
+        green = ((levels - ((colours >> 6) & 31)) ** 2).astype(np.int16)
+        blue = ((levels - ((colours >> 1) & 31)) ** 2).astype(np.int16)
+        alpha = np.where(np.arange(2)[:, None] == (colours & 1), 0, ALPHA_MISMATCH).astype(np.int16)
+
+        # Distances for one red level at a time keeps the working set to 32x32x2 per colour
+        green_blue_alpha = green[:, None, None, :] + blue[None, :, None, :] + alpha[None, None, :, :]
+        distances = np.empty_like(green_blue_alpha)
+        cube = np.empty((32, 32, 32, 2), dtype=np.uint8)
+        for level in range(32):
+            np.add(green_blue_alpha, red[level], out=distances)
+            cube[level] = distances.argmin(axis=-1)
+
+        nearest = cube.reshape(-1)
+        nearest.flags.writeable = False
+        return nearest
+
+    @functools.cached_property
+    def ia16_nearest(self) -> np.ndarray:
+        """Index of the closest palette colour to every IA16 value, the
+           colours being read as IA16. Laid out as a 256x256 table of
+           intensity and alpha, which flattened is IA16 order. Distance is
+           squared euclidean over intensity and alpha, exact matches map the
+           same as `lookup` and ties go to the lowest index
+        """
+        colours = self.colours.astype(np.int32)
+        levels = np.arange(256, dtype=np.int32)[:, None]
+        intensity = (levels - (colours >> 8)) ** 2
+        alpha = (levels - (colours & 0xFF)) ** 2
+
+        distances = np.empty_like(alpha)
+        table = np.empty((256, 256), dtype=np.uint8)
+        for level in range(256):
+            np.add(alpha, intensity[level], out=distances)
+            table[level] = distances.argmin(axis=-1)
+
+        nearest = table.reshape(-1)
+        nearest.flags.writeable = False
+        return nearest
+
+    def nearest_for(self, tlut: str = "rgba5551") -> np.ndarray:
+        """Nearest colour table for a TLUT mode
+
+        Args:
+            tlut (str, optional): One of `TLUT_MODES`. Defaults to "rgba5551"
+
+        Returns:
+            np.ndarray: `nearest` or `ia16_nearest`
+        """
+        return self.ia16_nearest if check_tlut(tlut) == "ia16" else self.nearest
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        """Expose the colours to Numpy without copying them, following
+           Numpy 2's copy semantics as `BaseImage.__array__` does
+
+        Raises:
+            ValueError: If `copy` is False but converting to `dtype` needs a copy
+        """
+        if dtype is not None and np.dtype(dtype) != self.colours.dtype:
+            if copy is False:
+                raise ValueError(f"Converting {self.colours.dtype} colours to {np.dtype(dtype)} requires a copy")
+            return self.colours.astype(dtype)
+        if copy:
+            return self.colours.copy()
+        return self.colours
+
+    def __len__(self) -> int:
+        return len(self.colours)
+
+    def __getitem__(self, key):
+        return self.colours[key]
+
+    def __iter__(self):
+        return iter(self.colours)
+
+    def __eq__(self, other) -> np.ndarray:
+        # Compares colour by colour like a Numpy array, use `digest` to compare whole palettes
+        return self.colours == np.asarray(other)
+
+    def __ne__(self, other) -> np.ndarray:
+        return self.colours != np.asarray(other)
+
+    __hash__ = None
+
+    def astype(self, dtype) -> np.ndarray:
+        """Copy of the colours as another dtype, as `np.ndarray.astype`"""
+        return self.colours.astype(dtype)
+
+    def __repr__(self) -> str:
+        return f"<Palette colours={len(self)} digest={self.digest[:8]}>"
@@ -1,11 +1,141 @@
-from typing import TYPE_CHECKING
+import functools
+
+from typing import Callable, TYPE_CHECKING
 
 if TYPE_CHECKING:
-    from n64tex.formats import RGBA5551Image, I4Image, I8Image, I4AImage, I8AImage, CI4Image, CI8Image
+    from n64tex.formats import RGBA5551Image, I4Image, I8Image, I4AImage, I8AImage, IA16Image, CI4Image, CI8Image, YUV16Image
 
 import numpy as np
 
-from n64tex.formats.base import BaseImage, T
+from n64tex.formats.palette import Palette, check_tlut, tlut_encoder
+from n64tex.formats.rgba5551 import rgba_to_rgba5551
+from n64tex.formats.base import KERNEL_BYTES_PER_PIXEL, PALETTE_TABLE_BYTES, BaseImage, Threads, budget_rows, T, frombuffer, map_row_bands, output_array
+
+
+WEIGHTINGS = ("mean", "rec601")
+
+
+def _luminance(source: np.ndarray, weighting: str, include_alpha: bool) -> np.ndarray:
+    """Integer luminance of each pixel, accumulated in uint16
+
+    Args:
+        source (np.ndarray): RGBA data array
+        weighting (str): "mean" for a plain average of the channels, or "rec601" for Rec. 601 luma
+        include_alpha (bool): Whether the mean also averages in the alpha channel
+
+    Returns:
+        np.ndarray: uint16 array. The sum of the averaged channels for "mean",
+            or luma from 0-255 for "rec601"
+    """
+    if weighting == "rec601":
+        # 77 + 150 + 29 = 256, so the weighted sum of 8 bit channels always fits in uint16
+        luminance = np.multiply(source[..., 0], 77, dtype=np.uint16)
+        weighted = np.multiply(source[..., 1], 150, dtype=np.uint16)
+        luminance += weighted
+        np.multiply(source[..., 2], 29, out=weighted, dtype=np.uint16)
+        luminance += weighted
+        luminance += 128
+        luminance >>= 8
+        return luminance
+
+    luminance = source[..., 0].astype(np.uint16)
+    luminance += source[..., 1]
+    luminance += source[..., 2]
+    if include_alpha:
+        luminance += source[..., 3]
+    return luminance
+
+
+def _rounding_table(size: int, multiplier: int, divisor: int, shift: int = 0) -> np.ndarray:
+    """Lookup table of `round(value * multiplier / divisor) << shift` for
+       every value below `size`, computed with integer arithmetic. Ties
+       round to even, matching `np.round`
+
+    Args:
+        size (int): Number of entries
+        multiplier (int): Value to multiply by
+        divisor (int): Value to divide by
+        shift (int, optional): Bits to shift the result left by. Defaults to 0.
+
+    Returns:
+        np.ndarray: uint8 lookup table
+    """
+    quotient, remainder = np.divmod(np.arange(size, dtype=np.int64) * multiplier, divisor)
+    quotient += (2 * remainder > divisor) | ((2 * remainder == divisor) & (quotient % 2 == 1))
+    return (quotient << shift).astype(np.uint8)
+
+
+@functools.lru_cache(maxsize=None)
+def _intensity_tables(bits: int, weighting: str, alpha: bool) -> tuple:
+    """Tables mapping integer luminance, and alpha for the IA formats, to
+       their packed intensity format values
+
+    Args:
+        bits (int): 4 or 8 bits per pixel
+        weighting (str): "mean" or "rec601"
+        alpha (bool): Whether the format carries alpha
+
+    Returns:
+        tuple[np.ndarray, np.ndarray | None]: Luminance table and alpha table
+    """
+    if not alpha:
+        if weighting == "mean":
+            # The mean is the sum of all four channels, so averaging and scaling to 4 bits
+            # divides by 4 * 17. The 8 bit mean truncates rather than rounds, as it always has
+            if bits == 4:
+                return _rounding_table(1021, 1, 68), None
+            return (np.arange(1021) // 4).astype(np.uint8), None
+        return _rounding_table(256, 1, 17 if bits == 4 else 1), None
+
+    # The mean is the sum of the three colour channels
+    size, channels = (766, 3) if weighting == "mean" else (256, 1)
+    if bits == 4:
+        # III A, intensity from 0-7 and alpha from 0-1
+        return _rounding_table(size, 7, 255 * channels, shift=1), (np.arange(256) > 0).astype(np.uint8)
+    # IIII AAAA, intensity from 0-15 and alpha from 0-15
+    return _rounding_table(size, 1, 17 * channels, shift=4), _rounding_table(256, 1, 17)
+
+
+def _intensity_kernel(bits: int, weighting: str, alpha: bool) -> Callable:
+    """Build a kernel converting RGBA to one of the intensity formats. Only
+       the uint16 luminance is held alongside the output, everything else
+       is integer table lookups
+
+    Args:
+        bits (int): 4 or 8 bits per pixel
+        weighting (str): "mean" or "rec601" luma weighting
+        alpha (bool): Whether to pack alpha in for I4A/I8A
+
+    Returns:
+        Callable: Kernel for `map_row_bands`
+    """
+    luminance_table, alpha_table = _intensity_tables(bits, weighting, alpha)
+
+    def kernel(source: np.ndarray, out: np.ndarray):
+        # Fancy indexing casts the uint16 indices in small buffers, where np.take
+        # would first cast the whole array to intp
+        out[...] = luminance_table[_luminance(source, weighting, include_alpha=not alpha)]
+        if alpha_table is not None:
+            out |= alpha_table[source[..., 3]]
+
+    return kernel
+
+
+def _palette_index_kernel(lookup: np.ndarray, encoder: Callable = rgba_to_rgba5551) -> Callable:
+    """Build a kernel that maps RGBA pixels to palette indices
+
+    Args:
+        lookup (np.ndarray): Palette index of every 16 bit palette colour
+        encoder (Callable, optional): Reduces RGBA to palette colours, see `tlut_encoder`. Defaults to rgba_to_rgba5551
+
+    Returns:
+        Callable: Kernel for `map_row_bands`
+    """
+
+    def kernel(source: np.ndarray, out: np.ndarray):
+        np.take(lookup, encoder(source), out=out)
+
+    return kernel
 
 
 class RGBAImage(BaseImage):
@@ -20,205 +150,288 @@ class RGBAImage(BaseImage):
         A = Alpha channel from 0-255
     """
 
+    bits_per_pixel: int = 32
+
     @classmethod
-    def from_bytes(cls, raw_bytes: bytes, width: int, height: int, *args, **kwargs) -> "RGBAImage":
+    def from_bytes(cls, raw_bytes: bytes, width: int, height: int, *args, out: np.ndarray = None, **kwargs) -> "RGBAImage":
         """Generate an RGBAImage from byte data
 
         Args:
             raw_bytes (bytes): Raw byte data to use
             width (int): Width of image
             height (int): Height of image
+            out (np.ndarray, optional): Preallocated (height, width, 4) uint8 array to copy into. Defaults to None
 
         Returns:
             RGBAImage: RGBAImage object
         """
-        data_array = np.frombuffer(raw_bytes, dtype=">u1")
-        data_array = np.array(data_array)
-        data_array.resize((height, width, 4), refcheck=False)
+        data_array = frombuffer(raw_bytes, ">u1", (height, width, 4), out)
         return cls(data_array, width, height)
 
-    def convert_to(self, cls: T) -> T:
-        from n64tex.formats import RGBA5551Image, I4Image, I8Image, I4AImage, I8AImage, CI4Image, CI8Image
+    def convert_to(self, cls: T, threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> T:
+        from n64tex.formats import RGBA5551Image, I4Image, I8Image, I4AImage, I8AImage, IA16Image, CI4Image, CI8Image, YUV16Image
 
         CONVERTERS = {
-            RGBAImage: lambda: self,
+            RGBAImage: self._copy_to,
             RGBA5551Image: self.to_rgba5551,
             I4Image: self.to_i4,
             I4AImage: self.to_i4a,
             I8Image: self.to_i8,
             I8AImage: self.to_i8a,
+            IA16Image: self.to_ia16,
             CI4Image: self.to_ci4,
             CI8Image: self.to_ci8,
+            YUV16Image: self.to_yuv16,
         }
-        return CONVERTERS[cls]()
-
-    def to_rgba5551(self) -> "RGBA5551Image":
+        return CONVERTERS[cls](threads=threads, out=out, max_memory=max_memory)
+
+    def _copy_to(self, threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "RGBAImage":
+        """Conversion to RGBA is a no-op, unless the data has to go into a given array"""
+        if out is None:
+            return self
+        np.copyto(output_array(out, (self.height, self.width, 4), np.uint8), self.data_array)
+        rgba_image = RGBAImage(out, self.width, self.height, self.palette)
+        rgba_image.tlut = self.tlut
+        return rgba_image
+
+    def to_rgba5551(self, threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "RGBA5551Image":
         """Converts RGBAImage to RGBA5551Image
 
+        Args:
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width) uint16 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
+
         Returns:
             RGBA5551Image: Converted RGBA5551Image object
         """
-
-        def rgba_to_rgba5551(rgba_value):
-            rgba_value[0] = (rgba_value[0] >> 3) << 11
-            rgba_value[1] = (rgba_value[1] >> 3) << 6
-            rgba_value[2] = (rgba_value[2] >> 3) << 1
-            rgba_value[3] = 1 if rgba_value[3] > 0 else 0
-
-        rgba_5551_data_array = self.data_array.copy()
-        rgba_5551_data_array = rgba_5551_data_array.astype(np.uint16)
-
-        for pixel_row in rgba_5551_data_array:
-            for pixel_colour in pixel_row:
-                rgba_to_rgba5551(pixel_colour)
-
-        rgba_5551_data_array = np.sum(rgba_5551_data_array, axis=2)
-        rgba_5551_data_array = rgba_5551_data_array.astype(np.uint16)
+        rgba_5551_data_array = output_array(out, (self.height, self.width), np.uint16)
+        map_row_bands(rgba_to_rgba5551, self.data_array, rgba_5551_data_array, threads, budget_rows(max_memory, self.width * KERNEL_BYTES_PER_PIXEL))
 
         from n64tex.formats.rgba5551 import RGBA5551Image
 
         return RGBA5551Image(rgba_5551_data_array, self.width, self.height)
 
-    def to_i4(self) -> "I4Image":
-        """Converts RGBAImage to I4Image
+    def to_i4(self, weighting: str = "mean", threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "I4Image":
+        """Converts RGBAImage to I4Image. With the "mean" weighting, intensity
+           is the mean of all four channels as the decoder replicates
+           intensity into alpha
+
+        Args:
+            weighting (str, optional): "mean" or "rec601" luma weighting. Defaults to "mean"
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width) uint8 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
 
         Returns:
             I4Image: Converted I4Image object
         """
-        reduce_bytes = lambda x: x / 17
+        if weighting not in WEIGHTINGS:
+            raise ValueError(f"Unknown weighting {weighting!r}, expected one of {WEIGHTINGS}")
 
-        i4_data_array = self.data_array.copy()
-        i4_data_array = np.average(i4_data_array, axis=2)
-        i4_data_array = reduce_bytes(i4_data_array)
-        i4_data_array = np.round(i4_data_array).astype(np.uint8)
+        i4_data_array = output_array(out, (self.height, self.width), np.uint8)
+        map_row_bands(_intensity_kernel(4, weighting, alpha=False), self.data_array, i4_data_array, threads, budget_rows(max_memory, self.width * KERNEL_BYTES_PER_PIXEL))
 
         from n64tex.formats.i4 import I4Image
 
         return I4Image(i4_data_array, self.width, self.height)
     
-    def to_i4a(self) -> "I4AImage":
-        """Converts RGBAImage to I4AImage
+    def to_i4a(self, weighting: str = "mean", threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "I4AImage":
+        """Converts RGBAImage to I4AImage. Intensity takes the top 3 bits and
+           alpha the low bit
+
+        Args:
+            weighting (str, optional): "mean" or "rec601" luma weighting. Defaults to "mean"
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width) uint8 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
 
         Returns:
             I4Image: Converted I4AImage object
         """
-        # ! It's likely that this is incorrect. A second set of eyes is necessary
-        reduce_bytes = lambda x: x / 17
+        if weighting not in WEIGHTINGS:
+            raise ValueError(f"Unknown weighting {weighting!r}, expected one of {WEIGHTINGS}")
 
-        i4a_data_array = self.data_array.copy()
-        i4a_data_array = np.average(i4a_data_array, axis=2)
-        i4a_data_array = reduce_bytes(i4a_data_array)
-        i4a_data_array = np.round(i4a_data_array).astype(np.uint8)
+        i4a_data_array = output_array(out, (self.height, self.width), np.uint8)
+        map_row_bands(_intensity_kernel(4, weighting, alpha=True), self.data_array, i4a_data_array, threads, budget_rows(max_memory, self.width * KERNEL_BYTES_PER_PIXEL))
 
         from n64tex.formats.i4a import I4AImage
 
         return I4AImage(i4a_data_array, self.width, self.height)
 
-    def to_i8(self) -> "I8Image":
-        """Converts RGBAImage to I8Image
+    def to_i8(self, weighting: str = "mean", threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "I8Image":
+        """Converts RGBAImage to I8Image. With the "mean" weighting, intensity
+           is the mean of all four channels as the decoder replicates
+           intensity into alpha
+
+        Args:
+            weighting (str, optional): "mean" or "rec601" luma weighting. Defaults to "mean"
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width) uint8 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
 
         Returns:
             I8Image: Converted I8Image object
         """
-        i8_data_array = self.data_array.copy()
-        i8_data_array = np.average(i8_data_array, axis=2).astype(np.uint8)
+        if weighting not in WEIGHTINGS:
+            raise ValueError(f"Unknown weighting {weighting!r}, expected one of {WEIGHTINGS}")
+
+        i8_data_array = output_array(out, (self.height, self.width), np.uint8)
+        map_row_bands(_intensity_kernel(8, weighting, alpha=False), self.data_array, i8_data_array, threads, budget_rows(max_memory, self.width * KERNEL_BYTES_PER_PIXEL))
 
         from n64tex.formats.i8 import I8Image
 
         return I8Image(i8_data_array, self.width, self.height)
 
-    def to_i8a(self) -> "I8AImage":
-        """Converts RGBAImage to I8AImage
+    def to_i8a(self, weighting: str = "mean", threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "I8AImage":
+        """Converts RGBAImage to I8AImage. Intensity takes the top nibble and
+           alpha the low nibble
+
+        Args:
+            weighting (str, optional): "mean" or "rec601" luma weighting. Defaults to "mean"
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width) uint8 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
 
         Returns:
             I8AImage: Converted I8AImage object
         """
-        i8a_data_array = self.data_array.copy()
-        i8a_data_array = np.average(i8a_data_array, axis=2).astype(np.uint8)
+        if weighting not in WEIGHTINGS:
+            raise ValueError(f"Unknown weighting {weighting!r}, expected one of {WEIGHTINGS}")
+
+        i8a_data_array = output_array(out, (self.height, self.width), np.uint8)
+        map_row_bands(_intensity_kernel(8, weighting, alpha=True), self.data_array, i8a_data_array, threads, budget_rows(max_memory, self.width * KERNEL_BYTES_PER_PIXEL))
 
         from n64tex.formats.i8a import I8AImage
 
         return I8AImage(i8a_data_array, self.width, self.height)
-    
-    def to_ci4(self) -> "CI4Image":
-        """Converts RGBAImage to CI4Image
+
+    def to_ia16(self, weighting: str = "mean", threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "IA16Image":
+        """Converts RGBAImage to IA16Image. Intensity takes the high byte and
+           alpha the low byte
+
+        Args:
+            weighting (str, optional): "mean" or "rec601" luma weighting. Defaults to "mean"
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width) uint16 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
 
         Returns:
-            CI4Image: Converted CI4Image object
+            IA16Image: Converted IA16Image object
+        """
+        if weighting not in WEIGHTINGS:
+            raise ValueError(f"Unknown weighting {weighting!r}, expected one of {WEIGHTINGS}")
+
+        from n64tex.formats.ia16 import IA16Image, rgba_to_ia16
+
+        def kernel(source: np.ndarray, out: np.ndarray):
+            rgba_to_ia16(source, out, weighting)
+
+        ia16_data_array = output_array(out, (self.height, self.width), np.uint16)
+        map_row_bands(kernel, self.data_array, ia16_data_array, threads, budget_rows(max_memory, self.width * KERNEL_BYTES_PER_PIXEL))
+        return IA16Image(ia16_data_array, self.width, self.height)
+
+    def to_yuv16(self, threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "YUV16Image":
+        """Converts RGBAImage to YUV16Image. Each pair of pixels along a row
+           shares its chroma and alpha is dropped
+
+        Args:
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width) uint16 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
+
+        Returns:
+            YUV16Image: Converted YUV16Image object
+        """
+        from n64tex.formats.yuv16 import YUV16Image, rgba_to_yuv16
+
+        yuv16_data_array = output_array(out, (self.height, self.width), np.uint16)
+        # The colour space is converted in float32, which takes a few times the usual temporaries
+        map_row_bands(rgba_to_yuv16, self.data_array, yuv16_data_array, threads, budget_rows(max_memory, self.width * 3 * KERNEL_BYTES_PER_PIXEL))
+        return YUV16Image(yuv16_data_array, self.width, self.height)
+
+    def _to_palette_indices(
+        self, palette=None, tlut: str = None, threads: Threads = None, out: np.ndarray = None, max_memory: int = None
+    ) -> tuple:
+        """Generate the palette and palette index array shared by the CI formats
+
+        Args:
+            palette (Palette | np.ndarray, optional): Fixed palette to map onto. Defaults to the image's own palette
+            tlut (str, optional): TLUT mode of the palette, one of `TLUT_MODES`. Defaults to the image's own
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width) uint8 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
+
+        Returns:
+            tuple[np.ndarray, Palette, str]: Index array, palette and TLUT mode
         """
-        
-        def rgba_to_rgba5551(rgba_value):
-            rgba_value[0] = (rgba_value[0] >> 3) << 11
-            rgba_value[1] = (rgba_value[1] >> 3) << 6
-            rgba_value[2] = (rgba_value[2] >> 3) << 1
-            rgba_value[3] = 1 if rgba_value[3] > 0 else 0
-
-        # Generate the Palette Array if it doesn't already exist
-        if self.palette is not None:
-            palette_data_array = self.palette.copy()
+        tlut = check_tlut(tlut or self.tlut)
+        encoder = tlut_encoder(tlut)
+        if max_memory is not None:
+            max_memory = max(max_memory - PALETTE_TABLE_BYTES, 1)
+        chunk_rows = budget_rows(max_memory, self.width * KERNEL_BYTES_PER_PIXEL)
+
+        # Generate the Palette Array if it doesn't already exist. Marking the colours present
+        # a chunk at a time gives the same sorted palette as np.unique without a full RGBA5551 copy
+        if palette is None and tlut == self.tlut:
+            palette = self.palette
+        if palette is not None:
+            # Colours missing from a given palette map to the nearest one
+            palette = Palette.of(palette)
+            lookup = palette.nearest_for(tlut)
         else:
-            palette_data_array = np.reshape(self.data_array, (-1, 4))
-            palette_data_array = np.unique(palette_data_array, axis=0)
-            
-            palette_data_array = palette_data_array.astype(np.uint16)
-            for pixel_colour in palette_data_array:
-                rgba_to_rgba5551(pixel_colour)
-            palette_data_array = np.sum(palette_data_array, axis=1)
-            palette_data_array = np.unique(palette_data_array, axis=0)
-            palette_data_array = palette_data_array.astype(np.uint16)
+            present = np.zeros(0x10000, dtype=bool)
+            rows = chunk_rows or self.height
+            for start in range(0, self.height, max(rows, 1)):
+                present[encoder(self.data_array[start:start + rows])] = True
+            palette = Palette.of(np.flatnonzero(present))
+            lookup = palette.lookup
 
         # Generate the Pointer Array
-        ci4_data_array = list()
-        for pixel_colour in np.reshape(self.data_array, (-1, 4)).astype(np.uint16):
-            rgba_to_rgba5551(pixel_colour)
-            palette_index = np.where(palette_data_array == np.sum(pixel_colour))
-            ci4_data_array.append(palette_index)
-        
-        ci4_data_array = np.array(ci4_data_array)
-        ci4_data_array = np.resize(ci4_data_array, (self.height, self.width))
-        ci4_data_array = ci4_data_array.astype(np.uint8)
-            
+        ci_data_array = output_array(out, (self.height, self.width), np.uint8)
+        map_row_bands(_palette_index_kernel(lookup, encoder), self.data_array, ci_data_array, threads, chunk_rows)
+        return ci_data_array, palette, tlut
+
+    def to_ci4(self, palette=None, tlut: str = None, threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "CI4Image":
+        """Converts RGBAImage to CI4Image. With a palette, either given or
+           carried over from a CI image, every colour maps to the nearest
+           colour in it. Otherwise the palette is made from the image's colours
+
+        Args:
+            palette (Palette | np.ndarray, optional): Fixed palette to map onto. Defaults to None
+            tlut (str, optional): "rgba5551" or "ia16" palette colours. Defaults to the TLUT mode of the
+                CI image this was decoded from, or "rgba5551"
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width) uint8 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
+
+        Returns:
+            CI4Image: Converted CI4Image object
+        """
+        ci4_data_array, palette, tlut = self._to_palette_indices(palette, tlut, threads, out, max_memory)
+
         from n64tex.formats.ci4 import CI4Image
 
-        return CI4Image(ci4_data_array, self.width, self.height, palette_data_array)
+        return CI4Image(ci4_data_array, self.width, self.height, palette, tlut)
     
-    def to_ci8(self) -> "CI8Image":
-        """Converts RGBAImage to CI8Image
+    def to_ci8(self, palette=None, tlut: str = None, threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "CI8Image":
+        """Converts RGBAImage to CI8Image. With a palette, either given or
+           carried over from a CI image, every colour maps to the nearest
+           colour in it. Otherwise the palette is made from the image's colours
+
+        Args:
+            palette (Palette | np.ndarray, optional): Fixed palette to map onto. Defaults to None
+            tlut (str, optional): "rgba5551" or "ia16" palette colours. Defaults to the TLUT mode of the
+                CI image this was decoded from, or "rgba5551"
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width) uint8 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
 
         Returns:
             CI8Image: Converted CI8Image object
         """
-        
-        def rgba_to_rgba5551(rgba_value):
-            rgba_value[0] = (rgba_value[0] >> 3) << 11
-            rgba_value[1] = (rgba_value[1] >> 3) << 6
-            rgba_value[2] = (rgba_value[2] >> 3) << 1
-            rgba_value[3] = 1 if rgba_value[3] > 0 else 0
-            
-        # Generate the Palette Array if it doesn't already exist
-        if self.palette is not None:
-            palette_data_array = self.palette.copy()
-        else:
-            palette_data_array = np.reshape(self.data_array, (-1, 4))
-            palette_data_array = np.unique(palette_data_array, axis=0)
-            
-            palette_data_array = palette_data_array.astype(np.uint16)
-            for pixel_colour in palette_data_array:
-                rgba_to_rgba5551(pixel_colour)
-            palette_data_array = np.sum(palette_data_array, axis=1)
-            palette_data_array = np.unique(palette_data_array, axis=0)
-            palette_data_array = palette_data_array.astype(np.uint16)
-        
-        # Generate the Pointer Array
-        ci8_data_array = list()
-        for pixel_colour in np.reshape(self.data_array, (-1, 4)).astype(np.uint16):
-            rgba_to_rgba5551(pixel_colour)
-            palette_index = np.where(palette_data_array == np.sum(pixel_colour))
-            ci8_data_array.append(palette_index)
-        ci8_data_array = np.array(ci8_data_array)
-        ci8_data_array = np.resize(ci8_data_array, (self.height, self.width))
-        ci8_data_array = ci8_data_array.astype(np.uint8)
-            
+        ci8_data_array, palette, tlut = self._to_palette_indices(palette, tlut, threads, out, max_memory)
+
         from n64tex.formats.ci8 import CI8Image
 
-        return CI8Image(ci8_data_array, self.width, self.height, palette_data_array)
\ No newline at end of file
+        return CI8Image(ci8_data_array, self.width, self.height, palette, tlut)
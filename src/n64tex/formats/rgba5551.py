@@ -5,7 +5,47 @@ if TYPE_CHECKING:
 
 import numpy as np
 
-from n64tex.formats.base import BaseImage
+from n64tex.formats.base import KERNEL_BYTES_PER_PIXEL, BaseImage, Threads, budget_rows, frombuffer, map_row_bands, output_array
+
+
+def rgba5551_to_rgba(rgba5551_array: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """Expand an array of RGBA5551 values to RGBA8888
+
+    Args:
+        rgba5551_array (np.ndarray): Array of RGBA5551 values of any shape
+        out (np.ndarray, optional): uint8 array to write the result into. Defaults to None.
+
+    Returns:
+        np.ndarray: uint8 array with an extra trailing axis of length 4
+    """
+    rgba5551_array = np.asarray(rgba5551_array, dtype=np.uint16)
+    if out is None:
+        out = np.empty(rgba5551_array.shape + (4,), dtype=np.uint8)
+    np.right_shift(rgba5551_array & 0xF800, 8, out=out[..., 0], casting="unsafe")
+    np.right_shift(rgba5551_array & 0x7C0, 3, out=out[..., 1], casting="unsafe")
+    np.left_shift(rgba5551_array & 0x3E, 2, out=out[..., 2], casting="unsafe")
+    np.multiply(rgba5551_array & 0x1, 255, out=out[..., 3], casting="unsafe")
+    return out
+
+
+def rgba_to_rgba5551(rgba_array: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """Reduce an array of RGBA8888 values to RGBA5551
+
+    Args:
+        rgba_array (np.ndarray): uint8 array whose trailing axis holds the 4 channels
+        out (np.ndarray, optional): uint16 array to write the result into. Defaults to None.
+
+    Returns:
+        np.ndarray: uint16 array without the trailing axis
+    """
+    rgba_array = np.asarray(rgba_array, dtype=np.uint8)
+    if out is None:
+        out = np.empty(rgba_array.shape[:-1], dtype=np.uint16)
+    np.left_shift(rgba_array[..., 0] >> 3, 11, out=out, dtype=np.uint16)
+    out |= (rgba_array[..., 1] >> 3).astype(np.uint16) << 6
+    out |= (rgba_array[..., 2] >> 3).astype(np.uint16) << 1
+    out |= rgba_array[..., 3] > 0
+    return out
 
 
 class RGBA5551Image(BaseImage):
@@ -20,51 +60,41 @@ class RGBA5551Image(BaseImage):
         A = Alpha channel from 0-1
     """
 
+    bits_per_pixel: int = 16
+
     @classmethod
-    def from_bytes(cls, raw_bytes: bytes, width: int, height: int, *args, **kwargs) -> "RGBA5551Image":
+    def from_bytes(cls, raw_bytes: bytes, width: int, height: int, *args, out: np.ndarray = None, **kwargs) -> "RGBA5551Image":
         """Generate an RGBA5551Image from byte data
 
         Args:
             raw_bytes (bytes): Raw byte data to use
             width (int): Width of image
             height (int): Height of image
+            out (np.ndarray, optional): Preallocated (height, width) uint16 array to copy into. Defaults to None
 
         Returns:
             RGBA5551Image: RGBA5551Image object
         """
-        data_array = np.frombuffer(raw_bytes, dtype=">u2")
-        data_array = np.array(data_array)
-        data_array.resize((height, width), refcheck=False)
+        data_array = frombuffer(raw_bytes, ">u2", (height, width), out)
         return cls(data_array, width, height)
 
-    def to_rgba(self) -> "RGBAImage":
+    def to_rgba(self, threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "RGBAImage":
         """Converts RGBA5551Image to RGBAImage
 
+        Args:
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width, 4) uint8 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
+
         Returns:
             RGBAImage: Converted RGBAImage object
         """
+        rgba_5551_data_array = self.data_array
+        if rgba_5551_data_array.shape != (self.height, self.width):
+            rgba_5551_data_array = np.resize(rgba_5551_data_array, (self.height, self.width))
 
-        def rgba5551_to_rgba(rgba5551_value):
-            r = (rgba5551_value & 0xF800) >> 8
-            g = (rgba5551_value & 0x7C0) >> 3
-            b = (rgba5551_value & 0x3E) << 2
-            a = 255 if rgba5551_value & 0x1 else 0
-            return r, g, b, a
-
-        rgba_5551_data_array = self.data_array.copy()
-        rgba_5551_data_array = rgba_5551_data_array.astype(np.uint16)
-
-        rgba_data_array = list()
-        if len(rgba_5551_data_array.shape) == 1:
-            for pixel_colour in rgba_5551_data_array:
-                rgba_data_array.append(rgba5551_to_rgba(pixel_colour))
-        else:
-            for pixel_row in rgba_5551_data_array:
-                for pixel_colour in pixel_row:
-                    rgba_data_array.append(rgba5551_to_rgba(pixel_colour))
-
-        rgba_data_array = np.array(rgba_data_array, dtype=">u1")
-        rgba_data_array = np.resize(rgba_data_array, (self.height, self.width, 4))
+        rgba_data_array = output_array(out, (self.height, self.width, 4), np.uint8)
+        map_row_bands(rgba5551_to_rgba, rgba_5551_data_array, rgba_data_array, threads, budget_rows(max_memory, self.width * KERNEL_BYTES_PER_PIXEL))
 
         from n64tex.formats.rgba import RGBAImage
 
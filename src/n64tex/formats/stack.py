@@ -0,0 +1,267 @@
+import pathlib
+
+from typing import Iterator, Type, Union
+
+import numpy as np
+from PIL import Image
+
+from n64tex.formats.base import BaseImage, Threads, output_array, png_options
+from n64tex.formats.palette import Palette, check_tlut
+
+# Animated image formats frame stacks can be saved as, by file extension
+ANIMATED_FORMATS = {".png": "PNG", ".apng": "PNG", ".gif": "GIF", ".webp": "WEBP"}
+
+
+class FrameStack:
+    """Animated texture made of frames of the same format and size, such as
+       the water and lava of many games. Every frame is held in one
+       (frames, height, width) array, with a trailing axis of channels for
+       RGBA, and CI frames share a single palette. Since each format decodes
+       row by row, the frames are decoded together as one tall image
+    """
+
+    def __init__(self, cls: Type[BaseImage], data_array: np.ndarray, width: int, height: int, palette: Palette = None, tlut: str = "rgba5551"):
+        """Initializer that takes the frames' format class and their data.
+           Use `from_bytes` or `from_frames` instead
+
+        Args:
+            cls (Type[BaseImage]): Format of every frame
+            data_array (np.ndarray): (frames, height, width) array of the format's data
+            width (int): Width of each frame
+            height (int): Height of each frame
+            palette (Palette, optional): Palette shared by every frame of CI formats. Defaults to None.
+            tlut (str, optional): Whether the palette holds "rgba5551" or "ia16" colours. Defaults to "rgba5551"
+        """
+        assert data_array.shape[1:3] == (height, width), "Frame data must be (frames, height, width)"
+        assert palette is not None or not cls.indexed, "CI frames require a palette"
+        self.cls: Type[BaseImage] = cls
+        self.data_array: np.ndarray = data_array
+        self.width: int = width
+        self.height: int = height
+        self.palette: Palette = palette
+        self.tlut: str = check_tlut(tlut)
+
+    @classmethod
+    def from_bytes(
+        cls,
+        fmt: Union[str, Type[BaseImage]],
+        raw_bytes: bytes,
+        width: int,
+        height: int,
+        frames: int = None,
+        palette_bytes=None,
+        tlut: str = "rgba5551",
+    ) -> "FrameStack":
+        """Load frames stored back to back, each as a texture would be on
+           its own. Frames whose size is a whole number of bytes are read in
+           a single pass, and without copying where the format allows
+
+        Args:
+            fmt (str | Type[BaseImage]): Format of the frames, by name or class
+            raw_bytes (bytes): Raw byte data of every frame
+            width (int): Width of each frame
+            height (int): Height of each frame
+            frames (int, optional): Number of frames. Defaults to None, as many whole frames as there are bytes for
+            palette_bytes (bytes | Palette, optional): Palette shared by every frame, required for CI formats. Defaults to None
+            tlut (str, optional): Whether the palette holds "rgba5551" or "ia16" colours. Defaults to "rgba5551"
+
+        Raises:
+            ValueError: If the format is unknown, there aren't enough bytes or a CI format has no palette
+
+        Returns:
+            FrameStack: FrameStack object
+        """
+        from n64tex.formats import Formats
+
+        if isinstance(fmt, str):
+            if fmt not in Formats.__members__:
+                raise ValueError(f"Unknown format {fmt!r}")
+            fmt = Formats[fmt].value
+        frame_bits = width * height * fmt.bits_per_pixel
+        frame_bytes = (frame_bits + 7) // 8
+        raw_bytes = memoryview(raw_bytes).cast("B")
+        if frames is None:
+            frames = len(raw_bytes) // frame_bytes if frame_bytes else 0
+        if frames * frame_bytes > len(raw_bytes):
+            raise ValueError(f"{frames} frames of {width}x{height} {fmt.__name__} need {frames * frame_bytes} bytes, not {len(raw_bytes)}")
+
+        palette = None
+        args, kwargs = (), {}
+        if fmt.indexed:
+            if palette_bytes is None or not len(palette_bytes):
+                raise ValueError(f"{fmt.__name__} frames require a palette")
+            palette = Palette.of(palette_bytes) if isinstance(palette_bytes, Palette) else Palette.from_bytes(palette_bytes)
+            args, kwargs = (palette,), {"tlut": tlut}
+
+        if frame_bits % 8 == 0:
+            # Frames pack end to end, so they read as one tall image
+            tall = fmt.from_bytes(raw_bytes[:frames * frame_bytes], width, frames * height, *args, **kwargs)
+            data_array = tall.data_array.reshape((frames, height) + tall.data_array.shape[1:])
+        else:
+            # Each frame of 4 bit pixels is padded to a whole byte
+            first = fmt.from_bytes(raw_bytes[:frame_bytes], width, height, *args, **kwargs)
+            data_array = np.empty((frames,) + first.data_array.shape, dtype=first.data_array.dtype)
+            for index in range(frames):
+                start = index * frame_bytes
+                fmt.from_bytes(raw_bytes[start:start + frame_bytes], width, height, *args, out=data_array[index], **kwargs)
+        return cls(fmt, data_array, width, height, palette, tlut)
+
+    @classmethod
+    def from_frames(cls, frames: list) -> "FrameStack":
+        """Stack frames loaded on their own
+
+        Args:
+            frames (list[N64TextureFormat]): Frames of the same format and size, with the same palette for CI formats
+
+        Raises:
+            ValueError: If there are no frames or they don't match
+
+        Returns:
+            FrameStack: FrameStack object
+        """
+        frames = list(frames)
+        if not frames:
+            raise ValueError("A frame stack needs at least one frame")
+        first = frames[0]
+        tlut = getattr(first, "tlut", "rgba5551")
+        for index, frame in enumerate(frames[1:], 1):
+            if type(frame) is not type(first) or (frame.width, frame.height) != (first.width, first.height):
+                raise ValueError(f"Frame {index} is a {frame.width}x{frame.height} {type(frame).__name__}, not {first.width}x{first.height} {type(first).__name__}")
+            if first.indexed and (frame.palette.digest != first.palette.digest or frame.tlut != tlut):
+                raise ValueError(f"Frame {index} doesn't share the first frame's palette")
+        data_array = np.stack([np.asarray(frame.data_array) for frame in frames])
+        return cls(type(first), data_array, first.width, first.height, first.palette if first.indexed else None, tlut)
+
+    def __len__(self) -> int:
+        return self.data_array.shape[0]
+
+    def __getitem__(self, index: int) -> BaseImage:
+        """A single frame, sharing the stack's data and palette"""
+        return self._image(self.data_array[index], self.height)
+
+    def __iter__(self) -> Iterator[BaseImage]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def __repr__(self) -> str:
+        return f"<FrameStack {len(self)} x {self.width}x{self.height} {self.cls.__name__}>"
+
+    def _image(self, data_array: np.ndarray, height: int) -> BaseImage:
+        if self.cls.indexed:
+            return self.cls(data_array, self.width, height, self.palette, self.tlut)
+        return self.cls(data_array, self.width, height)
+
+    def strip(self) -> BaseImage:
+        """Every frame stacked top to bottom as a single image, as animated
+           textures are often laid out in texture packs. Shares the stack's data
+
+        Returns:
+            N64TextureFormat: Image of the frame's format, `height` times the number of frames tall
+        """
+        tall = len(self) * self.height
+        return self._image(self.data_array.reshape((tall,) + self.data_array.shape[2:]), tall)
+
+    def to_bytes(self) -> bytes:
+        """Bytes of every frame back to back, as `from_bytes` reads them
+
+        Returns:
+            bytes: Frame bytes
+        """
+        if (self.width * self.height * self.cls.bits_per_pixel) % 8 == 0:
+            return self.strip().to_bytes()
+        return b"".join(frame.to_bytes() for frame in self)
+
+    def to_rgba(self, threads: Threads = None, out: np.ndarray = None) -> np.ndarray:
+        """Decode every frame to RGBA at once, a single palette gather for CI
+           formats
+
+        Args:
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (frames, height, width, 4) uint8 array to write into. Defaults to None
+
+        Returns:
+            np.ndarray: (frames, height, width, 4) uint8 array
+        """
+        from n64tex.formats.rgba import RGBAImage
+
+        rgba = output_array(out, (len(self), self.height, self.width, 4), np.uint8)
+        strip = self.strip()
+        strip_out = rgba.reshape(-1, self.width, 4)
+        if isinstance(strip, RGBAImage):
+            strip.convert_to(RGBAImage, threads=threads, out=strip_out)
+        else:
+            strip.to_rgba(threads=threads, out=strip_out)
+        return rgba
+
+    def to_images(self, force_rgba: bool = False) -> list:
+        """Every frame as a PIL Image in its format's most compact mode, 'P'
+           images sharing one palette for CI formats
+
+        Args:
+            force_rgba (bool, optional): Always produce 'RGBA' images. Defaults to False
+
+        Returns:
+            list[PIL.Image.Image]: PIL Image of every frame
+        """
+        if force_rgba:
+            return [Image.fromarray(frame) for frame in self.to_rgba()]
+        return [frame.to_image() for frame in self]
+
+    def save(
+        self,
+        filename: str,
+        duration: Union[int, list] = 100,
+        loop: int = 0,
+        force_rgba: bool = False,
+        compress_level: Union[int, str] = None,
+        strategy: str = None,
+    ):
+        """Save as an animated PNG, GIF or WebP, chosen by the file
+           extension. GIFs hold 256 colours at most with 1 bit alpha, so
+           frames of other formats are quantised by PIL
+
+        Args:
+            filename (str): Filename to save to, ending in .png, .apng, .gif or .webp
+            duration (int | list[int], optional): Milliseconds each frame is shown, or a list of them. Defaults to 100
+            loop (int, optional): Times to loop, 0 looping forever. Defaults to 0
+            force_rgba (bool, optional): Save 'RGBA' frames rather than the format's native mode. Defaults to False
+            compress_level (int | str, optional): PNG compression level, see `n64tex.formats.base.png_options`. Defaults to None
+            strategy (str, optional): PNG compression strategy, see `n64tex.formats.base.png_options`. Defaults to None
+
+        Raises:
+            ValueError: If the file extension isn't an animated format, or a PNG option is unknown
+        """
+        image_format = ANIMATED_FORMATS.get(pathlib.Path(filename).suffix.lower())
+        if image_format is None:
+            raise ValueError(f"Can't save an animation as {pathlib.Path(filename).suffix!r}, expected one of {tuple(ANIMATED_FORMATS)}")
+        options = png_options(compress_level, strategy) if image_format == "PNG" else {}
+
+        if image_format == "GIF" and self.cls.indexed and not force_rgba:
+            images = self._gif_images(options)
+        else:
+            images = self.to_images(force_rgba)
+        images[0].save(
+            filename, format=image_format, save_all=True, append_images=images[1:], duration=duration, loop=loop, **options
+        )
+
+    def _gif_images(self, options: dict) -> list:
+        """'P' frames for a GIF, which has no palette alpha, only a single
+           transparent index. Every transparent colour is mapped onto the
+           first, in one gather over all frames
+        """
+        colours = self.palette.decoded(self.tlut)
+        transparent = np.flatnonzero(colours[:, 3] == 0)
+        indices = self.data_array.astype(np.uint8)
+        if len(transparent):
+            # Cleared between frames, or transparent pixels would show the frame before
+            options["transparency"], options["disposal"] = int(transparent[0]), 2
+            remap = np.arange(256, dtype=np.uint8)
+            remap[transparent] = transparent[0]
+            indices = remap[indices]
+
+        images = list()
+        for frame in indices:
+            image = Image.fromarray(frame, "P")
+            image.putpalette(colours[:, :3].tobytes())
+            images.append(image)
+        return images
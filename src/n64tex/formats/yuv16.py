@@ -0,0 +1,196 @@
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from n64tex.formats import RGBAImage
+
+import numpy as np
+from PIL import Image
+
+from n64tex.formats.base import KERNEL_BYTES_PER_PIXEL, BaseImage, Threads, budget_rows, frombuffer, map_row_bands, output_array
+
+# Full range BT.601 RGB to YUV, with U and V centred on 128
+RGB_TO_YUV = np.array([
+    [0.299, 0.587, 0.114],
+    [-0.168736, -0.331264, 0.5],
+    [0.5, -0.418688, -0.081312],
+], dtype=np.float32)
+
+# Contribution of U and V to R, G and B, indexed by the 8 bit chroma value
+_CHROMA = np.arange(256, dtype=np.float64) - 128
+R_FROM_V = np.round(1.402 * _CHROMA).astype(np.int16)
+G_FROM_U = np.round(-0.344136 * _CHROMA).astype(np.int16)
+G_FROM_V = np.round(-0.714136 * _CHROMA).astype(np.int16)
+B_FROM_U = np.round(1.772 * _CHROMA).astype(np.int16)
+
+# Chroma given to the missing half of a pair in odd width rows
+NEUTRAL_CHROMA = 128
+
+# Least squares Y and U of an RGB colour when V is fixed at neutral, for the
+# lone pixel at the end of odd width rows
+LONE_RGB_TO_YU = np.linalg.pinv(np.array([[1, 0], [1, -0.344136], [1, 1.772]])).astype(np.float32)
+
+
+def _pairs(yuv16_array: np.ndarray) -> np.ndarray:
+    """Pad odd width rows to whole UYVY pairs with neutral chroma"""
+    if yuv16_array.shape[-1] % 2 == 0:
+        return yuv16_array
+    padding = np.full(yuv16_array.shape[:-1] + (1,), NEUTRAL_CHROMA << 8, dtype=np.uint16)
+    return np.concatenate((yuv16_array, padding), axis=-1)
+
+
+def yuv16_to_rgba(yuv16_array: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """Expand rows of YUV16 values to opaque RGBA8888. Each pair of pixels
+       along a row shares the U of the first and the V of the second, so
+       the chroma terms are gathered from tables once per pair and added to
+       both luma values
+
+    Args:
+        yuv16_array (np.ndarray): (..., width) array of YUV16 values
+        out (np.ndarray, optional): uint8 array to write the result into. Defaults to None.
+
+    Returns:
+        np.ndarray: uint8 array with an extra trailing axis of length 4
+    """
+    yuv16_array = np.asarray(yuv16_array, dtype=np.uint16)
+    width = yuv16_array.shape[-1]
+    if out is None:
+        out = np.empty(yuv16_array.shape + (4,), dtype=np.uint8)
+
+    pairs = _pairs(yuv16_array)
+    pairs = pairs.reshape(pairs.shape[:-1] + (-1, 2))
+    luma = (pairs & 0xFF).astype(np.int16)
+    u = pairs[..., 0] >> 8
+    v = pairs[..., 1] >> 8
+
+    channel = np.empty_like(luma)
+    for index, offset in enumerate((R_FROM_V[v], G_FROM_U[u] + G_FROM_V[v], B_FROM_U[u])):
+        np.add(luma, offset[..., None], out=channel)
+        np.clip(channel, 0, 255, out=channel)
+        out[..., index] = channel.reshape(channel.shape[:-2] + (-1,))[..., :width]
+    out[..., 3] = 255
+    return out
+
+
+def rgba_to_yuv16(rgba_array: np.ndarray, out: np.ndarray = None) -> np.ndarray:
+    """Reduce rows of RGBA8888 values to YUV16. Every pixel keeps its own
+       luma while each pair along a row shares the mean of their U and V.
+       The lone pixel ending an odd width row has no V, so only its nearest
+       colour with neutral V is kept. Alpha is dropped
+
+    Args:
+        rgba_array (np.ndarray): (..., width, 4) uint8 array
+        out (np.ndarray, optional): uint16 array to write the result into. Defaults to None.
+
+    Returns:
+        np.ndarray: uint16 array without the trailing axis
+    """
+    rgba_array = np.asarray(rgba_array, dtype=np.uint8)
+    width = rgba_array.shape[-2]
+    if out is None:
+        out = np.empty(rgba_array.shape[:-1], dtype=np.uint16)
+
+    yuv = rgba_array[..., :3].astype(np.float32) @ RGB_TO_YUV.T
+    if width % 2:
+        # The lone last pixel only stores U, so fit it to decode well with neutral V
+        yuv[..., -1, :2] = rgba_array[..., -1, :3].astype(np.float32) @ LONE_RGB_TO_YU.T
+        yuv[..., -1, 2] = 0
+        yuv = np.concatenate((yuv, yuv[..., -1:, :]), axis=-2)
+    yuv[..., 1:] += 128
+    pairs = yuv.reshape(yuv.shape[:-2] + (-1, 2, 3))
+    chroma = pairs[..., 1:].mean(axis=-2)
+
+    luma = np.clip(np.rint(pairs[..., 0]), 0, 255).astype(np.uint16)
+    chroma = np.clip(np.rint(chroma), 0, 255).astype(np.uint16)
+    words = luma
+    words[..., 0] |= chroma[..., 0] << 8
+    words[..., 1] |= chroma[..., 1] << 8
+    out[...] = words.reshape(words.shape[:-2] + (-1,))[..., :width]
+    return out
+
+
+class YUV16Image(BaseImage):
+    """YUV16 Image format, as used for video frames and backgrounds. Pixels
+       come in pairs along each row, packed as UYVY. Each pixel is 16 bits
+       long and follows this format
+
+    CCCCCCCC YYYYYYYY
+
+    Where:
+        C = U for the first pixel of a pair and V for the second, from 0-255
+        Y = Luma from 0-255
+
+    Colours are converted with full range BT.601. There is no alpha
+    """
+
+    bits_per_pixel: int = 16
+
+    @classmethod
+    def from_bytes(cls, raw_bytes: bytes, width: int, height: int, *args, out: np.ndarray = None, **kwargs) -> "YUV16Image":
+        """Generate a YUV16Image from byte data
+
+        Args:
+            raw_bytes (bytes): Raw byte data to use
+            width (int): Width of image
+            height (int): Height of image
+            out (np.ndarray, optional): Preallocated (height, width) uint16 array to copy into. Defaults to None
+
+        Returns:
+            YUV16Image: YUV16Image object
+        """
+        data_array = frombuffer(raw_bytes, ">u2", (height, width), out)
+        return cls(data_array, width, height)
+
+    @classmethod
+    def decode_frames(cls, raw_bytes: bytes, width: int, height: int, threads: Threads = None, out: np.ndarray = None) -> np.ndarray:
+        """Decode a sequence of frames stored back to back, such as a video,
+           to RGBA in one pass over every row of every frame
+
+        Args:
+            raw_bytes (bytes): Raw byte data of the frames. A trailing partial frame is ignored
+            width (int): Width of each frame
+            height (int): Height of each frame
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (frames, height, width, 4) uint8 array to write into. Defaults to None
+
+        Returns:
+            np.ndarray: (frames, height, width, 4) uint8 array
+        """
+        frame_words = width * height
+        words = np.frombuffer(raw_bytes, dtype=">u2")
+        frames = words.size // frame_words if frame_words else 0
+        rows = words[:frames * frame_words].reshape(frames * height, width)
+
+        rgba = output_array(out, (frames, height, width, 4), np.uint8)
+        map_row_bands(yuv16_to_rgba, rows, rgba.reshape(frames * height, width, 4), threads)
+        return rgba
+
+    def to_rgba(self, threads: Threads = None, out: np.ndarray = None, max_memory: int = None) -> "RGBAImage":
+        """Converts YUV16Image to RGBAImage
+
+        Args:
+            threads (int | Executor, optional): Convert bands of rows concurrently. Defaults to None
+            out (np.ndarray, optional): Preallocated (height, width, 4) uint8 array to write into. Defaults to None
+            max_memory (int, optional): Bound the working memory to roughly this many bytes by converting in chunks of rows. Defaults to None
+
+        Returns:
+            RGBAImage: Converted RGBAImage object
+        """
+        rgba_data_array = output_array(out, (self.height, self.width, 4), np.uint8)
+        map_row_bands(yuv16_to_rgba, self.data_array, rgba_data_array, threads, budget_rows(max_memory, self.width * KERNEL_BYTES_PER_PIXEL))
+
+        from n64tex.formats.rgba import RGBAImage
+
+        return RGBAImage(rgba_data_array, self.width, self.height)
+
+    def to_image(self, force_rgba: bool = False) -> Image.Image:
+        """Convert to an 'RGB' PIL Image, or 'RGBA' if forced
+
+        Args:
+            force_rgba (bool, optional): Always produce an 'RGBA' image. Defaults to False
+
+        Returns:
+            PIL.Image.Image: PIL Image object
+        """
+        if force_rgba:
+            return super().to_image(force_rgba)
+        return Image.fromarray(np.ascontiguousarray(self.to_rgba().data_array[..., :3]))
@@ -0,0 +1,134 @@
+import re
+
+# Enough of the start of a file to recognise any of the signatures below
+HEADER_SIZE = 16
+
+# Image file signatures PIL can open, checked against the start of the file
+SIGNATURES = (
+    b"\x89PNG\r\n\x1a\n",
+    b"\xff\xd8\xff",  # JPEG
+    b"GIF87a",
+    b"GIF89a",
+    b"BM",  # BMP
+    b"II*\x00",  # TIFF, little endian
+    b"MM\x00*",  # TIFF, big endian
+    b"\x00\x00\x01\x00",  # ICO
+    b"DDS ",
+    b"8BPS",  # PSD
+)
+
+# Netpbm headers, P1-P7 followed by whitespace
+NETPBM = re.compile(rb"P[1-7]\s")
+
+
+def is_image(header: bytes) -> bool:
+    """Check the start of a file for an image file signature. Raw texture
+       bytes could happen to start with one, so a match only means the file
+       is worth handing to PIL
+
+    Args:
+        header (bytes): At least the first `HEADER_SIZE` bytes of the file
+
+    Returns:
+        bool: Whether the file looks like an image file
+    """
+    if header.startswith(SIGNATURES):
+        return True
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return True
+    return NETPBM.match(header) is not None
+
+
+def open_image(path):
+    """Open and fully decode an image file, or give up if PIL can't. A file
+       whose signature matched by chance may be rejected outright, or only
+       fail partway through decoding, such as for being truncated, so both
+       count as not being an image
+
+    Args:
+        path (str | pathlib.Path): File to open
+
+    Returns:
+        PIL.Image.Image | None: Decoded image, or None if the file isn't an image PIL can decode
+    """
+    from PIL import Image
+
+    try:
+        with Image.open(path) as image:
+            image.load()
+            return image
+    except (OSError, ValueError, SyntaxError, EOFError):
+        # UnidentifiedImageError and truncated data are OSErrors. Some plugins raise the others on malformed data
+        return None
+
+
+def candidate_sizes(byte_count: int, bits_per_pixel: int) -> list:
+    """Every (width, height) with a power of two width that exactly fits a
+       number of bytes, best guess first. Square power of two sizes come
+       first, then the closest to square, preferring wider over taller
+
+    Args:
+        byte_count (int): Size of the raw texture in bytes
+        bits_per_pixel (int): Bits per pixel of the format
+
+    Returns:
+        list[tuple[int, int]]: Candidate sizes, empty if none fit
+    """
+    pixels, remainder = divmod(byte_count * 8, bits_per_pixel)
+    if remainder or not pixels:
+        return []
+
+    sizes = list()
+    width = 1
+    while width <= pixels:
+        if pixels % width == 0:
+            sizes.append((width, pixels // width))
+        width *= 2
+
+    def rank(size):
+        width, height = size
+        return (height & (height - 1) != 0, abs(width.bit_length() - height.bit_length()), -width)
+
+    return sorted(sizes, key=rank)
+
+
+def infer_size(byte_count: int, bits_per_pixel: int, width: int = None, height: int = None) -> tuple:
+    """Work out the dimensions of a raw texture from its size, filling in
+       whichever of width and height aren't given
+
+    Args:
+        byte_count (int): Size of the raw texture in bytes
+        bits_per_pixel (int): Bits per pixel of the format
+        width (int, optional): Known width. Defaults to None
+        height (int, optional): Known height. Defaults to None
+
+    Raises:
+        ValueError: If no image of the format could be that many bytes long
+
+    Returns:
+        tuple[int, int]: Width and height
+    """
+    for name, value in (("width", width), ("height", height)):
+        if value is not None and value <= 0:
+            raise ValueError(f"{name} must be positive, not {value}")
+
+    if width and height:
+        needed = (width * height * bits_per_pixel + 7) // 8
+        if byte_count < needed:
+            raise ValueError(
+                f"{byte_count} bytes is too short for a {width}x{height} texture at {bits_per_pixel} bits per pixel, "
+                f"which needs {needed}"
+            )
+        return width, height
+
+    pixels, remainder = divmod(byte_count * 8, bits_per_pixel)
+    if remainder or not pixels:
+        raise ValueError(f"{byte_count} bytes can't hold a whole number of {bits_per_pixel} bit pixels")
+
+    if width or height:
+        known = width or height
+        if pixels % known:
+            raise ValueError(f"{pixels} pixels don't divide into rows or columns of {known}")
+        return (width, pixels // width) if width else (pixels // height, height)
+
+    return candidate_sizes(byte_count, bits_per_pixel)[0]
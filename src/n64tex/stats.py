@@ -0,0 +1,119 @@
+import sys
+import time
+import contextlib
+
+# Bumped whenever a key is renamed or removed, so consumers of `--stats json` can tell
+SCHEMA_VERSION = 1
+
+STAGES = ("decode", "convert", "encode", "write")
+
+
+def peak_rss() -> int:
+    """Peak resident set size of this process
+
+    Returns:
+        int | None: Peak RSS in bytes, or None where it can't be measured
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class ConversionStats:
+    """Measurements from converting a single file. Times are in seconds
+       and split into decoding the input, converting between formats,
+       encoding the outputs and writing them to disk
+    """
+
+    def __init__(self):
+        self.input_file: str = None
+        self.input_format: str = None
+        self.output_format: str = None
+        self.width: int = None
+        self.height: int = None
+        self.bytes_in: int = 0
+        self.bytes_out: int = 0
+        self.palette_size: int = None
+        self.outputs: list = list()
+        self.timings: dict = dict.fromkeys(STAGES, 0.0)
+
+    @contextlib.contextmanager
+    def time(self, stage: str):
+        """Context manager adding the time spent inside it to a stage
+
+        Args:
+            stage (str): One of `STAGES`
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.timings[stage] += time.perf_counter() - start
+
+    @property
+    def pixels(self) -> int:
+        return (self.width or 0) * (self.height or 0)
+
+    @property
+    def total_time(self) -> float:
+        return sum(self.timings.values())
+
+    def to_dict(self) -> dict:
+        """Stats as plain JSON-serialisable types
+
+        Returns:
+            dict: Stats
+        """
+        total_time = self.total_time
+        return {
+            "input_file": self.input_file,
+            "input_format": self.input_format,
+            "output_format": self.output_format,
+            "width": self.width,
+            "height": self.height,
+            "pixels": self.pixels,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "palette_size": self.palette_size,
+            "outputs": list(self.outputs),
+            "timings": dict(self.timings, total=total_time),
+            "pixels_per_second": self.pixels / total_time if total_time else None,
+        }
+
+
+def summarise(stats: list, **counts) -> dict:
+    """Combine the stats of a batch of conversions, adding totals and the
+       peak memory of the process
+
+    Args:
+        stats (list[ConversionStats]): Stats of every conversion in the batch
+        **counts: Extra top level counts, such as how many files were skipped
+
+    Returns:
+        dict: Batch stats
+    """
+    timings = dict.fromkeys(STAGES, 0.0)
+    for conversion in stats:
+        for stage, seconds in conversion.timings.items():
+            timings[stage] += seconds
+    total_time = sum(timings.values())
+    pixels = sum(conversion.pixels for conversion in stats)
+
+    return {
+        "schema": SCHEMA_VERSION,
+        **counts,
+        "files": [conversion.to_dict() for conversion in stats],
+        "totals": {
+            "files": len(stats),
+            "pixels": pixels,
+            "bytes_in": sum(conversion.bytes_in for conversion in stats),
+            "bytes_out": sum(conversion.bytes_out for conversion in stats),
+            "timings": dict(timings, total=total_time),
+            "pixels_per_second": pixels / total_time if total_time else None,
+        },
+        "peak_rss_bytes": peak_rss(),
+    }
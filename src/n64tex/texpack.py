@@ -0,0 +1,386 @@
+import os
+import json
+import mmap
+import pathlib
+
+from collections import defaultdict
+from concurrent.futures import Executor, ThreadPoolExecutor
+
+import numpy as np
+
+# Rice Video texture format codes, G_IM_FMT_* and G_IM_SIZ_*, of each format
+RICE_FORMATS = {
+    "rgba": (0, 3),
+    "rgba5551": (0, 2),
+    "yuv16": (1, 2),
+    "ci4": (2, 0),
+    "ci8": (2, 1),
+    "i4a": (3, 0),
+    "i8a": (3, 1),
+    "ia16": (3, 2),
+    "i4": (4, 0),
+    "i8": (4, 1),
+}
+
+# First word of a ROM in each byte order, big endian (.z64), byteswapped (.v64) and little endian (.n64)
+ROM_MAGIC = {
+    b"\x80\x37\x12\x40": None,
+    b"\x37\x80\x40\x12": ">u2",
+    b"\x40\x12\x37\x80": ">u4",
+}
+
+
+def _format_name(obj) -> str:
+    from n64tex.formats import Formats
+
+    return Formats(type(obj)).name
+
+
+def _row_words(rows: np.ndarray) -> np.ndarray:
+    """The words the CRC reads from each row, last word first and XORed
+       with its offset, as a (..., height, words) uint32 array
+    """
+    bytes_per_line = rows.shape[-1]
+    offsets = np.arange(bytes_per_line - 4, -1, -4)
+    if not len(offsets):
+        return np.zeros(rows.shape[:-1] + (0,), dtype=np.uint32)
+    words = rows[..., offsets[:, None] + np.arange(4)].astype(np.uint32)
+    words = (words[..., 0] << 24) | (words[..., 1] << 16) | (words[..., 2] << 8) | words[..., 3]
+    return words ^ offsets.astype(np.uint32)
+
+
+def rice_crcs(rows: np.ndarray) -> np.ndarray:
+    """Rice Video CRC of a batch of textures with the same dimensions, as
+       used to name hi-res replacements by Rice Video and GLideN64. Every
+       step of the CRC depends on the last, so the batch is hashed in
+       lockstep, one word of every texture per Numpy operation
+
+    The CRC reads each row's 32 bit words from last to first, XORing each
+    with its byte offset, rotating the CRC left 4 bits and adding the word.
+    At the end of a row the last word read is XORed with the row's counter
+    and added again. Rows are walked from the top down while the counter
+    counts down from height - 1, so the top row is XORed with height - 1 and
+    the bottom row with 0. Words are read big endian as on the N64, which is
+    exact for rows that are a multiple of 4 bytes long, as every texture
+    loaded into TMEM is
+
+    Args:
+        rows (np.ndarray): (textures, height, bytes_per_line) uint8 texture data
+
+    Returns:
+        np.ndarray: (textures,) uint32 CRCs
+    """
+    rows = np.asarray(rows, dtype=np.uint8)
+    words = _row_words(rows)
+    height = rows.shape[1]
+    crcs = np.zeros(rows.shape[0], dtype=np.uint32)
+    for row_index in range(height):
+        row = words[:, row_index]
+        for x in range(row.shape[-1]):
+            crcs = ((crcs << 4) | (crcs >> 28)) + row[:, x]
+        last = row[:, -1] if row.shape[-1] else np.zeros_like(crcs)
+        crcs += last ^ np.uint32(height - 1 - row_index)
+    return crcs
+
+
+def rice_crc(raw_bytes: bytes, bytes_per_line: int, height: int) -> int:
+    """Rice Video CRC of a single texture, see `rice_crcs`
+
+    Args:
+        raw_bytes (bytes): Texture data, rows of `bytes_per_line` bytes
+        bytes_per_line (int): Length of each row in bytes
+        height (int): Number of rows
+
+    Returns:
+        int: CRC
+    """
+    rows = np.frombuffer(raw_bytes, dtype=np.uint8, count=bytes_per_line * height)
+    return int(rice_crcs(rows.reshape(1, height, bytes_per_line))[0])
+
+
+def _texture_rows(obj) -> np.ndarray:
+    """Raw texture bytes as (height, bytes_per_line)
+
+    Raises:
+        ValueError: If the rows don't end on a byte boundary
+    """
+    row_bits = obj.width * obj.bits_per_pixel
+    if row_bits % 8:
+        raise ValueError(f"{obj.width} pixel wide rows of {obj.bits_per_pixel} bit pixels don't fill whole bytes")
+    return np.frombuffer(obj.to_bytes(), dtype=np.uint8).reshape(obj.height, row_bits // 8)
+
+
+def _palette_rows(obj) -> np.ndarray:
+    """Palette bytes of a CI texture, zero padded to its full TLUT, as a single row"""
+    colours = np.zeros(2 ** obj.bits_per_pixel, dtype=">u2")
+    palette = np.asarray(obj.palette)[:len(colours)]
+    colours[:len(palette)] = palette
+    return colours.view(np.uint8).reshape(1, -1)
+
+
+def texture_crcs(textures: list) -> list:
+    """Texture and palette CRCs of many textures at once. Textures are
+       batched by their row length and height, and every distinct palette is
+       only hashed once
+
+    Args:
+        textures (list[N64TextureFormat]): Format objects
+
+    Raises:
+        ValueError: If a texture's rows don't fill whole bytes
+
+    Returns:
+        list[tuple[int, int | None]]: Texture CRC and palette CRC of every
+            texture, the palette CRC being None for formats without one
+    """
+    textures = list(textures)
+
+    batches = defaultdict(list)
+    for index, obj in enumerate(textures):
+        batches[(obj.height, (obj.width * obj.bits_per_pixel) // 8)].append(index)
+    crcs = [0] * len(textures)
+    for indices in batches.values():
+        rows = np.stack([_texture_rows(textures[index]) for index in indices])
+        for index, crc in zip(indices, rice_crcs(rows).tolist()):
+            crcs[index] = crc
+
+    # Each distinct palette is only hashed once, batched with others of its size
+    palette_keys = [None if obj.palette is None else _palette_rows(obj).tobytes() for obj in textures]
+    by_size = defaultdict(set)
+    for key in palette_keys:
+        if key is not None:
+            by_size[len(key)].add(key)
+    palette_crcs = {None: None}
+    for keys in by_size.values():
+        keys = sorted(keys)
+        batch = np.frombuffer(b"".join(keys), dtype=np.uint8).reshape(len(keys), 1, -1)
+        palette_crcs.update(zip(keys, rice_crcs(batch).tolist()))
+
+    return [(crc, palette_crcs[key]) for crc, key in zip(crcs, palette_keys)]
+
+
+def pack_name(rom_name: str, obj, crc: int, palette_crc: int = None) -> str:
+    """File name a hi-res texture pack gives a replacement texture
+
+    Args:
+        rom_name (str): Internal name of the ROM, from its header
+        obj (N64TextureFormat): Format object being replaced
+        crc (int): Texture CRC
+        palette_crc (int, optional): Palette CRC of CI textures. Defaults to None
+
+    Returns:
+        str: File name, such as "SUPER MARIO 64#1A2B3C4D#0#2_all.png"
+    """
+    fmt, siz = RICE_FORMATS[_format_name(obj)]
+    name = f"{rom_name}#{crc:08X}#{fmt}#{siz}"
+    if palette_crc is not None:
+        name += f"#{palette_crc:08X}"
+    return f"{name}_all.png"
+
+
+def export_pack(textures, output_dir: str, rom_name: str, threads=None, upscale=None, compress_level=None, png_strategy: str = None) -> dict:
+    """Write textures out as a Rice Video/GLideN64 hi-res texture pack.
+       CRCs are computed in bulk up front and the PNGs written concurrently.
+       Textures with the same name are only written once
+
+    Args:
+        textures (Iterable[N64TextureFormat]): Format objects to export
+        output_dir (str): Directory to write the pack to, usually hires_texture/<rom_name>
+        rom_name (str): Internal name of the ROM, from its header
+        threads (int | Executor, optional): Number of threads, or an executor to
+            write on. Defaults to None, which uses one thread per CPU
+        upscale (Callable, optional): Called with each PIL Image before it's
+            saved, returning the image to save, e.g. an upscaler. Defaults to None
+        compress_level (int | str, optional): PNG compression level, see `n64tex.formats.base.png_options`. Defaults to None
+        png_strategy (str, optional): PNG compression strategy, see `n64tex.formats.base.png_options`. Defaults to None
+
+    Raises:
+        ValueError: If a texture's rows don't fill whole bytes or a PNG option is unknown
+
+    Returns:
+        dict[str, pathlib.Path]: Path written for every texture name
+    """
+    from n64tex.formats.base import png_options
+
+    save_options = png_options(compress_level, png_strategy)
+    textures = list(textures)
+    output_dir = pathlib.Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    jobs = dict()
+    for obj, (crc, palette_crc) in zip(textures, texture_crcs(textures)):
+        jobs.setdefault(pack_name(rom_name, obj, crc, palette_crc), obj)
+
+    def write(name, obj):
+        image = obj.to_image(force_rgba=True)
+        if upscale is not None:
+            image = upscale(image)
+        path = output_dir / name
+        image.save(path, **save_options)
+        return path
+
+    if isinstance(threads, Executor):
+        futures = {name: threads.submit(write, name, obj) for name, obj in jobs.items()}
+        return {name: future.result() for name, future in futures.items()}
+    with ThreadPoolExecutor(threads or os.cpu_count()) as executor:
+        futures = {name: executor.submit(write, name, obj) for name, obj in jobs.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def rom_bytes(path: str) -> np.ndarray:
+    """Read a ROM as big endian (.z64) bytes whatever its byte order
+
+    Args:
+        path (str): ROM file
+
+    Raises:
+        ValueError: If the file doesn't start like an N64 ROM
+
+    Returns:
+        np.ndarray: uint8 ROM contents, memory mapped for big endian ROMs
+    """
+    with open(path, 'rb') as fil:
+        data = np.frombuffer(mmap.mmap(fil.fileno(), 0, access=mmap.ACCESS_READ), dtype=np.uint8)
+    magic = data[:4].tobytes()
+    if magic not in ROM_MAGIC:
+        raise ValueError(f"{path} isn't an N64 ROM, it starts with {magic.hex()}")
+    swap = ROM_MAGIC[magic]
+    if swap is None:
+        return data
+    words = data[:len(data) // np.dtype(swap).itemsize * np.dtype(swap).itemsize].view(swap)
+    return words.byteswap().view(np.uint8)
+
+
+def rom_name(rom: np.ndarray) -> str:
+    """Internal name from a ROM's header, which texture packs are named after
+
+    Args:
+        rom (np.ndarray): Big endian ROM bytes, as from `rom_bytes`
+
+    Returns:
+        str: Name with trailing padding removed
+    """
+    return rom[0x20:0x34].tobytes().decode("ascii", errors="replace").rstrip(" \x00")
+
+
+def _offset(value) -> int:
+    return int(value, 0) if isinstance(value, str) else int(value)
+
+
+def load_texture(rom: np.ndarray, entry: dict, number: int = 0):
+    """Load one texture a manifest entry describes from a ROM. Entries give
+       the "format", "width", "height" and "offset" of a texture, and for CI
+       textures a "palette_offset" and optionally a "tlut" mode. A "length"
+       is checked to cover the texture if given. Offsets and lengths can be
+       numbers or strings such as "0x1000"
+
+    Args:
+        rom (np.ndarray): Big endian ROM bytes, as from `rom_bytes`
+        entry (dict): Manifest entry
+        number (int, optional): Position of the entry in its manifest, for error messages. Defaults to 0
+
+    Raises:
+        ValueError: If the entry is invalid
+
+    Returns:
+        N64TextureFormat: Loaded texture
+    """
+    from n64tex.formats import Formats, Palette
+
+    try:
+        cls = Formats[entry["format"]].value
+        width, height, offset = int(entry["width"]), int(entry["height"]), _offset(entry["offset"])
+        length = _offset(entry["length"]) if "length" in entry else None
+        palette_offset = _offset(entry["palette_offset"]) if "palette_offset" in entry else None
+    except (KeyError, TypeError, ValueError) as exc:
+        # TypeError covers fields of the wrong JSON type, such as null or a list
+        raise ValueError(f"Invalid manifest entry {number}: {exc}") from exc
+
+    size = (width * height * cls.bits_per_pixel + 7) // 8
+    if length is not None and length < size:
+        raise ValueError(f"Manifest entry {number} is {size} bytes long but its length is {entry['length']}")
+    if offset < 0 or offset + size > len(rom):
+        raise ValueError(f"Manifest entry {number} runs past the end of the ROM")
+    raw_bytes = rom[offset:offset + size]
+    if not cls.indexed:
+        return cls.from_bytes(raw_bytes, width, height)
+
+    if palette_offset is None:
+        raise ValueError(f"Manifest entry {number} is {entry['format']} but has no palette_offset")
+    palette = Palette.from_bytes(rom[palette_offset:palette_offset + 2 * 2 ** cls.bits_per_pixel])
+    return cls.from_bytes(raw_bytes, width, height, palette, tlut=entry.get("tlut", "rgba5551"))
+
+
+def load_manifest(rom_path: str, manifest) -> tuple:
+    """Load the textures a manifest lists from a ROM. The manifest is either
+       a JSON object with an optional "rom_name" and a list of "textures",
+       or a JSON lines manifest as `n64tex.extract` reads, each line an
+       entry. Entries are as described in `load_texture`
+
+    Args:
+        rom_path (str): ROM file
+        manifest (str | dict | Iterable[dict]): Manifest file, its parsed contents or its entries
+
+    Raises:
+        ValueError: If the ROM, the manifest or an entry is invalid
+
+    Returns:
+        tuple[str, list[N64TextureFormat]]: ROM name and the textures
+    """
+    from n64tex.extract import iter_manifest
+
+    if isinstance(manifest, (str, os.PathLike)):
+        with open(manifest, 'r') as fil:
+            try:
+                parsed = json.load(fil)
+            except json.JSONDecodeError:
+                # More than one JSON value, so JSON lines
+                parsed = None
+        if isinstance(parsed, dict) and "textures" in parsed:
+            manifest = parsed
+    if isinstance(manifest, dict):
+        name, entries = manifest.get("rom_name"), manifest.get("textures", [])
+    else:
+        name, entries = None, iter_manifest(manifest)
+
+    rom = rom_bytes(rom_path)
+    textures = [load_texture(rom, entry, number) for number, entry in enumerate(entries)]
+    return name or rom_name(rom), textures
+
+
+def pack_cli(argv: list):
+    """Command line util for the `pack` command"""
+    import argparse
+
+    from PIL import Image
+
+    from n64tex import add_png_arguments
+
+    parser = argparse.ArgumentParser(prog="n64tex pack")
+
+    parser.add_argument("rom", help="ROM to read textures from, in any byte order")
+    parser.add_argument("manifest", help="JSON or JSON lines manifest of the textures in the ROM, as extract takes")
+    parser.add_argument("--output_dir", "-o", help="Output directory. Defaults to hires_texture/<rom name>", type=str)
+    parser.add_argument("--rom_name", help="Name to give the textures. Defaults to the name in the ROM header", type=str)
+    parser.add_argument("--threads", type=int, help="Threads to write with. Defaults to one per CPU")
+    parser.add_argument("--scale", type=int, help="Upscale every texture by this factor with nearest neighbour sampling")
+    add_png_arguments(parser)
+
+    args = parser.parse_args(argv[1:])
+
+    def _nearest_upscale(image):
+        return image.resize((image.width * args.scale, image.height * args.scale), Image.Resampling.NEAREST)
+
+    upscale = _nearest_upscale if args.scale and args.scale > 1 else None
+    try:
+        name, textures = load_manifest(args.rom, args.manifest)
+        name = args.rom_name or name
+        output_dir = args.output_dir or os.path.join("hires_texture", name)
+        written = export_pack(
+            textures, output_dir, name, threads=args.threads, upscale=upscale,
+            compress_level=args.compress_level, png_strategy=args.png_strategy,
+        )
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    print(f"Wrote {len(written)} textures to {output_dir}")
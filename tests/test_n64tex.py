@@ -1,16 +1,47 @@
+import os
+import io
+import sys
+import json
+import pickle
+import contextlib
+import pathlib
+import tempfile
 import unittest
+import tracemalloc
+import multiprocessing
+
+from unittest import mock
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 
 import numpy as np
+from PIL import Image
+
+from n64tex import cli, convert_file, parse_size
+from n64tex.build import _copy_outputs, build, MANIFEST_NAME
+from n64tex.sniff import candidate_sizes, infer_size, is_image, open_image
+from n64tex import archive
+from n64tex.archive import ArchiveReader, ArchiveWriter
+from n64tex.batch import SharedArrays, SharedViews, convert_batch
+from n64tex.dedup import find_duplicates
+from n64tex.extract import extract, extract_to, iter_manifest
+from n64tex.formats.base import PALETTE_TABLE_BYTES
+from n64tex.texpack import export_pack, load_manifest, pack_name, rice_crc, rice_crcs, texture_crcs
 
 from n64tex.formats import (
+    Formats,
     RGBAImage,
     RGBA5551Image,
     I4Image,
     I8Image,
     I4AImage,
     I8AImage,
+    IA16Image,
     CI4Image,
     CI8Image,
+    FrameStack,
+    Palette,
+    YUV16Image,
 )
 
 
@@ -71,10 +102,48 @@ class TestRGBAImage(unittest.TestCase):
         self.assertTrue(
             (
                 self.image.to_i4a().data_array
-                == np.array([[8, 8, 8], [4, 15, 11]], dtype=np.uint8)
+                == np.array([[5, 5, 5], [1, 15, 14]], dtype=np.uint8)
+            ).all()
+        )
+
+    def test_conversion_to_i8a(self):
+        self.assertTrue(
+            (
+                self.image.to_i8a().data_array
+                == np.array([[95, 95, 95], [15, 255, 240]], dtype=np.uint8)
             ).all()
         )
 
+    def test_conversion_to_i8_rec601(self):
+        self.assertTrue(
+            (
+                self.image.to_i8(weighting="rec601").data_array
+                == np.array([[77, 149, 29], [0, 255, 255]], dtype=np.uint8)
+            ).all()
+        )
+
+    def test_conversion_to_i4_rec601(self):
+        self.assertTrue(
+            (
+                self.image.to_i4(weighting="rec601").data_array
+                == np.array([[5, 9, 2], [0, 15, 15]], dtype=np.uint8)
+            ).all()
+        )
+
+    def test_unknown_weighting(self):
+        self.assertRaises(ValueError, self.image.to_i8, weighting="average")
+
+    def test_integer_mean_matches_float_mean(self):
+        # Every possible channel sum, including the exact ties that round to even
+        data_array = np.zeros((1, 1021, 4), dtype=np.uint8)
+        totals = np.arange(1021)
+        for channel in range(4):
+            data_array[0, :, channel] = np.clip(totals - 255 * channel, 0, 255)
+        image = RGBAImage(data_array, 1021, 1)
+        average = np.average(data_array, axis=2)
+        self.assertTrue((image.to_i8().data_array == average.astype(np.uint8)).all())
+        self.assertTrue((image.to_i4().data_array == np.round(average / 17).astype(np.uint8)).all())
+
     def test_conversion_to_ci4(self):
         self.assertTrue(
             (
@@ -165,9 +234,13 @@ class TestI4Image(unittest.TestCase):
     def test_bytes(self):
         self.assertEqual(
             self.image.to_bytes(),
-            b"\x07\x07\x07\x03\x0f\x0b",
+            b"\x77\x73\xfb",
         )
 
+    def test_bytes_odd_pixel_count(self):
+        image = I4Image.from_bytes(b"\x12\x30", width=3, height=1)
+        self.assertEqual(image.to_bytes(), b"\x12\x30")
+
     def test_conversion_to_rgba(self):
         self.assertTrue(
             (
@@ -249,7 +322,7 @@ class TestIA4Image(unittest.TestCase):
     def test_bytes(self):
         self.assertEqual(
             self.image.to_bytes(),
-            b"\x07\x07\x07\x03\x0f\x0b",
+            b"\x77\x73\xfb",
         )
 
     def test_conversion_to_rgba(self):
@@ -313,6 +386,127 @@ class TestIA8Image(unittest.TestCase):
         )
 
 
+class TestIA16Image(unittest.TestCase):
+    def setUp(self) -> None:
+        self.image = IA16Image.from_bytes(
+            raw_bytes=b"\x00\xff\x7f\xff\xff\xff\x10\x80\xff\x00\x80\x40",
+            width=3,
+            height=2,
+        )
+        return super().setUp()
+
+    def test_data_array(self):
+        self.assertTrue(
+            (
+                self.image.data_array
+                == np.array([[0x00FF, 0x7FFF, 0xFFFF], [0x1080, 0xFF00, 0x8040]], dtype=np.uint16)
+            ).all(),
+        )
+
+    def test_bytes(self):
+        self.assertEqual(
+            self.image.to_bytes(),
+            b"\x00\xff\x7f\xff\xff\xff\x10\x80\xff\x00\x80\x40",
+        )
+
+    def test_conversion_to_rgba(self):
+        self.assertTrue(
+            (
+                self.image.to_rgba().data_array
+                == np.array(
+                    [
+                        [[0, 0, 0, 255], [127, 127, 127, 255], [255, 255, 255, 255]],
+                        [[16, 16, 16, 128], [255, 255, 255, 0], [128, 128, 128, 64]],
+                    ],
+                    dtype=np.uint8,
+                )
+            ).all()
+        )
+
+    def test_conversion_from_rgba(self):
+        self.assertEqual(self.image.to_rgba().to_ia16().to_bytes(), self.image.to_bytes())
+        rgba_image = RGBAImage(np.array([[[30, 60, 90, 200]]], dtype=np.uint8), 1, 1)
+        self.assertEqual(rgba_image.to_ia16().data_array[0, 0], (60 << 8) | 200)
+        self.assertEqual(rgba_image.to_ia16(weighting="rec601").data_array[0, 0] >> 8, (30 * 77 + 60 * 150 + 90 * 29 + 128) >> 8)
+
+    def test_tint(self):
+        rgba = self.image.to_rgba(colour=(255, 0, 128)).data_array
+        self.assertEqual(rgba[0, 2].tolist(), [255, 0, 128, 255])
+        self.assertEqual(rgba[0, 0].tolist(), [0, 0, 0, 255])
+
+    def test_save(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = pathlib.Path(tmp_dir) / "ia16.png"
+            self.image.save(path)
+            with Image.open(path) as image:
+                self.assertEqual(image.mode, "LA")
+                self.assertEqual(IA16Image.from_image(image).to_bytes(), self.image.to_bytes())
+
+
+class TestYUV16Image(unittest.TestCase):
+    def setUp(self) -> None:
+        self.image = YUV16Image.from_bytes(
+            raw_bytes=b"\x80\x00\x80\xff\x40\x40\x80\x4c\xff\x4c\x80\xc0",
+            width=3,
+            height=2,
+        )
+        return super().setUp()
+
+    def test_data_array(self):
+        self.assertTrue(
+            (
+                self.image.data_array
+                == np.array([[0x8000, 0x80FF, 0x4040], [0x804C, 0xFF4C, 0x80C0]], dtype=np.uint16)
+            ).all(),
+        )
+
+    def test_bytes(self):
+        self.assertEqual(
+            self.image.to_bytes(),
+            b"\x80\x00\x80\xff\x40\x40\x80\x4c\xff\x4c\x80\xc0",
+        )
+
+    def test_conversion_to_rgba(self):
+        # Pairs share the U of their first pixel and the V of their second, the odd pixel out has neutral V
+        self.assertTrue(
+            (
+                self.image.to_rgba().data_array
+                == np.array(
+                    [
+                        [[0, 0, 0, 255], [255, 255, 255, 255], [64, 86, 0, 255]],
+                        [[254, 0, 76, 255], [254, 0, 76, 255], [192, 192, 192, 255]],
+                    ],
+                    dtype=np.uint8,
+                )
+            ).all()
+        )
+
+    def test_conversion_from_rgba(self):
+        rgba_image = RGBAImage(np.array([[[255, 0, 0, 255], [0, 0, 255, 0], [40, 40, 40, 255]]], dtype=np.uint8), 3, 1)
+        yuv16_image = rgba_image.to_yuv16()
+        self.assertTrue((yuv16_image.data_array & 0xFF == [76, 29, 40]).all())
+        # The first pair's chroma is the mean of red and blue, the last pixel keeps its own
+        self.assertEqual((yuv16_image.data_array >> 8).tolist(), [[128 + 42, 128 + 53, 128]])
+        self.assertEqual(rgba_image.convert_to(YUV16Image).to_bytes(), yuv16_image.to_bytes())
+
+    def test_decode_frames(self):
+        frames = RGBAImage(np.random.default_rng(0).integers(0, 256, (3 * 4, 6, 4), dtype=np.uint8), 6, 3 * 4).to_yuv16()
+        raw_bytes = frames.to_bytes() + b"\x80\x00"
+        decoded = YUV16Image.decode_frames(raw_bytes, 6, 4, threads=2)
+        self.assertEqual(decoded.shape, (3, 4, 6, 4))
+        self.assertTrue((decoded.reshape(3 * 4, 6, 4) == frames.to_rgba().data_array).all())
+
+    def test_save(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = pathlib.Path(tmp_dir) / "yuv16.png"
+            # Out of gamut colours are clipped on decoding, so save colours that survive re-encoding
+            self.image = self.image.to_rgba().to_yuv16()
+            self.image.save(path)
+            with Image.open(path) as image:
+                self.assertEqual(image.mode, "RGB")
+                self.assertEqual(YUV16Image.from_image(image).to_rgba().to_bytes(), self.image.to_rgba().to_bytes())
+
+
 class TestCI4Image(unittest.TestCase):
     def setUp(self) -> None:
         self.image = CI4Image.from_bytes(
@@ -342,7 +536,7 @@ class TestCI4Image(unittest.TestCase):
     def test_bytes(self):
         self.assertEqual(
             self.image.to_bytes(),
-            b"\x03\x02\x01\x00\x05\x04",
+            b"\x32\x10\x54",
         )
 
     def test_conversion_to_rgba(self):
@@ -417,5 +611,1491 @@ class TestCI8Image(unittest.TestCase):
         self.assertRaises(AssertionError, CI8Image, None, None, None, np.arange(257))
 
 
+class TestIA16TLUT(unittest.TestCase):
+    def setUp(self) -> None:
+        # IA16 colours: black opaque, grey half transparent, white transparent
+        self.palette = Palette.from_bytes(b"\x00\xff\x80\x80\xff\x00")
+        self.image = CI8Image.from_bytes(b"\x00\x01\x02\x02\x01\x00", 3, 2, self.palette, tlut="ia16")
+        return super().setUp()
+
+    def test_conversion_to_rgba(self):
+        self.assertEqual(
+            self.image.to_rgba().data_array.tolist(),
+            [
+                [[0, 0, 0, 255], [128, 128, 128, 128], [255, 255, 255, 0]],
+                [[255, 255, 255, 0], [128, 128, 128, 128], [0, 0, 0, 255]],
+            ],
+        )
+
+    def test_round_trip(self):
+        rgba_image = self.image.to_rgba()
+        ci8_image = rgba_image.to_ci8()
+        self.assertEqual(ci8_image.tlut, "ia16")
+        self.assertEqual(ci8_image.to_bytes(), self.image.to_bytes())
+
+        ci4_image = rgba_image.to_ci4(tlut="ia16", palette=None)
+        self.assertEqual(ci4_image.to_rgba().data_array.tolist(), rgba_image.data_array.tolist())
+
+        # Without carrying the palette over, the palette is made from the IA16 colours present
+        ci8_image = RGBAImage(rgba_image.data_array, 3, 2).to_ci8(tlut="ia16")
+        self.assertEqual(sorted(ci8_image.palette.colours.tolist()), sorted(self.palette.colours.tolist()))
+        self.assertEqual(ci8_image.to_rgba().data_array.tolist(), rgba_image.data_array.tolist())
+
+    def test_nearest(self):
+        rgba_image = RGBAImage(np.array([[[10, 10, 10, 250], [120, 140, 130, 120]]], dtype=np.uint8), 2, 1)
+        ci8_image = rgba_image.to_ci8(palette=self.palette, tlut="ia16")
+        self.assertEqual(ci8_image.data_array.tolist(), [[0, 1]])
+
+        # Exact matches and first wins agree with the exact lookup
+        self.assertTrue((self.palette.ia16_nearest[self.palette.colours] == np.arange(3)).all())
+
+    def test_memory_budget(self):
+        rgba_image = self.image.to_rgba()
+        large = RGBAImage(np.tile(rgba_image.data_array, (64, 64, 1)), 192, 128)
+        rgba5551_image = large.to_rgba5551()
+        expected = rgba5551_image.to_ci8(tlut="ia16")
+        chunked = rgba5551_image.to_ci8(tlut="ia16", max_memory=PALETTE_TABLE_BYTES + 4096)
+        self.assertEqual(chunked.tlut, "ia16")
+        self.assertEqual(chunked.palette.digest, expected.palette.digest)
+        self.assertEqual(chunked.to_bytes(), expected.to_bytes())
+
+        # Chunked decoding keeps the TLUT mode of every band
+        self.assertEqual(
+            self.image.to_i8(max_memory=1).to_bytes(),
+            self.image.to_i8().to_bytes(),
+        )
+
+    def test_unknown_tlut(self):
+        with self.assertRaises(ValueError):
+            CI8Image.from_bytes(b"\x00", 1, 1, self.palette, tlut="rgba8888")
+
+    def test_archive(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = pathlib.Path(tmp_dir) / "textures.n64a"
+            with ArchiveWriter(path) as writer:
+                writer.add("ia16", self.image)
+                writer.add("rgba5551", self.image.to_rgba().to_ci8(tlut="rgba5551"))
+            with ArchiveReader(path) as reader:
+                self.assertEqual(reader["ia16"].tlut, "ia16")
+                self.assertEqual(reader["rgba5551"].tlut, "rgba5551")
+                self.assertEqual(reader["ia16"].to_rgba().data_array.tolist(), self.image.to_rgba().data_array.tolist())
+
+    def test_cli(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            tmp_dir = pathlib.Path(tmp_dir)
+            (tmp_dir / "ci8_bytes").write_bytes(self.image.to_bytes())
+            (tmp_dir / "palette").write_bytes(self.palette.to_bytes())
+            cli([str(tmp_dir / "ci8_bytes"), "ci8", "rgba,ci8", "--tlut", "ia16", "--palette", str(tmp_dir / "palette"),
+                 "--width", "3", "--height", "2", "-o", str(tmp_dir / "out.png"), "--write_bytes"])
+            with Image.open(tmp_dir / "rgba_out.png") as image:
+                self.assertEqual(np.asarray(image).tolist(), self.image.to_rgba().data_array.tolist())
+            self.assertEqual((tmp_dir / "ci8_out").read_bytes(), self.image.to_bytes())
+            self.assertEqual((tmp_dir / "palette_ci8_out").read_bytes(), self.palette.to_bytes())
+
+
+class TestPalette(unittest.TestCase):
+    def setUp(self) -> None:
+        self.colours = np.array([1, 63, 1985, 63489, 65534, 65535], dtype=np.uint16)
+        self.palette = Palette.of(self.colours)
+        return super().setUp()
+
+    def test_bytes(self):
+        raw_bytes = self.colours.astype(">u2").tobytes()
+        self.assertEqual(self.palette.to_bytes(), raw_bytes)
+        self.assertIs(Palette.from_bytes(raw_bytes), self.palette)
+        self.assertIs(Palette.from_bytes(raw_bytes + b"\x00"), self.palette)
+
+    def test_interned(self):
+        self.assertIs(Palette.of(self.colours.copy()), self.palette)
+        self.assertIs(Palette.of(self.palette), self.palette)
+        self.assertIsNot(Palette.of(self.colours[::-1]), self.palette)
+        self.assertNotEqual(Palette.of(self.colours[::-1]).digest, self.palette.digest)
+
+    def test_rgba(self):
+        self.assertEqual(self.palette.rgba.tolist()[:2], [[0, 0, 0, 255], [0, 0, 248, 255]])
+        self.assertIs(self.palette.rgba, self.palette.rgba)
+        self.assertFalse(self.palette.rgba.flags.writeable)
+
+    def test_array_copy(self):
+        self.assertIs(self.palette.__array__(copy=False), self.palette.colours)
+        self.assertIs(self.palette.__array__(np.uint16, copy=False), self.palette.colours)
+        self.assertFalse(np.shares_memory(np.array(self.palette, copy=True), self.palette.colours))
+        self.assertEqual(np.asarray(self.palette, dtype=np.uint32).tolist(), self.colours.tolist())
+        with self.assertRaises(ValueError):
+            np.asarray(self.palette, dtype=np.uint32, copy=False)
+
+    def test_lookup(self):
+        palette = Palette.of([5, 7, 5])
+        self.assertEqual(palette.lookup[[5, 7, 9]].tolist(), [0, 1, 0])
+        self.assertIs(palette.lookup, palette.lookup)
+
+    def test_nearest(self):
+        rng = np.random.default_rng(0)
+        palette = Palette.of(rng.integers(0, 0x10000, 40))
+        values = np.arange(0x10000)
+        channels = np.stack([values >> 11, (values >> 6) & 31, (values >> 1) & 31], axis=-1)
+        colours = np.asarray(palette)
+        palette_channels = np.stack([colours >> 11, (colours >> 6) & 31, (colours >> 1) & 31], axis=-1)
+        distances = ((channels[:, None, :] - palette_channels[None, :, :]) ** 2).sum(axis=-1)
+        distances += 4096 * ((values[:, None] & 1) != (colours[None, :] & 1))
+        self.assertTrue((palette.nearest == distances.argmin(axis=1)).all())
+
+    def test_nearest_exact_matches(self):
+        palette = Palette.of([5, 7, 5, 0xFFFF])
+        self.assertEqual(palette.nearest[[5, 7, 0xFFFF]].tolist(), [0, 1, 3])
+        self.assertFalse(palette.nearest.flags.writeable)
+
+    def test_map_onto_palette(self):
+        # Black, white and transparent black
+        palette = Palette.of([0x0001, 0xFFFF, 0x0000])
+        image = RGBAImage(np.array([[[10, 10, 10, 255], [240, 200, 250, 255], [255, 255, 255, 0]]], dtype=np.uint8), 3, 1)
+        ci4_image = image.to_ci4(palette=palette)
+        self.assertIs(ci4_image.palette, palette)
+        self.assertEqual(ci4_image.data_array.tolist(), [[0, 1, 2]])
+        self.assertEqual(image.to_rgba5551().to_ci8(palette=palette, max_memory=1).data_array.tolist(), [[0, 1, 2]])
+
+    def test_array_like(self):
+        self.assertEqual(len(self.palette), 6)
+        self.assertEqual(self.palette[1], 63)
+        self.assertTrue((self.palette == self.colours).all())
+        self.assertTrue((np.asarray(self.palette) == self.colours).all())
+        self.assertRaises(TypeError, hash, self.palette)
+
+    def test_shared_between_images(self):
+        image = RGBAImage(np.arange(64, dtype=np.uint8).reshape(4, 4, 4) * 4, 4, 4)
+        ci8_image, other = image.to_ci8(), image.to_ci8()
+        self.assertIsInstance(ci8_image.palette, Palette)
+        self.assertIs(ci8_image.palette, other.palette)
+        self.assertIs(CI8Image(ci8_image.data_array, 4, 4, np.array(ci8_image.palette)).palette, ci8_image.palette)
+
+    def test_cli_ci4_palette_file(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = pathlib.Path(temp_dir)
+            (path / "texture").write_bytes(bytes(range(0, 256, 17)) * 2)
+            (path / "palette").write_bytes(np.arange(16, dtype=">u2").tobytes())
+            cli([str(path / "texture"), "ci4", "rgba", "--palette", str(path / "palette"), "-o", str(path / "out.png")])
+            with Image.open(path / "out.png") as image:
+                self.assertEqual(image.size, (8, 8))
+
+
+class TestFrameStack(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        self.palette = Palette.of(rng.integers(0, 0x10000, 256) | 1)
+        self.raw_bytes = rng.integers(0, 256, 6 * 8 * 4, dtype=np.uint8).tobytes()
+        self.stack = FrameStack.from_bytes("ci8", self.raw_bytes, 8, 4, palette_bytes=self.palette.to_bytes())
+        return super().setUp()
+
+    def test_from_bytes(self):
+        self.assertEqual(len(self.stack), 6)
+        self.assertEqual(self.stack.data_array.shape, (6, 4, 8))
+        self.assertTrue(all(frame.palette is self.stack.palette for frame in self.stack))
+        self.assertEqual(self.stack.to_bytes(), self.raw_bytes)
+        self.assertEqual(self.stack[2].to_bytes(), self.raw_bytes[64:96])
+        self.assertEqual(len(FrameStack.from_bytes("ci8", self.raw_bytes, 8, 4, frames=2, palette_bytes=self.palette)), 2)
+
+        with self.assertRaises(ValueError):
+            FrameStack.from_bytes("ci8", self.raw_bytes, 8, 4)
+        with self.assertRaises(ValueError):
+            FrameStack.from_bytes("ci8", self.raw_bytes, 8, 4, frames=7, palette_bytes=self.palette)
+
+    def test_to_rgba(self):
+        rng = np.random.default_rng(1)
+        for fmt, width, height in [("ci8", 8, 4), ("ci4", 3, 5), ("rgba5551", 5, 2), ("i4", 3, 3), ("yuv16", 6, 2), ("rgba", 2, 2)]:
+            with self.subTest(format=fmt):
+                cls = Formats[fmt].value
+                frame_bytes = (width * height * cls.bits_per_pixel + 7) // 8
+                frames = rng.integers(0, 256, (5, frame_bytes), dtype=np.uint8)
+                if (width * height * cls.bits_per_pixel) % 8:
+                    # Odd pixel counts are padded with a zero nibble
+                    frames[:, -1] &= 0xF0
+                raw_bytes = frames.tobytes()
+                palette = Palette.of(self.palette.colours[:2 ** cls.bits_per_pixel])
+                stack = FrameStack.from_bytes(fmt, raw_bytes, width, height, palette_bytes=palette)
+                self.assertEqual(stack.to_bytes(), raw_bytes)
+                rgba = stack.to_rgba(threads=2)
+                for index, frame in enumerate(stack):
+                    expected = frame.convert_to(RGBAImage).data_array
+                    self.assertTrue((rgba[index] == expected).all())
+
+    def test_from_frames(self):
+        frames = [CI8Image.from_bytes(self.raw_bytes[index * 32:(index + 1) * 32], 8, 4, self.palette.to_bytes()) for index in range(6)]
+        stack = FrameStack.from_frames(frames)
+        self.assertEqual(stack.to_bytes(), self.raw_bytes)
+        self.assertIs(stack.palette, self.palette)
+
+        with self.assertRaises(ValueError):
+            FrameStack.from_frames([frames[0], CI8Image.from_bytes(bytes(32), 8, 4, bytes(512))])
+        with self.assertRaises(ValueError):
+            FrameStack.from_frames([frames[0], RGBA5551Image.from_bytes(bytes(64), 8, 4)])
+        with self.assertRaises(ValueError):
+            FrameStack.from_frames([])
+
+    def test_strip(self):
+        strip = self.stack.strip()
+        self.assertIsInstance(strip, CI8Image)
+        self.assertEqual((strip.width, strip.height), (8, 24))
+        self.assertEqual(strip.to_bytes(), self.raw_bytes)
+        self.assertTrue(np.shares_memory(strip.data_array, self.stack.data_array))
+
+    def test_save(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            for name in ("frames.png", "frames.gif"):
+                path = pathlib.Path(temp_dir) / name
+                self.stack.save(path, duration=50)
+                with Image.open(path) as image:
+                    self.assertEqual(image.n_frames, 6)
+                    image.seek(4)
+                    self.assertTrue((np.asarray(image.convert("RGBA")) == self.stack.to_rgba()[4]).all())
+            with self.assertRaises(ValueError):
+                self.stack.save(pathlib.Path(temp_dir) / "frames.bmp")
+
+
+class TestArrayInterface(unittest.TestCase):
+    def setUp(self) -> None:
+        self.raw_bytes = bytes(range(4 * 3 * 2))
+        self.image = RGBAImage.from_bytes(self.raw_bytes, width=3, height=2)
+        return super().setUp()
+
+    def test_from_bytes_is_view(self):
+        self.assertFalse(self.image.data_array.flags.owndata)
+        self.assertEqual(self.image.to_bytes(), self.raw_bytes)
+
+    def test_from_bytes_wrong_size_is_padded(self):
+        image = RGBAImage.from_bytes(self.raw_bytes[:-4], width=3, height=2)
+        self.assertEqual(image.to_bytes(), self.raw_bytes[:-4] + b"\x00" * 4)
+
+    def test_from_bytes_native_order(self):
+        raw_bytes = bytes(range(256)) * 2
+        for cls in (RGBA5551Image, IA16Image, YUV16Image):
+            with self.subTest(cls=cls.__name__):
+                image = cls.from_bytes(raw_bytes, width=16, height=16)
+                # IA16 only gathers from tables, so it keeps a view of the big endian bytes
+                self.assertEqual(image.data_array.dtype.isnative, cls is not IA16Image)
+                self.assertEqual(image.data_array[0, 0], 0x0001)
+                self.assertEqual(image.to_bytes(), raw_bytes)
+                out = np.empty((16, 16), dtype=np.uint16)
+                self.assertEqual(cls.from_bytes(raw_bytes, width=16, height=16, out=out).to_bytes(), raw_bytes)
+                self.assertEqual(cls.from_bytes(raw_bytes, width=16, height=16, out=out), image)
+            with self.subTest(cls=cls.__name__, padded=True):
+                # Padded loads are native for every format but IA16
+                padded = cls.from_bytes(raw_bytes[:-2], width=16, height=16)
+                self.assertEqual(padded.data_array.dtype.isnative, cls is not IA16Image)
+                self.assertEqual(padded.to_bytes(), raw_bytes[:-2] + bytes(2))
+
+        ia16_bytes = bytearray(raw_bytes)
+        ia16_image = IA16Image.from_bytes(ia16_bytes, width=16, height=16)
+        self.assertTrue(np.shares_memory(ia16_image.data_array, np.frombuffer(ia16_bytes, np.uint8)))
+        self.assertEqual(ia16_image.to_rgba(), IA16Image(ia16_image.data_array.astype(np.uint16), 16, 16).to_rgba())
+
+        palette = Palette.from_bytes(raw_bytes[:32])
+        self.assertTrue(palette.colours.dtype.isnative)
+        self.assertEqual(palette.to_bytes(), raw_bytes[:32])
+
+    def test_asarray_shares_memory(self):
+        array = np.asarray(self.image)
+        self.assertTrue(np.shares_memory(array, self.image.data_array))
+        self.assertEqual(array.shape, (2, 3, 4))
+
+    def test_array_dtype(self):
+        image = RGBA5551Image.from_bytes(b"\xf8\x01\x07\xc1", width=2, height=1)
+        self.assertEqual(np.asarray(image, dtype=np.uint32).tolist(), [[63489, 1985]])
+
+    def test_pil_fromarray(self):
+        image = Image.fromarray(np.asarray(self.image))
+        self.assertEqual(image.mode, "RGBA")
+        self.assertEqual(image.tobytes(), self.raw_bytes)
+
+    @unittest.skipIf(sys.version_info < (3, 12), "Python buffer protocol requires 3.12")
+    def test_memoryview(self):
+        self.assertEqual(memoryview(self.image).tobytes(), self.raw_bytes)
+
+    @unittest.skipIf(sys.version_info < (3, 12), "Python buffer protocol requires 3.12")
+    def test_memoryview_strided(self):
+        image = RGBAImage(self.image.data_array[:, ::2], 2, 2)
+        view = memoryview(image)
+        self.assertFalse(view.c_contiguous)
+        self.assertEqual(view.tobytes(), image.data_array.tobytes())
+
+    def test_memoryview_fallback(self):
+        self.assertEqual(memoryview(np.asarray(self.image)).tobytes(), self.raw_bytes)
+
+    def test_array_copy(self):
+        self.assertIs(self.image.__array__(copy=False), self.image.data_array)
+        self.assertFalse(np.shares_memory(np.array(self.image, copy=True), self.image.data_array))
+        with self.assertRaises(ValueError):
+            np.array(self.image, dtype=np.uint16, copy=False)
+
+    def test_from_bytes_read_only(self):
+        # Views of immutable bytes can't be written to, unlike views of a bytearray
+        self.assertFalse(self.image.data_array.flags.writeable)
+        image = RGBAImage.from_bytes(bytearray(self.raw_bytes), width=3, height=2)
+        image.data_array[0, 0] = 0
+        self.assertEqual(image.to_bytes()[:4], bytes(4))
+
+    @unittest.skipIf(sys.version_info < (3, 12), "Python buffer protocol requires 3.12")
+    def test_pil_frombuffer(self):
+        image = Image.frombuffer("RGBA", (3, 2), self.image, "raw", "RGBA", 0, 1)
+        self.assertEqual(image.tobytes(), self.raw_bytes)
+
+    def test_from_image(self):
+        image = Image.frombytes("RGBA", (3, 2), self.raw_bytes)
+        self.assertEqual(RGBAImage.from_image(image).to_bytes(), self.raw_bytes)
+
+    def test_from_image_rgb(self):
+        image = Image.new("RGB", (3, 2), (1, 2, 3))
+        self.assertEqual(RGBAImage.from_image(image).to_bytes(), b"\x01\x02\x03\xff" * 6)
+
+
+class TestNativeSave(unittest.TestCase):
+    def save_and_load(self, image, **kwargs):
+        buffer = io.BytesIO()
+        image.to_image(**kwargs).save(buffer, format="PNG")
+        buffer.seek(0)
+        return Image.open(buffer)
+
+    def assert_native(self, image, mode):
+        saved = self.save_and_load(image)
+        self.assertEqual(saved.mode, mode)
+        self.assertTrue((np.asarray(saved.convert("RGBA")) == image.to_rgba().data_array).all())
+        forced = self.save_and_load(image, force_rgba=True)
+        self.assertEqual(forced.mode, "RGBA")
+        self.assertTrue((np.asarray(forced) == image.to_rgba().data_array).all())
+
+    def test_i4(self):
+        self.assert_native(I4Image(np.arange(16, dtype=np.uint8).reshape(4, 4), 4, 4), "LA")
+
+    def test_i4a(self):
+        self.assert_native(I4AImage(np.arange(16, dtype=np.uint8).reshape(4, 4), 4, 4), "LA")
+
+    def test_i8(self):
+        self.assert_native(I8Image(np.arange(256, dtype=np.uint8).reshape(16, 16), 16, 16), "LA")
+
+    def test_i8a(self):
+        self.assert_native(I8AImage(np.arange(256, dtype=np.uint8).reshape(16, 16), 16, 16), "LA")
+
+    def test_ci4(self):
+        image = CI4Image.from_bytes(b"\x32\x10\x54", 3, 2, b"\x00\x01\x00?\x07\xc1\xf8\x01\xff\xfe\xff\xff")
+        self.assert_native(image, "P")
+
+    def test_ci8(self):
+        palette = np.arange(0, 65536, 256, dtype=">u2").tobytes()
+        image = CI8Image.from_bytes(np.arange(256, dtype=np.uint8).tobytes(), 16, 16, palette)
+        self.assert_native(image, "P")
+
+    def test_save_file(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            filename = pathlib.Path(temp_dir) / "i8.png"
+            I8Image(np.arange(16, dtype=np.uint8).reshape(4, 4), 4, 4).save(filename)
+            self.assertEqual(Image.open(filename).mode, "LA")
+            I8Image(np.arange(16, dtype=np.uint8).reshape(4, 4), 4, 4).save(filename, force_rgba=True)
+            self.assertEqual(Image.open(filename).mode, "RGBA")
+
+    def test_compression(self):
+        image = I8Image(np.tile(np.arange(64, dtype=np.uint8), (64, 1)), 64, 64)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            sizes = dict()
+            for level, strategy in [(None, None), ("raw", None), (9, "rle"), ("fast", "huffman")]:
+                filename = pathlib.Path(temp_dir) / f"{level}_{strategy}.png"
+                image.save(filename, compress_level=level, strategy=strategy)
+                sizes[level] = filename.stat().st_size
+                with Image.open(filename) as saved:
+                    self.assertTrue((np.asarray(saved)[..., 0] == image.data_array).all())
+            self.assertGreater(sizes["raw"], 2 * 64 * 64)
+            self.assertLess(sizes[9], sizes["raw"])
+
+            # CI images pass the options on to their palette too
+            ci4_image = CI4Image.from_bytes(bytes(range(32)), 8, 8, bytes(32))
+            ci4_image.save(pathlib.Path(temp_dir) / "ci4.png", save_palette=True, compress_level="raw")
+            self.assertGreater((pathlib.Path(temp_dir) / "palette_ci4.png").stat().st_size, 4 * 4 * 4)
+
+            for level, strategy in [(10, None), ("smallest", None), (None, "zip")]:
+                with self.assertRaises(ValueError):
+                    image.save(pathlib.Path(temp_dir) / "bad.png", compress_level=level, strategy=strategy)
+
+    def test_compression_cli(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            source = pathlib.Path(temp_dir) / "source.png"
+            Image.fromarray(np.zeros((32, 32, 4), dtype=np.uint8)).save(source)
+            raw_file, default_file = pathlib.Path(temp_dir) / "raw.png", pathlib.Path(temp_dir) / "default.png"
+            cli([str(source), "rgba5551", "-o", str(raw_file), "--compress_level", "raw"])
+            cli([str(source), "rgba5551", "-o", str(default_file), "--compress_level", "6", "--png_strategy", "rle"])
+            self.assertGreater(raw_file.stat().st_size, default_file.stat().st_size)
+            with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+                cli([str(source), "rgba5551", "--compress_level", "11"])
+
+
+class TestPaletteImport(unittest.TestCase):
+    def setUp(self) -> None:
+        self.image = CI4Image.from_bytes(
+            raw_bytes=b"\x32\x10\x54",
+            width=3,
+            height=2,
+            palette_bytes=b"\x00\x01\x00?\x07\xc1\xf8\x01\xff\xfe\xff\xff",
+        )
+        return super().setUp()
+
+    def test_ci4_round_trip(self):
+        image = CI4Image.from_image(self.image.to_image())
+        self.assertTrue((image.data_array == self.image.data_array).all())
+        self.assertTrue((image.palette == self.image.palette).all())
+
+    def test_ci8_round_trip(self):
+        image = CI8Image.from_image(self.image.to_image())
+        self.assertTrue((image.data_array == self.image.data_array).all())
+        self.assertTrue((image.palette == self.image.palette).all())
+
+    def test_png_round_trip(self):
+        buffer = io.BytesIO()
+        self.image.to_image().save(buffer, format="PNG")
+        buffer.seek(0)
+        image = CI4Image.from_image(Image.open(buffer))
+        self.assertTrue((image.data_array == self.image.data_array).all())
+        self.assertTrue((image.palette == self.image.palette).all())
+
+    def test_unused_palette_entries_trimmed(self):
+        image = Image.frombytes("P", (2, 2), b"\x00\x01\x02\x03")
+        image.putpalette(bytes(range(60)))
+        ci4_image = CI4Image.from_image(image)
+        self.assertEqual(len(ci4_image.palette), 4)
+        self.assertTrue((ci4_image.to_rgba().data_array == RGBAImage.from_image(image).to_rgba5551().to_rgba().data_array).all())
+
+    def test_too_many_colours_falls_back(self):
+        image = Image.frombytes("P", (4, 1), b"\x00\x10\x00\x10")
+        image.putpalette(bytes(range(60)))
+        ci4_image = CI4Image.from_image(image)
+        self.assertEqual(len(ci4_image.palette), 2)
+
+
+class TestArchive(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.temp_dir.name) / "textures.n64a"
+        palette_bytes = b"\x00\x01\x00?\x07\xc1\xf8\x01\xff\xfe\xff\xff"
+        self.textures = {
+            "rgba5551": RGBA5551Image.from_bytes(b"\xf8\x01\x07\xc1\x00?\x00\x01\xff\xff\xff\xfe", 3, 2),
+            "ci4": CI4Image.from_bytes(b"\x32\x10\x54", 3, 2, palette_bytes),
+            "ci8": CI8Image.from_bytes(b"\x03\x02\x01\x00\x05\x04", 3, 2, palette_bytes),
+            "i4": I4Image.from_bytes(b"\x77\x73\xfb", 3, 2),
+        }
+        with ArchiveWriter(self.path) as writer:
+            for name, texture in self.textures.items():
+                writer.add(name, texture)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+        return super().tearDown()
+
+    def assert_same(self, texture, other):
+        self.assertIs(type(texture), type(other))
+        self.assertEqual((texture.width, texture.height), (other.width, other.height))
+        self.assertEqual(texture.to_bytes(), other.to_bytes())
+        if other.palette is not None:
+            self.assertTrue((texture.palette == other.palette).all())
+
+    def test_read_by_name(self):
+        with ArchiveReader(self.path) as reader:
+            self.assertEqual(len(reader), 4)
+            for name, texture in self.textures.items():
+                self.assert_same(reader[name], texture)
+
+    def test_read_by_index(self):
+        with ArchiveReader(self.path) as reader:
+            self.assertEqual(reader.names(), list(self.textures))
+            self.assert_same(reader[2], self.textures["ci8"])
+
+    def test_palettes_shared(self):
+        with ArchiveReader(self.path) as reader:
+            self.assertEqual(len(reader.palette_table), 1)
+
+    def test_payloads_aligned(self):
+        with ArchiveReader(self.path) as reader:
+            self.assertTrue((reader.index["offset"] % 16 == 0).all())
+
+    def test_append(self):
+        with ArchiveWriter(self.path, append=True) as writer:
+            writer.add("i8", I8Image.from_bytes(b"\x7f\x7f\x7f?\xff\xbf", 3, 2))
+        with ArchiveReader(self.path) as reader:
+            self.assertEqual(len(reader), 5)
+            self.assertEqual(len(reader.palette_table), 1)
+            self.assertEqual(reader["i8"].to_bytes(), b"\x7f\x7f\x7f?\xff\xbf")
+            self.assert_same(reader["ci4"], self.textures["ci4"])
+
+    def test_append_reads_no_payloads(self):
+        with mock.patch.object(ArchiveReader, "raw_bytes", side_effect=AssertionError("payload read")):
+            with ArchiveWriter(self.path, append=True) as writer:
+                writer.add("ci4 again", self.textures["ci4"])
+        with ArchiveReader(self.path) as reader:
+            # The existing payload was found from the index's digests
+            self.assertEqual(reader.index["offset"][-1], reader.index["offset"][reader.find("ci4")])
+
+    def test_version_1(self):
+        # Rewrite the archive with the version 1 index, which has no digests
+        with ArchiveReader(self.path) as reader:
+            header = list(archive.HEADER.unpack_from(reader._mmap))
+            payloads = bytes(reader._mmap[:header[5]])
+            index = np.array([entry[:-1] for entry in reader.index.tolist()], dtype=archive.ENTRY_DTYPES[1]).tobytes()
+            names = reader.names_bytes
+        header[1] = 1
+        header[6] = len(payloads) + len(index)
+        self.path.write_bytes(archive.HEADER.pack(*header) + payloads[archive.HEADER.size:] + index + names)
+
+        with ArchiveReader(self.path) as reader:
+            self.assertEqual(reader.version, 1)
+            self.assert_same(reader["ci4"], self.textures["ci4"])
+        with ArchiveWriter(self.path, append=True) as writer:
+            writer.add("ci4 again", self.textures["ci4"])
+        with ArchiveReader(self.path) as reader:
+            self.assertEqual(reader.version, archive.VERSION)
+            self.assertEqual(reader.index["offset"][-1], reader.index["offset"][reader.find("ci4")])
+            for name, texture in self.textures.items():
+                self.assert_same(reader[name], texture)
+
+    def test_too_large(self):
+        with ArchiveWriter(self.path, append=True) as writer:
+            with self.assertRaises(ValueError):
+                writer.add("wide", I8Image(np.zeros((1, 70000), dtype=np.uint8), 70000, 1))
+        with ArchiveReader(self.path) as reader:
+            self.assertEqual(len(reader), 4)
+
+    def test_contains(self):
+        with ArchiveReader(self.path) as reader:
+            self.assertIn("ci4", reader)
+            self.assertNotIn("missing", reader)
+
+    def test_not_an_archive(self):
+        self.path.write_bytes(b"\x00" * 64)
+        self.assertRaises(ValueError, ArchiveReader, self.path)
+
+
+class TestThreadedConversion(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        colours = rng.integers(0, 256, (16, 4), dtype=np.uint8)
+        self.image = RGBAImage(colours[rng.integers(0, 16, (61, 97))], 97, 61)
+        return super().setUp()
+
+    def assert_identical(self, name, threads):
+        single = getattr(self.image, name)()
+        threaded = getattr(self.image, name)(threads=threads)
+        self.assertTrue((single.data_array == threaded.data_array).all(), name)
+        self.assertTrue((single.to_rgba().data_array == threaded.to_rgba(threads=threads).data_array).all(), name)
+
+    def test_threads(self):
+        for name in ["to_rgba5551", "to_i4", "to_i4a", "to_i8", "to_i8a", "to_ci4", "to_ci8"]:
+            self.assert_identical(name, 4)
+
+    def test_executor(self):
+        with ThreadPoolExecutor(3) as executor:
+            for name in ["to_rgba5551", "to_i8", "to_ci8"]:
+                self.assert_identical(name, executor)
+
+    def test_executor_workers(self):
+        class CountingExecutor(Executor):
+            # Not a stdlib pool, so there's no private worker count to read
+            def __init__(self):
+                self.submitted = 0
+
+            def submit(self, fn, *args, **kwargs):
+                self.submitted += 1
+                future = Future()
+                future.set_result(fn(*args, **kwargs))
+                return future
+
+        executor = CountingExecutor()
+        self.assert_identical("to_rgba5551", (executor, 5))
+        self.assertEqual(executor.submitted, 2 * 5)
+        executor.submitted = 0
+        with mock.patch("os.cpu_count", return_value=3):
+            self.image.to_rgba5551(threads=executor)
+        self.assertEqual(executor.submitted, 3)
+        for threads in ((executor, 0), (executor, 2.5), (3, 3)):
+            with self.subTest(threads=threads), self.assertRaises(ValueError):
+                self.image.to_rgba5551(threads=threads)
+
+    def test_more_threads_than_rows(self):
+        image = RGBAImage(self.image.data_array[:2], 97, 2)
+        self.assertTrue((image.to_rgba5551(threads=8).data_array == image.to_rgba5551().data_array).all())
+
+    def test_convert_to(self):
+        threaded = self.image.to_rgba5551().convert_to(CI8Image, threads=4)
+        self.assertTrue((threaded.data_array == self.image.to_ci8().data_array).all())
+
+
+class TestOutputArrays(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        colours = rng.integers(0, 256, (16, 4), dtype=np.uint8)
+        self.image = RGBAImage(colours[rng.integers(0, 16, (9, 7))], 7, 9)
+        return super().setUp()
+
+    def test_encoders(self):
+        for name in ["to_rgba5551", "to_i4", "to_i4a", "to_i8", "to_i8a", "to_ci4", "to_ci8"]:
+            expected = getattr(self.image, name)()
+            out = np.empty_like(expected.data_array)
+            converted = getattr(self.image, name)(out=out)
+            self.assertIs(converted.data_array, out, name)
+            self.assertTrue((out == expected.data_array).all(), name)
+
+    def test_decoders(self):
+        out = np.empty((9, 7, 4), dtype=np.uint8)
+        for name in ["to_rgba5551", "to_i4", "to_i4a", "to_i8", "to_i8a", "to_ci4", "to_ci8"]:
+            converted = getattr(self.image, name)()
+            rgba_image = converted.to_rgba(out=out)
+            self.assertIs(rgba_image.data_array, out, name)
+            self.assertTrue((out == converted.to_rgba().data_array).all(), name)
+
+    def test_from_bytes(self):
+        for name in ["to_rgba5551", "to_i4", "to_i4a", "to_i8", "to_i8a", "to_ci4", "to_ci8"]:
+            converted = getattr(self.image, name)()
+            palette_bytes = None if converted.palette is None else converted.palette.astype(">u2").tobytes()
+            out = np.empty_like(converted.data_array)
+            decoded = type(converted).from_bytes(converted.to_bytes(), 7, 9, palette_bytes, out=out)
+            self.assertIs(decoded.data_array, out, name)
+            self.assertEqual(decoded.to_bytes(), converted.to_bytes(), name)
+
+    def test_from_bytes_padding(self):
+        out = np.full((2, 3), 9, dtype=np.uint8)
+        I4Image.from_bytes(b"\x12", 3, 2, out=out)
+        self.assertEqual(out.tolist(), [[1, 2, 0], [0, 0, 0]])
+        I8Image.from_bytes(b"\x01\x02\x03\x04\x05\x06\x07", 3, 2, out=out)
+        self.assertEqual(out.tolist(), [[1, 2, 3], [4, 5, 6]])
+
+    def test_convert_to(self):
+        out = np.empty((9, 7), dtype=np.uint16)
+        converted = self.image.to_ci8().convert_to(RGBA5551Image, out=out)
+        self.assertIs(converted.data_array, out)
+        self.assertTrue((out == self.image.to_rgba5551().data_array).all())
+
+    def test_reuse(self):
+        out = np.empty((9, 7), dtype=np.uint8)
+        first = self.image.to_i8(out=out).data_array.copy()
+        RGBAImage(np.zeros((9, 7, 4), dtype=np.uint8), 7, 9).to_i8(out=out)
+        self.assertTrue((out == 0).all())
+        self.image.to_i8(out=out)
+        self.assertTrue((out == first).all())
+
+    def test_wrong_shape(self):
+        self.assertRaises(ValueError, self.image.to_i8, out=np.empty((7, 9), dtype=np.uint8))
+
+    def test_wrong_dtype(self):
+        self.assertRaises(ValueError, self.image.to_rgba5551, out=np.empty((9, 7), dtype=np.uint8))
+
+    def test_not_contiguous(self):
+        self.assertRaises(ValueError, self.image.to_i8, out=np.empty((9, 14), dtype=np.uint8)[:, ::2])
+
+
+class TestMemoryBudget(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        colours = rng.integers(0, 256, (16, 4), dtype=np.uint8)
+        self.image = RGBAImage(colours[rng.integers(0, 16, (61, 97))], 97, 61)
+        return super().setUp()
+
+    def test_identical(self):
+        # A tiny budget converts a single row at a time
+        for source in [self.image, self.image.to_rgba5551(), self.image.to_i4a(), self.image.to_ci4()]:
+            for cls in [RGBAImage, RGBA5551Image, I4Image, I8AImage, CI4Image, CI8Image]:
+                expected = source.convert_to(cls)
+                chunked = source.convert_to(cls, max_memory=1)
+                self.assertIs(type(chunked), cls)
+                self.assertTrue((chunked.data_array == expected.data_array).all(), (type(source), cls))
+                if expected.palette is not None:
+                    self.assertTrue((chunked.palette == expected.palette).all(), (type(source), cls))
+
+    def test_threads(self):
+        ci8_image = self.image.to_ci8()
+        chunked = ci8_image.to_i8(threads=3, max_memory=4096)
+        self.assertTrue((chunked.data_array == ci8_image.to_i8().data_array).all())
+
+    def test_peak_memory(self):
+        rng = np.random.default_rng(1)
+        colours = rng.integers(0, 256, (256, 4), dtype=np.uint8)
+        ci8_image = RGBAImage(colours[rng.integers(0, 256, (512, 512))], 512, 512).to_ci8()
+        max_memory = 256 * 1024
+
+        for cls, shape, dtype in [(RGBAImage, (512, 512, 4), np.uint8), (RGBA5551Image, (512, 512), np.uint16), (I4Image, (512, 512), np.uint8)]:
+            out = np.empty(shape, dtype=dtype)
+            tracemalloc.start()
+            try:
+                ci8_image.convert_to(cls, out=out, max_memory=max_memory)
+                _, peak = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+            self.assertLess(peak, max_memory, cls)
+
+    def test_palette_peak_memory(self):
+        image = RGBAImage(np.repeat(self.image.data_array, 8, axis=0).repeat(8, axis=1), 776, 488)
+        out = np.empty((488, 776), dtype=np.uint8)
+        max_memory = 384 * 1024
+        tracemalloc.start()
+        try:
+            image.to_ci8(out=out, max_memory=max_memory)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        self.assertLess(peak, max_memory)
+        self.assertTrue((out == image.to_ci8().data_array).all())
+
+    def test_invalid_budget(self):
+        self.assertRaises(ValueError, self.image.to_i8, max_memory=0)
+
+    def test_parse_size(self):
+        self.assertEqual(parse_size("4096"), 4096)
+        self.assertEqual(parse_size("512K"), 512 * 1024)
+        self.assertEqual(parse_size("64mb"), 64 * 1024 * 1024)
+
+
+class TestStats(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source = pathlib.Path(self.temp_dir.name) / "texture.png"
+        Image.fromarray(np.full((8, 4, 4), 255, dtype=np.uint8)).save(self.source)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+        return super().tearDown()
+
+    def test_json(self):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            cli([str(self.source), "rgba5551", "-b", "--stats", "json"])
+        stats = json.loads(stdout.getvalue())
+        self.assertEqual(stats["schema"], 1)
+
+        entry, = stats["files"]
+        self.assertEqual(entry["input_format"], "rgba")
+        self.assertEqual(entry["output_format"], "rgba5551")
+        self.assertEqual((entry["width"], entry["height"], entry["pixels"]), (4, 8, 32))
+        self.assertEqual(entry["bytes_in"], self.source.stat().st_size)
+        self.assertEqual(entry["bytes_out"], sum(pathlib.Path(path).stat().st_size for path in entry["outputs"]))
+        self.assertIsNone(entry["palette_size"])
+        self.assertEqual(set(entry["timings"]), {"decode", "convert", "encode", "write", "total"})
+        self.assertGreater(entry["pixels_per_second"], 0)
+
+    def test_no_stats_by_default(self):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            cli([str(self.source), "rgba5551"])
+        self.assertEqual(stdout.getvalue(), "")
+        self.assertTrue((self.source.parent / "rgba5551_texture.png").exists())
+
+
+class TestSniff(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.temp_dir.name)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+        return super().tearDown()
+
+    def test_is_image(self):
+        for image_format in ["PNG", "BMP", "GIF", "TIFF", "JPEG", "WEBP", "PPM"]:
+            encoded = io.BytesIO()
+            Image.new("RGB", (2, 2)).save(encoded, format=image_format)
+            self.assertTrue(is_image(encoded.getvalue()[:16]), image_format)
+        self.assertFalse(is_image(b"\x12\x34" * 8))
+        self.assertFalse(is_image(b""))
+
+    def test_candidate_sizes(self):
+        self.assertEqual(candidate_sizes(2048, 16)[0], (32, 32))
+        self.assertEqual(candidate_sizes(4096, 16)[0], (64, 32))
+        self.assertEqual(candidate_sizes(2048, 4)[0], (64, 64))
+        self.assertEqual(candidate_sizes(3, 16), [])
+
+    def test_infer_size(self):
+        self.assertEqual(infer_size(2048, 8, width=16), (16, 128))
+        self.assertEqual(infer_size(2048, 8, height=16), (128, 16))
+        self.assertEqual(infer_size(2048, 8, 32, 32), (32, 32))
+        self.assertRaises(ValueError, infer_size, 2047, 16)
+        self.assertRaises(ValueError, infer_size, 2048, 8, width=24)
+        self.assertRaises(ValueError, infer_size, 1024, 8, 64, 64)
+        self.assertRaises(ValueError, infer_size, 0, 8)
+        self.assertRaises(ValueError, infer_size, 2048, 8, width=0)
+
+    def test_raw_size_inferred(self):
+        source = self.path / "texture"
+        source.write_bytes(np.arange(32 * 32, dtype=">u2").tobytes())
+        cli([str(source), "rgba5551", "rgba", "-o", str(self.path / "texture.png")])
+        with Image.open(self.path / "texture.png") as image:
+            self.assertEqual(image.size, (32, 32))
+
+    def test_file_named_like_a_command(self):
+        # Files named after a command are converted as they were before the commands existed
+        cwd = os.getcwd()
+        os.chdir(self.path)
+        try:
+            for name in ("build", "watch", "pack", "extract"):
+                with self.subTest(name=name):
+                    pathlib.Path(name).write_bytes(np.arange(8 * 8, dtype=">u2").tobytes())
+                    cli([name, "rgba5551", "rgba", "-o", f"{name}.png"])
+                    with Image.open(f"{name}.png") as image:
+                        self.assertEqual(image.size, (8, 8))
+        finally:
+            os.chdir(cwd)
+
+    def test_raw_with_image_signature(self):
+        # Raw bytes that happen to start like a BMP still convert
+        source = self.path / "texture"
+        source.write_bytes(b"BM" + bytes(14))
+        cli([str(source), "i8", "rgba", "-o", str(self.path / "texture.png")])
+        with Image.open(self.path / "texture.png") as image:
+            self.assertEqual(image.size, (4, 4))
+
+    def test_raw_with_truncated_signature(self):
+        # Raw bytes that start like a PNG, but fail partway through decoding, still convert
+        buffer = io.BytesIO()
+        Image.fromarray(np.random.default_rng(0).integers(0, 256, (16, 16, 4), dtype=np.uint8)).save(buffer, format="PNG")
+        source = self.path / "texture"
+        source.write_bytes(buffer.getvalue()[:96].ljust(128, b"\x00"))
+        self.assertIsNone(open_image(source))
+        cli([str(source), "rgba5551", "rgba", "-o", str(self.path / "texture.png")])
+        with Image.open(self.path / "texture.png") as image:
+            self.assertEqual(image.size, (8, 8))
+
+    def test_bad_size_fails(self):
+        source = self.path / "texture"
+        source.write_bytes(bytes(33))
+        with contextlib.redirect_stderr(io.StringIO()):
+            self.assertRaises(SystemExit, cli, [str(source), "rgba5551", "rgba"])
+
+    def test_ci_without_palette_fails(self):
+        source = self.path / "texture"
+        source.write_bytes(bytes(64))
+        with contextlib.redirect_stderr(io.StringIO()):
+            self.assertRaises(SystemExit, cli, [str(source), "ci8", "rgba"])
+
+
+class TestMultipleOutputs(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.temp_dir.name)
+        rng = np.random.default_rng(0)
+        colours = rng.integers(0, 256, (8, 4), dtype=np.uint8)
+        self.data = colours[rng.integers(0, 8, (8, 16))]
+        Image.fromarray(self.data).save(self.path / "texture.png")
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+        return super().tearDown()
+
+    def test_outputs(self):
+        written = convert_file(self.path / "texture.png", "rgba5551,ci8,i8", write_bytes=True)
+        self.assertEqual([path.name for path in written], [
+            "rgba5551_texture", "rgba5551_texture.png",
+            "ci8_texture", "palette_ci8_texture", "ci8_texture.png",
+            "i8_texture", "i8_texture.png",
+        ])
+        image = RGBAImage(self.data, 16, 8)
+        self.assertEqual((self.path / "rgba5551_texture").read_bytes(), image.to_rgba5551().to_bytes())
+        self.assertEqual((self.path / "ci8_texture").read_bytes(), image.to_ci8().to_bytes())
+        self.assertEqual((self.path / "i8_texture").read_bytes(), image.to_i8().to_bytes())
+
+    def test_output_file(self):
+        written = convert_file(self.path / "texture.png", ["ci4", "ci8"], output_file=self.path / "out.png")
+        self.assertEqual([path.name for path in written], ["ci4_out.png", "ci8_out.png"])
+
+    def test_matches_single(self):
+        convert_file(self.path / "texture.png", "i4a,rgba5551", write_bytes=True, max_memory=1024)
+        for fmt in ["i4a", "rgba5551"]:
+            single = convert_file(self.path / "texture.png", fmt, output_file=self.path / f"single_{fmt}.png", write_bytes=True)
+            self.assertEqual(single[0].read_bytes(), (self.path / f"{fmt}_texture").read_bytes())
+
+    def test_cli(self):
+        cli([str(self.path / "texture.png"), "rgba5551,ci8"])
+        self.assertTrue((self.path / "rgba5551_texture.png").exists())
+        self.assertTrue((self.path / "ci8_texture.png").exists())
+
+    def test_unknown_format(self):
+        with contextlib.redirect_stderr(io.StringIO()):
+            self.assertRaises(SystemExit, cli, [str(self.path / "texture.png"), "rgba5551,ci9"])
+
+
+class TestDedup(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        colours = rng.integers(0, 256, (8, 4), dtype=np.uint8)
+        self.image = RGBAImage(colours[rng.integers(0, 8, (6, 5))], 5, 6)
+        return super().setUp()
+
+    def test_byte_identical(self):
+        ci8_image = self.image.to_ci8()
+        copy = CI8Image.from_bytes(ci8_image.to_bytes(), 5, 6, ci8_image.palette.to_bytes())
+        result = find_duplicates({"a": ci8_image, "b": self.image.to_i8(), "c": copy})
+        self.assertEqual(result.groups, [["a", "c"], ["b"]])
+        self.assertEqual(result.unique, ["a", "b"])
+        self.assertEqual(result.canonical, {"a": "a", "b": "b", "c": "a"})
+        self.assertEqual(result.duplicates, [["a", "c"]])
+
+    def test_palette_equivalent(self):
+        ci8_image = self.image.to_ci8()
+        # Reverse the palette and remap the indices, so the bytes differ but the pixels don't
+        reordered = CI8Image(len(ci8_image.palette) - 1 - ci8_image.data_array, 5, 6, np.asarray(ci8_image.palette)[::-1])
+        self.assertEqual(len(find_duplicates([ci8_image, reordered])), 2)
+        result = find_duplicates([ci8_image, reordered], decoded=True)
+        self.assertEqual(result.groups, [[0, 1]])
+
+    def test_files(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = pathlib.Path(temp_dir)
+            Image.fromarray(self.image.data_array).save(path / "a.png")
+            Image.fromarray(self.image.data_array).save(path / "b.png", compress_level=1)
+            (path / "c.png").write_bytes((path / "a.png").read_bytes())
+            paths = [path / "a.png", path / "b.png", path / "c.png"]
+            self.assertEqual(find_duplicates(paths).groups, [[paths[0], paths[2]], [paths[1]]])
+            self.assertEqual(find_duplicates(paths, decoded=True).groups, [paths])
+
+    def test_archive_shares_payloads(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = pathlib.Path(temp_dir) / "textures.n64a"
+            with ArchiveWriter(path) as writer:
+                writer.add("a", self.image.to_rgba5551())
+                writer.add("b", self.image.to_rgba5551())
+            with ArchiveReader(path) as reader:
+                self.assertEqual(reader.index["offset"][0], reader.index["offset"][1])
+                self.assertEqual(reader["b"].to_bytes(), self.image.to_rgba5551().to_bytes())
+
+
+class TestContentEquality(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        colours = rng.integers(0, 256, (8, 4), dtype=np.uint8)
+        self.image = RGBAImage(colours[rng.integers(0, 8, (6, 5))], 5, 6)
+        return super().setUp()
+
+    def test_equality(self):
+        rgba5551_image = self.image.to_rgba5551()
+        loaded = RGBA5551Image.from_bytes(rgba5551_image.to_bytes(), 5, 6)
+        self.assertEqual(loaded, rgba5551_image)
+        self.assertEqual(loaded.content_hash, rgba5551_image.content_hash)
+        self.assertEqual(len({loaded.content_hash, rgba5551_image.content_hash}), 1)
+        with self.assertRaises(TypeError):
+            hash(loaded)
+
+        # Arrays stored in another byte order equal native arrays with the same values
+        swapped = RGBA5551Image(rgba5551_image.data_array.astype(">u2"), 5, 6)
+        self.assertEqual(swapped, rgba5551_image)
+        self.assertEqual(swapped.content_hash, rgba5551_image.content_hash)
+
+        self.assertNotEqual(rgba5551_image, RGBA5551Image(rgba5551_image.data_array ^ 1, 5, 6))
+        self.assertNotEqual(rgba5551_image, RGBA5551Image(rgba5551_image.data_array.reshape(5, 6), 6, 5))
+        self.assertNotEqual(self.image.to_i8(), I8AImage(self.image.to_i8().data_array, 5, 6))
+        self.assertNotEqual(rgba5551_image, rgba5551_image.to_bytes())
+
+    def test_equality_dtype(self):
+        # Equal values stored in a wider dtype hash differently, so they aren't equal
+        i8_image = I8Image.from_bytes(bytes(6), 3, 2)
+        wide = I8Image(np.zeros((2, 3), np.uint16), 3, 2)
+        self.assertNotEqual(i8_image, wide)
+        self.assertNotEqual(i8_image.content_hash, wide.content_hash)
+        self.assertEqual(i8_image, I8Image(np.zeros((2, 3), np.uint8), 3, 2))
+
+    def test_palette(self):
+        ci8_image = self.image.to_ci8()
+        copy = CI8Image.from_bytes(ci8_image.to_bytes(), 5, 6, ci8_image.palette.to_bytes())
+        self.assertEqual(copy, ci8_image)
+        self.assertEqual(copy.content_hash, ci8_image.content_hash)
+
+        other_palette = CI8Image(ci8_image.data_array, 5, 6, np.asarray(ci8_image.palette) ^ 2)
+        self.assertNotEqual(other_palette, ci8_image)
+        self.assertNotEqual(other_palette.content_hash, ci8_image.content_hash)
+        ia16_tlut = CI8Image(ci8_image.data_array, 5, 6, ci8_image.palette, "ia16")
+        self.assertNotEqual(ia16_tlut, ci8_image)
+        self.assertNotEqual(ia16_tlut.content_hash, ci8_image.content_hash)
+
+    def test_diff(self):
+        rgba5551_image = self.image.to_rgba5551()
+        self.assertFalse(rgba5551_image.diff(rgba5551_image))
+        self.assertIsNone(rgba5551_image.diff(rgba5551_image).bbox)
+
+        changed = RGBA5551Image(rgba5551_image.data_array.copy(), 5, 6)
+        changed.data_array[1, 3] ^= 0x0800
+        changed.data_array[4, 1] ^= 1
+        diff = rgba5551_image.diff(changed)
+        self.assertEqual(diff.changed, 2)
+        self.assertEqual(diff.bbox, (1, 1, 4, 5))
+        self.assertEqual(np.argwhere(diff.mask).tolist(), [[1, 3], [4, 1]])
+
+        # Different formats are compared by their decoded pixels
+        rgba_diff = self.image.diff(changed)
+        self.assertTrue(rgba_diff.mask[1, 3] and rgba_diff.mask[4, 1])
+        self.assertFalse(rgba5551_image.to_rgba().diff(rgba5551_image))
+
+        with self.assertRaises(ValueError):
+            rgba5551_image.diff(RGBA5551Image.from_bytes(bytes(8), 2, 2))
+
+
+def _exit_worker(task):
+    """Stands in for a worker that crashes mid batch"""
+    os._exit(1)
+
+
+def _shared_blocks() -> set:
+    return set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self) -> None:
+        rng = np.random.default_rng(0)
+        colours = rng.integers(0, 256, (12, 4), dtype=np.uint8)
+        rgba_image = RGBAImage(colours[rng.integers(0, 12, (9, 7))], 7, 9)
+        self.textures = [
+            rgba_image,
+            rgba_image.to_ci8(),
+            rgba_image.to_ci4(tlut="ia16"),
+            rgba_image.to_ia16(),
+            rgba_image.to_i4(),
+            rgba_image.to_ci8(),
+        ]
+        return super().setUp()
+
+    def test_convert_batch(self):
+        before = _shared_blocks()
+        with ProcessPoolExecutor(2) as executor:
+            for output_format in ("rgba", "rgba5551", "ci8", "i4"):
+                with self.subTest(output_format=output_format):
+                    converted = convert_batch(self.textures, output_format, executor)
+                    expected = [texture.convert_to(Formats[output_format].value) for texture in self.textures]
+                    self.assertEqual(converted, expected)
+        self.assertEqual(_shared_blocks(), before)
+        self.assertEqual(convert_batch([], "ci8", 1), [])
+
+    def test_shared_arrays(self):
+        with SharedArrays([((2, 3), np.uint16), ((5,), np.uint8)]) as arrays:
+            arrays[0][...] = np.arange(6).reshape(2, 3)
+            with SharedViews() as views:
+                self.assertEqual(views[arrays.location(0)].tolist(), [[0, 1, 2], [3, 4, 5]])
+                self.assertEqual(views[arrays.location(1)].shape, (5,))
+                self.assertEqual(len(views.blocks), 1)
+            self.assertEqual(arrays.offsets[1] % 64, 0)
+
+    @unittest.skipIf(sys.version_info >= (3, 13) or os.name != "posix", "attaching only registers before 3.13")
+    def test_attach_untracked(self):
+        from multiprocessing import resource_tracker
+
+        with SharedArrays([((4,), np.uint8)]) as arrays:
+            # Attaching with the owner's tracker leaves its registration alone
+            with mock.patch.object(resource_tracker, "unregister") as unregister, SharedViews() as views:
+                views[arrays.location(0)]
+            unregister.assert_not_called()
+            # A worker with its own tracker undoes the registration attaching made there
+            location = arrays.location(0)[:-1] + ((0, 0),)
+            with mock.patch.object(resource_tracker, "unregister") as unregister, SharedViews() as views:
+                views[location]
+            unregister.assert_called_once_with(arrays.shm._name, "shared_memory")
+
+    def test_task_size(self):
+        # Tasks only carry their own texture's arrays, however big the batch
+        sizes = dict()
+        for count in (2, 64):
+
+            class RecordingExecutor(ThreadPoolExecutor):
+                def submit(self, fn, task):
+                    sizes[count] = max(sizes.get(count, 0), len(pickle.dumps(task)))
+                    return super().submit(fn, task)
+
+            with RecordingExecutor(1) as executor:
+                convert_batch((self.textures * count)[:count], "rgba5551", executor)
+        self.assertLessEqual(sizes[64], sizes[2] + 8)
+
+    @unittest.skipUnless(sys.platform.startswith("linux"), "needs fork and /dev/shm")
+    def test_worker_crash(self):
+        before = _shared_blocks()
+        executor = ProcessPoolExecutor(2, mp_context=multiprocessing.get_context("fork"))
+        with mock.patch("n64tex.batch._convert_task", _exit_worker), self.assertRaises(BrokenProcessPool):
+            convert_batch(self.textures, "rgba5551", executor)
+        executor.shutdown()
+        self.assertEqual(_shared_blocks(), before)
+
+    def test_invalid(self):
+        with self.assertRaises(ValueError):
+            convert_batch(self.textures, "rgba8888")
+
+
+class TestBuild(unittest.TestCase):
+    def setUp(self) -> None:
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.source_dir = pathlib.Path(self.temp_dir.name) / "textures"
+        self.output_dir = pathlib.Path(self.temp_dir.name) / "out"
+        (self.source_dir / "sub").mkdir(parents=True)
+        self.write_texture("a.png", 0)
+        self.write_texture("sub/b.png", 128)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.temp_dir.cleanup()
+        return super().tearDown()
+
+    def write_texture(self, name, value):
+        data = np.full((4, 4, 4), value, dtype=np.uint8)
+        Image.fromarray(data).save(self.source_dir / name)
+
+    def build(self, **kwargs):
+        return build(self.source_dir, "rgba5551", output_dir=self.output_dir, write_bytes=True, **kwargs)
+
+    def test_initial_build(self):
+        result = self.build()
+        self.assertEqual(result.converted, ["a.png", "sub/b.png"])
+        self.assertTrue((self.output_dir / "a.png").exists())
+        self.assertTrue((self.output_dir / "a").exists())
+        self.assertTrue((self.output_dir / "sub" / "b.png").exists())
+        self.assertTrue((self.output_dir / MANIFEST_NAME).exists())
+
+    def test_rebuild_skips_unchanged(self):
+        self.build()
+        result = self.build()
+        self.assertEqual(result.converted, [])
+        self.assertEqual(result.skipped, ["a.png", "sub/b.png"])
+
+    def test_rebuild_only_changed(self):
+        self.build()
+        self.write_texture("a.png", 255)
+        stat = (self.source_dir / "a.png").stat()
+        os.utime(self.source_dir / "a.png", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        result = self.build()
+        self.assertEqual(result.converted, ["a.png"])
+        self.assertEqual((self.output_dir / "a").read_bytes(), b"\xff\xff" * 16)
+
+    def test_touch_without_change(self):
+        self.build()
+        stat = (self.source_dir / "a.png").stat()
+        os.utime(self.source_dir / "a.png", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        result = self.build()
+        self.assertEqual(result.converted, [])
+
+    def test_changed_parameters(self):
+        self.build()
+        result = build(self.source_dir, "rgba5551", output_dir=self.output_dir)
+        self.assertEqual(result.converted, ["a.png", "sub/b.png"])
+        self.assertFalse((self.output_dir / "a").exists())
+
+    def test_stale_outputs_removed(self):
+        self.build()
+        (self.source_dir / "sub" / "b.png").unlink()
+        result = self.build()
+        self.assertEqual(result.converted, [])
+        self.assertFalse((self.output_dir / "sub" / "b.png").exists())
+        self.assertFalse((self.output_dir / "sub" / "b").exists())
+        self.assertEqual(len(result.removed), 2)
+
+    def test_colliding_outputs(self):
+        self.build()
+        (self.source_dir / "a.bin").write_bytes(bytes(32))
+        with self.assertRaises(ValueError):
+            self.build()
+        # Nothing was overwritten or removed
+        self.assertTrue((self.output_dir / "a.png").exists())
+        self.assertTrue((self.output_dir / "a").exists())
+
+    def test_missing_output_rebuilt(self):
+        self.build()
+        (self.output_dir / "a.png").unlink()
+        result = self.build()
+        self.assertEqual(result.converted, ["a.png"])
+
+    def test_cli(self):
+        cli(["build", str(self.source_dir), "i8", "-o", str(self.output_dir)])
+        self.assertTrue((self.output_dir / "a.png").exists())
+
+    def test_multiple_formats(self):
+        result = build(self.source_dir, "rgba5551,i8", output_dir=self.output_dir)
+        self.assertEqual(result.converted, ["a.png", "sub/b.png"])
+        self.assertTrue((self.output_dir / "rgba5551_a.png").exists())
+        self.assertTrue((self.output_dir / "sub" / "i8_b.png").exists())
+
+    def test_dedup(self):
+        (self.source_dir / "copy.png").write_bytes((self.source_dir / "a.png").read_bytes())
+        result = self.build(dedup=True)
+        self.assertEqual(result.converted, ["a.png", "copy.png", "sub/b.png"])
+        self.assertEqual(result.duplicates, {"copy.png": "a.png"})
+        self.assertEqual((self.output_dir / "copy").read_bytes(), (self.output_dir / "a").read_bytes())
+        self.assertTrue((self.output_dir / "copy.png").exists())
+        self.assertEqual(self.build(dedup=True).converted, [])
+
+    def test_copy_unmatched_output(self):
+        self.build()
+        source_output, output_file = self.output_dir / "a.png", self.output_dir / "copy.png"
+        with self.assertRaises(ValueError):
+            _copy_outputs([self.output_dir / "sub" / "b.png"], source_output, output_file)
+        self.assertFalse(output_file.exists())
+
+    def test_threads(self):
+        for index in range(8):
+            self.write_texture(f"sub/{index}.png", index * 16 + 8)
+        (self.source_dir / "copy.png").write_bytes((self.source_dir / "a.png").read_bytes())
+        result = self.build(dedup=True, threads=4)
+        self.assertEqual(result.converted, sorted(result.converted))
+        self.assertEqual(len(result.converted), 11)
+        self.assertEqual(result.duplicates, {"copy.png": "a.png"})
+        self.assertEqual((self.output_dir / "sub" / "3").read_bytes(), RGBAImage(np.full((4, 4, 4), 56, dtype=np.uint8), 4, 4).to_rgba5551().to_bytes())
+        self.assertEqual(self.build(dedup=True, threads=4).converted, [])
+
+    def test_compression_parameters(self):
+        self.build()
+        result = self.build(compress_level="raw")
+        self.assertEqual(result.converted, ["a.png", "sub/b.png"])
+        self.assertEqual(self.build(compress_level="raw").converted, [])
+        with contextlib.redirect_stdout(io.StringIO()):
+            cli(["build", str(self.source_dir), "rgba5551", "-o", str(self.output_dir), "-b", "--compress_level", "raw", "--threads", "2"])
+        self.assertEqual(self.build(compress_level="raw").converted, [])
+
+    def test_cli_stats(self):
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            cli(["build", str(self.source_dir), "ci8", "-o", str(self.output_dir), "--stats", "json"])
+        stats = json.loads(stdout.getvalue())
+        self.assertEqual(stats["converted"], 2)
+        self.assertEqual(stats["totals"]["files"], 2)
+        self.assertEqual(stats["totals"]["pixels"], 32)
+        self.assertEqual([entry["palette_size"] for entry in stats["files"]], [1, 1])
+        self.assertIn("peak_rss_bytes", stats)
+
+
+class TestTexPack(unittest.TestCase):
+    @staticmethod
+    def reference_crc(raw_bytes, bytes_per_line, height):
+        # CalculateRDRAMCRC as in Rice Video and GLideN64. The address starts
+        # at the top row and moves down a row at a time while y counts down
+        crc = 0
+        address = 0
+        for y in range(height - 1, -1, -1):
+            word = 0
+            for x in range(bytes_per_line - 4, -1, -4):
+                word = int.from_bytes(raw_bytes[address + x:address + x + 4], "big") ^ x
+                crc = (((crc << 4) | (crc >> 28)) + word) & 0xFFFFFFFF
+            crc = (crc + (word ^ y)) & 0xFFFFFFFF
+            address += bytes_per_line
+        return crc
+
+    def test_crc(self):
+        rng = np.random.default_rng(0)
+        for bytes_per_line, height in [(8, 4), (64, 32), (2, 3), (128, 1)]:
+            raw_bytes = rng.integers(0, 256, bytes_per_line * height, dtype=np.uint8).tobytes()
+            self.assertEqual(rice_crc(raw_bytes, bytes_per_line, height), self.reference_crc(raw_bytes, bytes_per_line, height))
+
+    def test_crc_row_order(self):
+        # The top row is hashed first, XORed with height - 1
+        rows = np.random.default_rng(2).integers(0, 256, (1, 8, 8), dtype=np.uint8)
+        self.assertNotEqual(rice_crcs(rows)[0], rice_crcs(rows[:, ::-1])[0])
+        top_first = 0
+        for y, row in zip(range(7, -1, -1), rows[0]):
+            words = [int.from_bytes(row[x:x + 4].tobytes(), "big") ^ x for x in (4, 0)]
+            for word in words:
+                top_first = (((top_first << 4) | (top_first >> 28)) + word) & 0xFFFFFFFF
+            top_first = (top_first + (words[-1] ^ y)) & 0xFFFFFFFF
+        self.assertEqual(int(rice_crcs(rows)[0]), top_first)
+
+    def test_batched_crc(self):
+        rows = np.random.default_rng(1).integers(0, 256, (5, 16, 32), dtype=np.uint8)
+        crcs = rice_crcs(rows)
+        self.assertEqual(crcs.tolist(), [self.reference_crc(texture.tobytes(), 32, 16) for texture in rows])
+
+    def test_texture_crcs(self):
+        palette = Palette.of(np.arange(16) * 4 + 1)
+        ci4_image = CI4Image.from_bytes(bytes(range(32)), 8, 8, palette)
+        rgba5551_image = RGBA5551Image.from_bytes(bytes(range(128)), 8, 8)
+        i8_image = I8Image.from_bytes(bytes(range(64)), 8, 8)
+
+        (ci4_crc, palette_crc), (rgba5551_crc, none), (i8_crc, _) = texture_crcs([ci4_image, rgba5551_image, i8_image])
+        self.assertEqual(ci4_crc, rice_crc(ci4_image.to_bytes(), 4, 8))
+        self.assertEqual(palette_crc, rice_crc(palette.to_bytes(), 32, 1))
+        self.assertEqual(rgba5551_crc, rice_crc(rgba5551_image.to_bytes(), 16, 8))
+        self.assertEqual(i8_crc, rice_crc(i8_image.to_bytes(), 8, 8))
+        self.assertIsNone(none)
+
+        self.assertEqual(pack_name("GAME", rgba5551_image, 0xABC), "GAME#00000ABC#0#2_all.png")
+        self.assertEqual(pack_name("GAME", ci4_image, 1, 0xFF), "GAME#00000001#2#0#000000FF_all.png")
+
+    def test_partial_byte_rows(self):
+        with self.assertRaises(ValueError):
+            texture_crcs([I4Image.from_bytes(bytes(8), 3, 3)])
+
+    def test_export_pack(self):
+        rgba5551_image = RGBA5551Image.from_bytes(bytes(range(128)), 8, 8)
+        i8_image = I8Image.from_bytes(bytes(range(64)), 8, 8)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            written = export_pack(
+                [rgba5551_image, i8_image, rgba5551_image], tmp_dir, "GAME", threads=2,
+                upscale=lambda image: image.resize((image.width * 2, image.height * 2)),
+            )
+            self.assertEqual(len(written), 2)
+            for name, path in written.items():
+                self.assertEqual(path.name, name)
+                with Image.open(path) as image:
+                    self.assertEqual((image.mode, image.size), ("RGBA", (16, 16)))
+
+    def test_manifest(self):
+        palette = Palette.of(np.arange(16) * 2 + 1)
+        rgba5551_image = RGBA5551Image.from_bytes(bytes(range(128)), 8, 8)
+        rom = bytearray(0x1000)
+        rom[:4] = b"\x80\x37\x12\x40"
+        rom[0x20:0x34] = b"TEST GAME".ljust(20)
+        rom[0x100:0x180] = rgba5551_image.to_bytes()
+        rom[0x200:0x220] = bytes(range(32))
+        rom[0x300:0x320] = palette.to_bytes()
+        manifest = {"textures": [
+            {"format": "rgba5551", "width": 8, "height": 8, "offset": "0x100"},
+            {"format": "ci4", "width": 8, "height": 8, "offset": 0x200, "palette_offset": "0x300"},
+        ]}
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            rom_path = pathlib.Path(tmp_dir) / "game.z64"
+            rom_path.write_bytes(rom)
+            name, textures = load_manifest(rom_path, manifest)
+            self.assertEqual(name, "TEST GAME")
+            self.assertEqual(textures[0].to_bytes(), rgba5551_image.to_bytes())
+            self.assertEqual(textures[1].palette.digest, palette.digest)
+
+            # Byteswapped ROMs load the same textures
+            swapped_path = pathlib.Path(tmp_dir) / "game.v64"
+            swapped_path.write_bytes(np.frombuffer(bytes(rom), dtype=">u2").byteswap().tobytes())
+            self.assertEqual(load_manifest(swapped_path, manifest)[1][1].to_bytes(), textures[1].to_bytes())
+
+            manifest_path = pathlib.Path(tmp_dir) / "manifest.json"
+            manifest_path.write_text(json.dumps(manifest))
+            output_dir = pathlib.Path(tmp_dir) / "pack"
+            with contextlib.redirect_stdout(io.StringIO()):
+                cli(["pack", str(rom_path), str(manifest_path), "-o", str(output_dir), "--scale", "4"])
+            names = sorted(path.name for path in output_dir.iterdir())
+            self.assertEqual(len(names), 2)
+            self.assertTrue(all(name.startswith("TEST GAME#") and name.endswith("_all.png") for name in names))
+
+            with self.assertRaises(ValueError):
+                load_manifest(manifest_path, manifest)
+
+            # The JSON lines manifests extract takes work too, even with a single entry
+            lines_path = pathlib.Path(tmp_dir) / "manifest.jsonl"
+            for entries in (manifest["textures"], manifest["textures"][1:]):
+                with self.subTest(entries=len(entries)):
+                    lines_path.write_text("\n".join(json.dumps(entry) for entry in entries) + "\n")
+                    name, lines_textures = load_manifest(rom_path, lines_path)
+                    self.assertEqual(name, "TEST GAME")
+                    self.assertEqual([texture.to_bytes() for texture in lines_textures], [texture.to_bytes() for texture in textures[-len(entries):]])
+                    self.assertEqual(load_manifest(rom_path, entries)[1][0].to_bytes(), lines_textures[0].to_bytes())
+            lines_output_dir = pathlib.Path(tmp_dir) / "lines_pack"
+            with contextlib.redirect_stdout(io.StringIO()):
+                cli(["pack", str(rom_path), str(lines_path), "-o", str(lines_output_dir)])
+            lines_names = [path.name for path in lines_output_dir.iterdir()]
+            self.assertEqual(len(lines_names), 1)
+            self.assertIn(lines_names[0], names)
+
+
+class TestExtract(unittest.TestCase):
+    def setUp(self) -> None:
+        self.palette = Palette.of(np.arange(16) * 2 + 1)
+        self.rgba5551_image = RGBA5551Image.from_bytes(bytes(range(128)), 8, 8)
+        rom = bytearray(0x1000)
+        rom[:4] = b"\x80\x37\x12\x40"
+        rom[0x100:0x180] = self.rgba5551_image.to_bytes()
+        rom[0x200:0x220] = bytes(range(32))
+        rom[0x300:0x320] = self.palette.to_bytes()
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.rom_path = pathlib.Path(self.tmp_dir.name) / "game.z64"
+        self.rom_path.write_bytes(rom)
+        self.entries = [
+            {"format": "rgba5551", "width": 8, "height": 8, "offset": "0x100", "length": 128},
+            {"format": "ci4", "width": 8, "height": 8, "offset": 0x200, "palette_offset": "0x300", "name": "sub/ci4"},
+        ] * 10
+        self.manifest_path = pathlib.Path(self.tmp_dir.name) / "manifest.jsonl"
+        self.manifest_path.write_text("\n".join(json.dumps(entry) for entry in self.entries) + "\n\n")
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+        return super().tearDown()
+
+    def test_extract(self):
+        results = sorted(extract(self.rom_path, self.manifest_path, threads=3), key=lambda result: result[0])
+        self.assertEqual([number for number, _, _ in results], list(range(20)))
+        self.assertEqual(results[0][2].to_bytes(), self.rgba5551_image.to_bytes())
+        self.assertEqual(results[1][2].to_bytes(), bytes(range(32)))
+        self.assertEqual(results[1][2].palette.digest, self.palette.digest)
+
+        sizes = extract(self.rom_path, self.entries, process=lambda texture, entry: texture.width * texture.height)
+        self.assertEqual({size for _, _, size in sizes}, {64})
+
+    def test_backpressure(self):
+        pulled = list()
+
+        def entries():
+            for entry in self.entries:
+                pulled.append(entry)
+                yield entry
+
+        results = extract(self.rom_path, entries(), threads=2, max_pending=3)
+        next(results)
+        # Nothing more is read from the manifest until results are consumed
+        self.assertLessEqual(len(pulled), 3)
+        results.close()
+        self.assertLessEqual(len(pulled), 3)
+
+        # An executor's own worker count sets how many are pulled ahead
+        pulled.clear()
+        with ThreadPoolExecutor(2) as executor:
+            results = extract(self.rom_path, entries(), threads=(executor, 2))
+            next(results)
+            self.assertLessEqual(len(pulled), 4)
+            results.close()
+
+    def test_invalid_entries(self):
+        with self.assertRaises(ValueError):
+            list(extract(self.rom_path, [{"format": "rgba5551", "width": 8, "height": 8, "offset": 0, "length": 64}]))
+        with self.assertRaises(ValueError):
+            list(extract(self.rom_path, [{"format": "ci4", "width": 8, "height": 8, "offset": 0}]))
+        self.manifest_path.write_text("{}\nnot json\n")
+        with self.assertRaises(ValueError):
+            list(iter_manifest(self.manifest_path))
+
+    def test_wrong_field_types(self):
+        entry = self.entries[1]
+        for field, value in (("width", None), ("offset", [0x200]), ("offset", {"at": 0x200}), ("palette_offset", None), ("length", "long")):
+            with self.subTest(field=field, value=value), self.assertRaisesRegex(ValueError, "Invalid manifest entry 0"):
+                list(extract(self.rom_path, [dict(entry, **{field: value})]))
+        with self.assertRaisesRegex(ValueError, "Invalid manifest entry 0"):
+            list(extract(self.rom_path, [[0x200]]))
+
+        self.manifest_path.write_text(json.dumps(dict(entry, width=None)) + "\n")
+        with contextlib.redirect_stderr(io.StringIO()) as stderr, self.assertRaises(SystemExit):
+            cli(["extract", str(self.rom_path), str(self.manifest_path), "-o", self.tmp_dir.name])
+        self.assertIn("Invalid manifest entry 0", stderr.getvalue())
+
+    def test_unsafe_names(self):
+        output_dir = pathlib.Path(self.tmp_dir.name) / "out"
+        for name in ("../escaped", "sub/../../escaped", str(pathlib.Path(self.tmp_dir.name) / "escaped")):
+            with self.subTest(name=name), self.assertRaisesRegex(ValueError, "outside the output directory"):
+                list(extract_to(self.rom_path, [dict(self.entries[0], name=name)], output_dir))
+        self.assertFalse((pathlib.Path(self.tmp_dir.name) / "escaped.png").exists())
+        self.assertFalse(output_dir.exists())
+
+    def test_repeated_names(self):
+        output_dir = pathlib.Path(self.tmp_dir.name) / "out"
+        with self.assertRaisesRegex(ValueError, "entries 0 and 2 are both named 'sub/ci4'"):
+            list(extract_to(self.rom_path, [self.entries[1], self.entries[0], self.entries[1]], output_dir, threads=1))
+        # Entries without a name are named after their offset and format
+        with self.assertRaisesRegex(ValueError, "entries 0 and 1 are both named '00000100_rgba5551'"):
+            list(extract_to(self.rom_path, [self.entries[0], self.entries[0]], output_dir))
+
+    def test_cli(self):
+        output_dir = pathlib.Path(self.tmp_dir.name) / "out"
+        self.manifest_path.write_text("\n".join(json.dumps(entry) for entry in self.entries[:2]) + "\n")
+        with contextlib.redirect_stdout(io.StringIO()) as stdout:
+            cli(["extract", str(self.rom_path), str(self.manifest_path), "-o", str(output_dir), "--write_bytes", "--threads", "2"])
+        self.assertIn("Extracted 2 textures", stdout.getvalue())
+        self.assertEqual((output_dir / "00000100_rgba5551").read_bytes(), self.rgba5551_image.to_bytes())
+        self.assertEqual((output_dir / "sub" / "palette_ci4").read_bytes(), self.palette.to_bytes())
+        with Image.open(output_dir / "sub" / "ci4.png") as image:
+            self.assertEqual(image.mode, "P")
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            cli(["extract", str(self.rom_path), str(self.manifest_path), "-o", str(output_dir), "--output_format", "rgba"])
+        with Image.open(output_dir / "sub" / "ci4.png") as image:
+            self.assertEqual(image.mode, "RGBA")
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,231 @@
+"""Seeded fuzz round trips for every format, with an opt-in speed gate
+
+Every format is generated as random raw bytes over fixed edge case sizes and
+seeded random ones, including odd widths and non-square shapes. Lossless
+paths must give back identical bytes and lossy paths must stay within the
+precision of the format.
+
+Environment variables:
+    N64TEX_FUZZ_SEED: Seed for the random sizes and data. Defaults to 0
+    N64TEX_FUZZ_EXAMPLES: Random sizes tried per format. Defaults to 8
+    N64TEX_PERF: "check" to fail on pixels/sec regressions against
+        perf_baseline.json, "update" to rewrite it from this machine.
+        Speed isn't measured otherwise, as baselines are machine specific
+"""
+import io
+import os
+import json
+import time
+import pathlib
+import unittest
+
+import numpy as np
+
+from n64tex.formats import Formats, Palette, RGBAImage
+from n64tex.formats.base import png_options
+
+SEED = int(os.environ.get("N64TEX_FUZZ_SEED", 0))
+EXAMPLES = int(os.environ.get("N64TEX_FUZZ_EXAMPLES", 8))
+PERF_MODE = os.environ.get("N64TEX_PERF", "")
+BASELINE_FILE = pathlib.Path(__file__).with_name("perf_baseline.json")
+
+# PNG compression settings whose saving speed is measured
+PNG_MODES = {
+    "default": png_options(),
+    "fast": png_options("fast", "rle"),
+    "raw": png_options("raw"),
+}
+
+EDGE_SIZES = [(1, 1), (3, 2), (2, 3), (5, 7), (17, 1), (1, 33), (64, 32), (31, 127)]
+
+# Bits of precision of the colour channels of each format, and whether it keeps alpha
+PRECISION = {
+    "i4": (4, False),
+    "i4a": (3, True),
+    "i8": (8, False),
+    "i8a": (4, True),
+    "ia16": (8, True),
+    "rgba5551": (5, True),
+    "ci4": (5, True),
+    "ci8": (5, True),
+    # 8 bit channels, less a bit for rounding on the way through the colour space
+    "yuv16": (7, False),
+}
+
+# Formats stored in another colour space. Values outside the RGB gamut are
+# clipped when decoded and rounding both ways means re-encoding can move a
+# level, so neither decoding then encoding nor quantising again is exact
+COLOUR_SPACE = {Formats.yuv16}
+
+
+def sizes(rng: np.random.Generator) -> list:
+    """Edge case sizes followed by random ones, skewed towards small images"""
+    random_sizes = [tuple(int(side) for side in rng.integers(1, 2 ** rng.integers(1, 9, 2))) for _ in range(EXAMPLES)]
+    return EDGE_SIZES + random_sizes
+
+
+def random_palette(rng: np.random.Generator, colours: int) -> Palette:
+    """Palette of distinct colours, so re-encoding can't pick another index"""
+    return Palette.of(rng.choice(0x10000, colours, replace=False))
+
+
+def random_texture(rng: np.random.Generator, fmt: Formats, width: int, height: int):
+    """Random raw bytes of a format and the object they load as"""
+    cls = fmt.value
+    raw_bytes = bytearray(rng.integers(0, 256, (width * height * cls.bits_per_pixel + 7) // 8, dtype=np.uint8).tobytes())
+    if cls.bits_per_pixel == 4 and (width * height) % 2:
+        # Odd pixel counts are padded with a zero nibble
+        raw_bytes[-1] &= 0xF0
+    raw_bytes = bytes(raw_bytes)
+
+    if cls.indexed:
+        return raw_bytes, cls.from_bytes(raw_bytes, width, height, random_palette(rng, 2 ** cls.bits_per_pixel))
+    return raw_bytes, cls.from_bytes(raw_bytes, width, height)
+
+
+def random_rgba(rng: np.random.Generator, fmt: Formats, width: int, height: int) -> RGBAImage:
+    """Random RGBA pixels a format can hold up to its precision. Intensity
+       formats get grey pixels and alpha is all or nothing for formats with
+       a single bit of it
+    """
+    if fmt.value.indexed:
+        colours = rng.integers(0, 256, (2 ** fmt.value.bits_per_pixel, 4), dtype=np.uint8)
+        data_array = colours[rng.integers(0, len(colours), (height, width))]
+    elif fmt.name.startswith("i"):
+        data_array = np.repeat(rng.integers(0, 256, (height, width, 1), dtype=np.uint8), 4, axis=-1)
+    elif fmt in COLOUR_SPACE:
+        # Pixel pairs along a row share their chroma, so give both the same
+        # colour. The lone pixel ending odd width rows has no V and is grey
+        data_array = np.repeat(rng.integers(0, 256, (height, (width + 1) // 2, 4), dtype=np.uint8), 2, axis=1)[:, :width]
+        if width % 2:
+            data_array[:, -1, :3] = data_array[:, -1, :1]
+    else:
+        data_array = rng.integers(0, 256, (height, width, 4), dtype=np.uint8)
+
+    _, keeps_alpha = PRECISION[fmt.name]
+    if not keeps_alpha:
+        data_array[..., 3] = 255
+    elif fmt not in (Formats.i8a, Formats.ia16):
+        data_array[..., 3] = np.where(data_array[..., 3] >= 128, 255, 0)
+    return RGBAImage(np.ascontiguousarray(data_array), width, height)
+
+
+def encode(rgba_image: RGBAImage, fmt: Formats):
+    """Encode RGBA to a format, weighting intensity by luma alone so grey stays grey"""
+    if fmt.name.startswith("i"):
+        return getattr(rgba_image, f"to_{fmt.name}")(weighting="rec601")
+    return rgba_image.convert_to(fmt.value)
+
+
+class TestRoundTrip(unittest.TestCase):
+    def test_bytes_identity(self):
+        rng = np.random.default_rng(SEED)
+        for fmt in Formats:
+            for width, height in sizes(rng):
+                with self.subTest(format=fmt.name, width=width, height=height, seed=SEED):
+                    raw_bytes, texture = random_texture(rng, fmt, width, height)
+                    self.assertEqual(texture.to_bytes(), raw_bytes)
+
+    def test_decode_encode_identity(self):
+        # Decoding to RGBA is exact, so encoding straight back must give the same bytes
+        rng = np.random.default_rng(SEED)
+        for fmt in Formats:
+            if fmt is Formats.rgba or fmt in COLOUR_SPACE:
+                continue
+            for width, height in sizes(rng):
+                with self.subTest(format=fmt.name, width=width, height=height, seed=SEED):
+                    raw_bytes, texture = random_texture(rng, fmt, width, height)
+                    rgba_image = texture.to_rgba()
+                    if fmt.value.indexed:
+                        encoded = getattr(rgba_image, f"to_{fmt.name}")(palette=texture.palette)
+                    else:
+                        encoded = rgba_image.convert_to(fmt.value)
+                    self.assertEqual(encoded.to_bytes(), raw_bytes)
+
+    def test_lossy_bounded(self):
+        rng = np.random.default_rng(SEED)
+        for fmt in Formats:
+            if fmt is Formats.rgba:
+                continue
+            bits, keeps_alpha = PRECISION[fmt.name]
+            bound = -(-255 // (2 ** bits - 1))
+            for width, height in sizes(rng):
+                with self.subTest(format=fmt.name, width=width, height=height, seed=SEED):
+                    rgba_image = random_rgba(rng, fmt, width, height)
+                    encoded = encode(rgba_image, fmt)
+                    decoded = encoded.to_rgba()
+
+                    source = rgba_image.data_array.astype(np.int16)
+                    error = np.abs(decoded.data_array.astype(np.int16) - source)
+                    self.assertLessEqual(int(error[..., :3].max()), bound)
+                    if keeps_alpha:
+                        self.assertLessEqual(int(error[..., 3].max()), bound)
+
+                    # Quantising again must be stable
+                    if fmt not in COLOUR_SPACE:
+                        self.assertEqual(encode(decoded, fmt).to_bytes(), encoded.to_bytes())
+
+
+def pixels_per_second(func, pixels: int, repeat: int = 7) -> float:
+    """Best throughput of several runs"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return pixels / max(best, 1e-9)
+
+
+def measure(size: int) -> dict:
+    """Pixels/sec of decoding every format to RGBA and encoding RGBA to it,
+       and of saving a PNG with each compression mode
+    """
+    rng = np.random.default_rng(SEED)
+    results = dict()
+    for fmt in Formats:
+        if fmt is Formats.rgba:
+            continue
+        raw_bytes, texture = random_texture(rng, fmt, size, size)
+        rgba_image = random_rgba(rng, fmt, size, size)
+        if fmt.value.indexed:
+            results[f"decode.{fmt.name}"] = pixels_per_second(
+                lambda: fmt.value.from_bytes(raw_bytes, size, size, texture.palette).to_rgba(), size * size
+            )
+        else:
+            results[f"decode.{fmt.name}"] = pixels_per_second(
+                lambda: fmt.value.from_bytes(raw_bytes, size, size).to_rgba(), size * size
+            )
+        results[f"encode.{fmt.name}"] = pixels_per_second(lambda: encode(rgba_image, fmt).to_bytes(), size * size)
+
+    # Textures are rarely noise, so save a decoded RGBA5551 image with flat runs in it
+    image = random_rgba(rng, Formats.rgba5551, size // 4, size).to_rgba5551().to_image(force_rgba=True).resize((size, size))
+    for mode, options in PNG_MODES.items():
+        results[f"save.{mode}"] = pixels_per_second(lambda: image.save(io.BytesIO(), format="PNG", **options), size * size, repeat=3)
+    return results
+
+
+@unittest.skipUnless(PERF_MODE in ("check", "update"), "set N64TEX_PERF=check to gate on speed")
+class TestPerformance(unittest.TestCase):
+    def test_pixels_per_second(self):
+        baseline = json.loads(BASELINE_FILE.read_text()) if BASELINE_FILE.exists() else dict()
+        size = baseline.get("size", 1024)
+        tolerance = float(os.environ.get("N64TEX_PERF_TOLERANCE", baseline.get("tolerance", 0.5)))
+        results = measure(size)
+
+        if PERF_MODE == "update":
+            baseline.update(size=size, tolerance=baseline.get("tolerance", 0.5), paths={path: round(speed) for path, speed in results.items()})
+            BASELINE_FILE.write_text(json.dumps(baseline, indent=4, sort_keys=True) + "\n")
+            return
+
+        for path, expected in baseline.get("paths", dict()).items():
+            with self.subTest(path=path):
+                self.assertIn(path, results)
+                self.assertGreaterEqual(
+                    results[path],
+                    expected * (1 - tolerance),
+                    f"{path} ran at {results[path]:,.0f} pixels/sec, more than {tolerance:.0%} below the baseline of {expected:,.0f}",
+                )
+
+
+if __name__ == "__main__":
+    unittest.main()